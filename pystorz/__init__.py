@@ -17,8 +17,9 @@ from pystorz.store.options import (
     Eq, Gt, Gte, Lt, Lte,
     In,
     And, Or, Not,
-    PageOffset, PageSize,
-    Order
+    PageOffset, PageSize, After, BatchSize,
+    Order,
+    AbortOnError
 )
 
 # INTERNAL
@@ -40,8 +41,9 @@ from pystorz.meta.store import MetaStoreFactory
 from pystorz.handler.store import HandlerStoreFactory
 
 # SQL
-from pystorz.sql.sqlite import SqliteStoreFactory
+from pystorz.sql.sqlite import SqliteStoreFactory, SqliteProfile, ReadOptimizedProfile, DurableProfile
 from pystorz.sql.mysql import MySqlStoreFactory as MySQLStoreFactory
+from pystorz.sql.codec import ZlibCodec, TrainDictionary
 
 # MONGO
 from pystorz.mongo.mongo import MongoStoreFactory
@@ -56,13 +58,16 @@ __all__ = [
     "Eq", "Gt", "Gte", "Lt", "Lte",
     "In",
     "And", "Or", "Not",
-    "PageOffset", "PageSize",
+    "PageOffset", "PageSize", "After", "BatchSize",
     "Order",
+    "AbortOnError",
     "Generate",
     "RESTClient", "RESTServer",
     "BrowseServer",
     "RouterStoreFactory", "MetaStoreFactory", "HandlerStoreFactory",
     "SqliteStoreFactory", "MySQLStoreFactory",
+    "SqliteProfile", "ReadOptimizedProfile", "DurableProfile",
+    "ZlibCodec", "TrainDictionary",
     "MongoStoreFactory",
     "MemoryStoreFactory",
     "constants",
@@ -1,5 +1,5 @@
 import logging
-from typing import Callable, Dict
+from typing import Callable, Dict, Iterator
 
 from pystorz.store import store, options
 from pystorz.internal import constants
@@ -91,12 +91,69 @@ class HandlerStore(store.Store):
 
         return self._inner.Delete(identity, *opt)
 
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        def prepare(obj):
+            if obj is None:
+                raise Exception(constants.ErrObjectNil)
+            return self._handled(obj, constants.ActionCreate)
+
+        return store.delegate_batch(
+            objs, prepare, lambda objs: self._inner.CreateMany(objs, *opt), *opt)
+
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        def prepare(item):
+            identity, obj = item
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
+            if obj is None:
+                raise Exception(constants.ErrObjectNil)
+            return identity, self._handled(obj, constants.ActionUpdate)
+
+        return store.delegate_batch(
+            items, prepare, lambda items: self._inner.UpdateMany(items, *opt), *opt)
+
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        # without delete handlers the objects are not needed, identities
+        # go straight to the inner store
+        handled = any(constants.ActionDelete in h for h in self._handlers.values())
+
+        def prepare(identity):
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
+            if not handled:
+                return identity
+
+            obj = self._inner.Get(identity)
+            self._handled(obj, constants.ActionDelete)
+            return identity
+
+        return store.delegate_batch(
+            identities, prepare, lambda ids: self._inner.DeleteMany(ids, *opt), *opt)
+
+    def _handled(self, obj: store.Object, action: str) -> store.Object:
+        cb = self._get_handler(obj.Metadata().Kind(), action)
+        if cb:
+            result = cb(obj, self)
+            if result is not None:
+                return result
+
+        return obj
+
     def Get(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> store.Object:
         return self._inner.Get(identity, *opt)
 
     def List(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> store.ObjectList:
         return self._inner.List(identity, *opt)
 
+    def Count(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> int:
+        return self._inner.Count(identity, *opt)
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        return self._inner.Exists(identity, *opt)
+
+    def Iterate(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> Iterator[store.Object]:
+        return self._inner.Iterate(identity, *opt)
+
 
 def HandlerStoreFactory(inner: store.Store, handlers: Dict[str, Dict[str, Callable]] = {}) -> store.Store:
     return HandlerStore(inner, handlers)
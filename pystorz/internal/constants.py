@@ -7,6 +7,9 @@ ErrObjectIdentityMismatch = "object identity mismatch"
 ErrInvalidFilter = "invalid filter key"
 ErrInvalidPath = "invalid request path"
 ErrInvalidRequest = "invalid request content"
+ErrInvalidOption = "option not supported by this operation"
+ErrNotQueryable = "property is only stored compressed, index it to filter or order by it"
+ErrPoolTimeout = "timed out waiting for a database connection"
 
 DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
@@ -0,0 +1,330 @@
+import numpy
+
+from pystorz.store import options
+
+
+# ints beyond this lose precision as floats, they stay out of the columns
+_EXACT = 2 ** 53
+
+
+class _Column:
+    # the values at one path, one row per record. its family is that of
+    # the first value set, numbers are kept as floats and strings, which
+    # include datetimes, as objects. missing values are not valid, values
+    # of another family, or ones the row filter would compare otherwise,
+    # are irregular: a column with any cannot answer filters
+    def __init__(self, capacity):
+        self.family = None
+        self.values = None
+        self.valid = numpy.zeros(capacity, dtype=bool)
+        self.irregular = numpy.zeros(capacity, dtype=bool)
+        self.irregulars = 0
+
+    def set(self, row, value):
+        if self.irregular[row]:
+            self.irregular[row] = False
+            self.irregulars -= 1
+
+        self.valid[row] = False
+        if value is None:
+            return
+
+        family = _family(value)
+        if family is not None and self.family is None:
+            self.family = family
+            if family == "number":
+                self.values = numpy.zeros(len(self.valid), dtype=float)
+            else:
+                self.values = numpy.full(len(self.valid), "", dtype=object)
+
+        if family is None or family != self.family:
+            self.irregular[row] = True
+            self.irregulars += 1
+            return
+
+        self.values[row] = value
+        self.valid[row] = True
+
+    def move(self, src, dst):
+        # dst takes over the value of src, which is left empty
+        self.set(dst, None)
+        self.valid[dst] = self.valid[src]
+        self.irregular[dst] = self.irregular[src]
+        if self.values is not None:
+            self.values[dst] = self.values[src]
+
+        self.valid[src] = False
+        self.irregular[src] = False
+
+    def grow(self, capacity):
+        self.valid = _grown(self.valid, capacity, False)
+        self.irregular = _grown(self.irregular, capacity, False)
+        if self.values is not None:
+            self.values = _grown(self.values, capacity, 0.0 if self.family == "number" else "")
+
+
+class ColumnTable:
+    # the records of a kind as rows, with the values at some paths kept
+    # in numpy columns. a removed row is filled with the last one, so
+    # rows stay dense and in no particular order
+    def __init__(self, paths, capacity=64):
+        self.paths = list(paths)
+        self._records = []
+        self._keys = []
+        self._row = {}
+        self._pkeys = numpy.empty(capacity, dtype=object)
+        self._columns = {path: _Column(capacity) for path in self.paths}
+
+    def add(self, key, record, values, pkey):
+        # values: path -> value, as index.path_values finds them
+        row = len(self._records)
+        if row == len(self._pkeys):
+            capacity = 2 * row
+            self._pkeys = _grown(self._pkeys, capacity, None)
+            for column in self._columns.values():
+                column.grow(capacity)
+
+        self._records.append(record)
+        self._keys.append(key)
+        self._row[key] = row
+        self._pkeys[row] = pkey
+        for path, column in self._columns.items():
+            column.set(row, values.get(path))
+
+    def remove(self, key):
+        row = self._row.pop(key, None)
+        if row is None:
+            return
+
+        last = len(self._records) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._records[row] = self._records[last]
+            self._keys[row] = moved
+            self._row[moved] = row
+            self._pkeys[row] = self._pkeys[last]
+            for column in self._columns.values():
+                column.move(last, row)
+        else:
+            for column in self._columns.values():
+                column.set(row, None)
+
+        self._records.pop()
+        self._keys.pop()
+        self._pkeys[last] = None
+
+    def serves(self, flt) -> bool:
+        # whether some leaf of flt can be answered by a column
+        flt = _unwrap(flt)
+        if isinstance(flt, (options.AndOption, options.OrOption)):
+            return any(self.serves(f) for f in flt.filters)
+        if isinstance(flt, options.NotOption):
+            return self.serves(flt.filter)
+
+        column = self._columns.get(getattr(flt, "key", None))
+        return column is not None and column.irregulars == 0
+
+    def orders(self, path) -> bool:
+        column = self._columns.get(path)
+        return column is not None and column.irregulars == 0
+
+    def view(self, paths):
+        # -> a copy of the rows and the columns at paths that a reader
+        # can work on while writers go on changing the table
+        n = len(self._records)
+        columns = {}
+        for path in paths:
+            column = self._columns.get(path)
+            if column is None or column.irregulars > 0:
+                continue
+
+            values = column.values[:n].copy() if column.values is not None else None
+            columns[path] = (column.family, values, column.valid[:n].copy())
+
+        return View(list(self._records), self._pkeys[:n].copy(), columns)
+
+
+class View:
+    def __init__(self, records, pkeys, columns):
+        self.records = records
+        self.pkeys = pkeys
+        self.columns = columns
+
+    def select(self, flt, compile):
+        # -> mask of the rows flt matches, all of them without one.
+        # leaves without a column are compiled by compile(leaf) and go
+        # row by row, and a row that makes the filter raise is left
+        # out, as the row evaluation would
+        everything = numpy.ones(len(self.records), dtype=bool)
+        if not flt:
+            return everything
+
+        mask, errors = self._evaluate(flt, compile, everything)
+        return mask & ~errors
+
+    def pick(self, rows) -> list:
+        # -> the records at rows, a mask or row numbers
+        if rows.dtype == bool:
+            rows = numpy.flatnonzero(rows)
+        return [self.records[i] for i in rows]
+
+    def order(self, selected, path, descending, limit=None):
+        # -> the selected rows ordered by (value at path, pkey), at most
+        # limit of them. None when the column cannot order them all
+        column = self.columns.get(path)
+        rows = numpy.flatnonzero(selected)
+        if column is None or column[1] is None or not column[2][rows].all():
+            return None
+
+        values = column[1][rows]
+        if limit is not None and limit < len(rows):
+            # only the rows up to the value of the last one on the
+            # page need sorting, ties at that value included
+            if limit == 0:
+                return rows[:0]
+
+            if descending:
+                kth = values[numpy.argpartition(values, len(rows) - limit)[len(rows) - limit]]
+                keep = values >= kth
+            else:
+                kth = values[numpy.argpartition(values, limit - 1)[limit - 1]]
+                keep = values <= kth
+
+            rows, values = rows[keep], values[keep]
+
+        # pkeys break ties, the keys are unique so descending is the reverse
+        order = numpy.argsort(self.pkeys[rows], kind="stable")
+        order = order[numpy.argsort(values[order], kind="stable")]
+        if descending:
+            order = order[::-1]
+
+        return rows[order[:limit]]
+
+    def _evaluate(self, flt, compile, where):
+        # -> (matches, errors), meaningful for the rows in where only.
+        # And and Or stop at the first filter that decides a row, so
+        # the errors of the filters after it do not count
+        flt = _unwrap(flt)
+
+        if isinstance(flt, options.AndOption):
+            mask = where.copy()
+            errors = numpy.zeros(len(where), dtype=bool)
+            for f in flt.filters:
+                alive = mask & ~errors
+                m, e = self._evaluate(f, compile, alive)
+                errors |= alive & e
+                mask &= m
+            return mask, errors
+
+        if isinstance(flt, options.OrOption):
+            mask = numpy.zeros(len(where), dtype=bool)
+            errors = numpy.zeros(len(where), dtype=bool)
+            for f in flt.filters:
+                alive = where & ~mask & ~errors
+                m, e = self._evaluate(f, compile, alive)
+                errors |= alive & e
+                mask |= alive & m
+            return mask, errors
+
+        if isinstance(flt, options.NotOption):
+            m, e = self._evaluate(flt.filter, compile, where)
+            return ~m, e
+
+        column = self.columns.get(getattr(flt, "key", None))
+        if column is None:
+            return _rows(self.records, compile(flt), where)
+
+        return _leaf(flt, *column)
+
+
+def _leaf(flt, family, values, valid):
+    # the row filter, predicate.compile_filter, over a column of one family
+    nothing = numpy.zeros(len(valid), dtype=bool)
+
+    if isinstance(flt, options.EqOption):
+        if flt.value is None:
+            return ~valid, nothing
+        if family is None or _family(flt.value) != family:
+            return nothing, nothing
+        return valid & (values == flt.value), nothing
+
+    if isinstance(flt, options.InOption):
+        wanted = [v for v in flt.values if v is not None and _family(v) == family]
+        if family is None or len(wanted) == 0:
+            return nothing, nothing
+        return valid & numpy.isin(values, wanted), nothing
+
+    if not isinstance(flt, _RANGES):
+        return nothing, numpy.ones(len(valid), dtype=bool)
+
+    if family is None:
+        return nothing, nothing
+
+    # numbers compare as numbers when the value reads as one, strings
+    # never do, they hold no value that would
+    value = flt.value
+    if family == "number":
+        value = _numeric(flt.value)
+    elif not isinstance(value, str):
+        value = None
+
+    if value is None:
+        # comparing with a value of another type raises
+        return nothing, valid.copy()
+
+    if isinstance(flt, options.LtOption):
+        return valid & (values < value), nothing
+    if isinstance(flt, options.LteOption):
+        return valid & (values <= value), nothing
+    if isinstance(flt, options.GtOption):
+        return valid & (values > value), nothing
+    return valid & (values >= value), nothing
+
+
+def _rows(records, match, where):
+    mask = numpy.zeros(len(records), dtype=bool)
+    errors = numpy.zeros(len(records), dtype=bool)
+    for i in numpy.flatnonzero(where):
+        try:
+            mask[i] = match(records[i])
+        except Exception:
+            errors[i] = True
+
+    return mask, errors
+
+
+_RANGES = (options.LtOption, options.LteOption, options.GtOption, options.GteOption)
+
+
+def _unwrap(flt):
+    if isinstance(flt, options._ListDeleteOption):
+        copt = options.CommonOptionHolderFactory()
+        flt.ApplyFunction()(copt)
+        return copt.filter
+
+    return flt
+
+
+def _family(value):
+    if isinstance(value, bool) or isinstance(value, float):
+        return "number"
+    if isinstance(value, int):
+        return "number" if -_EXACT <= value <= _EXACT else None
+    if isinstance(value, str):
+        # the row filter compares strings that read as numbers as numbers
+        return "str" if _numeric(value) is None else None
+    return None
+
+
+def _numeric(value):
+    try:
+        return float(value)
+    except Exception:
+        return None
+
+
+def _grown(array, capacity, fill):
+    grown = numpy.empty(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    grown[len(array):] = fill
+    return grown
@@ -0,0 +1,121 @@
+import types
+import datetime
+
+from pystorz.store import store
+
+# method name prefixes that change the object they are called on
+_MUTATORS = ("Set", "From")
+
+# methods whose results are fresh copies, handed out untouched
+_FRESH = {"Clone", "ToJson", "ToDict"}
+
+_IMMUTABLE = (
+    str, bytes, int, float, complex, bool, type(None),
+    datetime.datetime, datetime.date, datetime.time,
+)
+
+
+class _Root:
+    __slots__ = ("shared", "own")
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.own = None
+
+
+class Frozen:
+    # a stored object handed out without copying it. reads go to the
+    # shared object; the first write through this handle, or through
+    # anything reached from it, swaps in a private clone first, which
+    # every later call then resolves against. lists come back as
+    # tuples, their elements still go through the handle
+    __slots__ = ("_root", "_path")
+
+    def __init__(self, root, path=()):
+        object.__setattr__(self, "_root", root)
+        object.__setattr__(self, "_path", path)
+
+    def _resolve(self, thaw=False):
+        root = self._root
+        if thaw and root.own is None:
+            root.own = root.shared.Clone()
+
+        target = root.own if root.own is not None else root.shared
+        for step in self._path:
+            target = _step(target, step)
+        return target
+
+    @property
+    def __class__(self):
+        # isinstance sees the class of the object behind the handle
+        return type(self._resolve())
+
+    def __getattr__(self, name):
+        value = getattr(self._resolve(), name)
+        if not callable(value):
+            return _wrap(self, (".", name), value)
+
+        if name.startswith(_MUTATORS):
+            def mutate(*args, **kwargs):
+                return getattr(self._resolve(True), name)(*args, **kwargs)
+            return mutate
+
+        if name in _FRESH:
+            return value
+
+        def call(*args, **kwargs):
+            return _wrap(self, (name, args, kwargs), value(*args, **kwargs))
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(True), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, Frozen):
+            other = other._resolve()
+        return self._resolve() == other
+
+    def __hash__(self):
+        return hash(self._resolve())
+
+    def __str__(self):
+        return str(self._resolve())
+
+    def __repr__(self):
+        return repr(self._resolve())
+
+
+def Freeze(obj):
+    return Frozen(_Root(obj))
+
+
+def _step(target, step):
+    if step[0] == ".":
+        return getattr(target, step[1])
+    if step[0] == "[]":
+        return target[step[1]]
+
+    name, args, kwargs = step
+    return getattr(target, name)(*args, **kwargs)
+
+
+def _wrap(parent, step, value):
+    if isinstance(value, _IMMUTABLE):
+        return value
+
+    # FromString changes an identity in place, hand out a copy
+    if isinstance(value, store.ObjectIdentity):
+        return store.ObjectIdentity(str(value))
+
+    path = parent._path + (step,)
+    if isinstance(value, (list, tuple)):
+        items = Frozen(parent._root, path)
+        return tuple(
+            _wrap(items, ("[]", i), v) for i, v in enumerate(value))
+
+    if isinstance(value, dict):
+        items = Frozen(parent._root, path)
+        return types.MappingProxyType({
+            k: _wrap(items, ("[]", k), v) for k, v in value.items()})
+
+    return Frozen(parent._root, path)
@@ -0,0 +1,245 @@
+import json
+import bisect
+
+from pystorz.store import options, predicate
+
+
+def path_values(obj, paths) -> dict:
+    # same lookup as utils.object_path, with a single ToDict for all paths
+    data = obj.ToDict()
+    return {path: predicate.path_getter(path)(data) for path in paths}
+
+
+class FieldIndex:
+    # indexes the records of a kind by the value at one path.
+    # hash buckets (value -> {key: record}) answer Eq and In, the
+    # entries, (value, pkey, key, record) sorted by their first three,
+    # answer ranges and walk records in Order. the sort keys are kept
+    # in a list of their own, side by side with the entries, for plain
+    # bisect to search. values of another type than the first one
+    # indexed, and missing values, are only kept in the buckets.
+    # results are copies, never live views of the index
+    def __init__(self, path):
+        self.path = path
+        self._buckets = {}
+
+        self._family = None
+        self._entries = []
+        self._keys = []
+        # key -> entry, to find it again on removal,
+        # and the keys left out of the sorted entries
+        self._entry = {}
+        self._unsorted = set()
+
+    def add(self, key, record, value, pkey):
+        entry = self._place(key, record, value, pkey)
+        if entry is not None:
+            k = _sort(entry)
+            i = bisect.bisect_right(self._keys, k)
+            self._keys.insert(i, k)
+            self._entries.insert(i, entry)
+
+    def extend(self, items):
+        # adds many (key, record, value, pkey) at once, sorting them once
+        entries = [e for e in (self._place(*item) for item in items) if e is not None]
+        self._entries.extend(entries)
+        self._entries.sort(key=_sort)
+        self._keys = [_sort(e) for e in self._entries]
+
+    def _place(self, key, record, value, pkey):
+        # -> the entry to sort in, None when it stays out of the order
+        hashed = _hashable(value)
+        bucket = self._buckets.get(hashed)
+        if bucket is None:
+            bucket = self._buckets[hashed] = {}
+
+        bucket[key] = record
+
+        family = _family(value)
+        if self._family is None and family is not None:
+            self._family = family
+
+        entry = (value, pkey, key, record)
+        self._entry[key] = entry
+        if family is not None and family == self._family:
+            return entry
+
+        self._unsorted.add(key)
+        return None
+
+    def remove(self, key):
+        entry = self._entry.pop(key, None)
+        if entry is None:
+            return
+
+        hashed = _hashable(entry[0])
+        bucket = self._buckets[hashed]
+        del bucket[key]
+        if len(bucket) == 0:
+            del self._buckets[hashed]
+
+        if key in self._unsorted:
+            self._unsorted.remove(key)
+        else:
+            i = bisect.bisect_left(self._keys, _sort(entry))
+            del self._keys[i]
+            del self._entries[i]
+
+    def lookup(self, values) -> dict:
+        if len(values) == 1:
+            return dict(self._buckets.get(_hashable(values[0]), {}))
+
+        found = {}
+        for v in values:
+            found.update(self._buckets.get(_hashable(v), {}))
+        return found
+
+    def range(self, flt) -> dict:
+        # records matching a Lt, Lte, Gt or Gte filter, None when the
+        # index cannot tell: filters compare numbers, so only numeric
+        # indexes with nothing but missing values left out are exact
+        if self._family not in (None, "number"):
+            return None
+
+        if any(self._entry[k][0] is not None for k in self._unsorted):
+            return None
+
+        try:
+            value = float(flt.value)
+        except Exception:
+            return None
+
+        # (value,) sorts before and (value, _TOP) after every
+        # key with that value
+        start, stop = 0, len(self._entries)
+        if isinstance(flt, options.GtOption):
+            start = bisect.bisect_right(self._keys, (value, _TOP))
+        elif isinstance(flt, options.GteOption):
+            start = bisect.bisect_left(self._keys, (value,))
+        elif isinstance(flt, options.LtOption):
+            stop = bisect.bisect_left(self._keys, (value,))
+        elif isinstance(flt, options.LteOption):
+            stop = bisect.bisect_right(self._keys, (value, _TOP))
+        else:
+            return None
+
+        return {e[2]: e[3] for e in self._entries[start:stop]}
+
+    def walk(self, descending=False, after=None, limit=None):
+        # records in (value, pkey) order, past the after (value, pkey)
+        # when given, the way a sort of all of them would list them, at
+        # most limit of them. None when some records cannot be ordered
+        # with the others. the entries are copied right away, the
+        # records are produced as the result is consumed
+        if len(self._unsorted) > 0:
+            return None
+
+        entries = self._entries
+        start, stop = 0, len(entries)
+        if after is not None:
+            if _family(after[0]) != self._family:
+                return None
+
+            try:
+                if descending:
+                    stop = bisect.bisect_left(self._keys, tuple(after))
+                else:
+                    start = bisect.bisect_right(self._keys, (*after, _TOP))
+            except TypeError:
+                return None
+
+        if descending:
+            if limit is not None:
+                start = max(start, stop - limit)
+            return (e[3] for e in reversed(entries[start:stop]))
+
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return (e[3] for e in entries[start:stop])
+
+
+def lookup(indexes, flt):
+    # -> (records by key, exact) from the indexes that serve flt,
+    # (None, False) when none does. exact means no record of the
+    # result needs the filter evaluated again
+    if isinstance(flt, options._ListDeleteOption):
+        copt = options.CommonOptionHolderFactory()
+        flt.ApplyFunction()(copt)
+        flt = copt.filter
+
+    if isinstance(flt, options.EqOption):
+        index = indexes.get(flt.key)
+        if index is None:
+            return None, False
+        return index.lookup([flt.value]), True
+
+    if isinstance(flt, options.InOption):
+        index = indexes.get(flt.key)
+        if index is None:
+            return None, False
+        # a missing value never matches In
+        return index.lookup([v for v in flt.values if v is not None]), True
+
+    if isinstance(flt, _RANGES):
+        index = indexes.get(flt.key)
+        if index is None:
+            return None, False
+
+        found = index.range(flt)
+        return found, found is not None
+
+    if isinstance(flt, options.AndOption):
+        found = []
+        exact = True
+        for f in flt.filters:
+            records, f_exact = lookup(indexes, f)
+            if records is None:
+                exact = False
+            else:
+                found.append(records)
+                exact = exact and f_exact
+
+        if len(found) == 0:
+            return None, False
+
+        found.sort(key=len)
+        smallest, rest = found[0], found[1:]
+        return {
+            k: r for k, r in smallest.items() if all(k in o for o in rest)
+        }, exact
+
+    return None, False
+
+
+_RANGES = (options.LtOption, options.LteOption, options.GtOption, options.GteOption)
+
+
+def _sort(entry):
+    return entry[:3]
+
+
+class _Top:
+    # sorts after any value it is compared with
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_TOP = _Top()
+
+
+def _family(value):
+    if isinstance(value, (bool, int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "str"
+    return None
+
+
+def _hashable(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+
+    return value
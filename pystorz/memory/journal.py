@@ -0,0 +1,277 @@
+import os
+import json
+import typing
+import logging
+import threading
+import contextlib
+
+log = logging.getLogger(__name__)
+
+_FSYNC = ["always", "interval", "never"]
+
+_SNAPSHOT = "snapshot"
+_SEGMENT = "wal.{:010d}"
+
+
+class Journal:
+    # keeps a MemoryStore on disk: every write is appended to a log
+    # segment, and every snapshot_ops writes the whole store is written
+    # to a snapshot by a background thread, after which the segments it
+    # covers are removed. recovery loads the snapshot and replays the
+    # segments written since.
+    #
+    # lines start with the "id/<id>" paths they concern, tab separated,
+    # so recovery follows writes without decoding them: a snapshot line
+    # is "<path>\t<object>", a segment line "<op>\t<removed path>\t
+    # <written path>\t<object>", with the paths that do not apply empty.
+    # json escapes tabs and newlines within the object.
+    #
+    # fsync: "always" syncs every write (or batch) before it returns,
+    # "interval" syncs in the background every fsync_ms (a power loss
+    # drops at most that much), "never" leaves it to the os. writes
+    # always reach the os before they return, so a crash of the process
+    # alone loses nothing
+    def __init__(self, path, fsync="always", fsync_ms=100, snapshot_ops=100000):
+        if fsync not in _FSYNC:
+            raise Exception("invalid fsync: {}, expected one of {}".format(fsync, _FSYNC))
+        if snapshot_ops is not None and snapshot_ops <= 0:
+            raise Exception("invalid snapshot_ops: {}".format(snapshot_ops))
+
+        self._path = path
+        self._fsync = fsync
+        self._fsync_ms = fsync_ms
+        self._snapshot_ops = snapshot_ops
+
+        self._file = None
+        self._generation = 0
+        self._ops = 0
+        # batches sync once, when the outermost one ends
+        self._held = 0
+        self._dirty = False
+
+        self._snapshotter = None
+        self._syncer = None
+        self._closed = threading.Event()
+
+        os.makedirs(path, exist_ok=True)
+
+    def recover(self, schema) -> typing.Iterator:
+        # -> the objects stored when the journal was last written, made
+        # as they are consumed. until then each is kept as the json last
+        # written for it, decoded once: strings are not tracked by the
+        # garbage collector, the dicts they decode to would be walked by
+        # every collection
+        state = {}
+        generation = 0
+
+        snapshot = os.path.join(self._path, _SNAPSHOT)
+        if os.path.exists(snapshot):
+            generation = _load_snapshot(snapshot, state)
+
+        segments = []
+        for gen, name in self._segments():
+            if gen < generation:
+                # covered by the snapshot, left over by a crash
+                os.remove(name)
+            else:
+                segments.append((gen, name))
+
+        for i, (gen, name) in enumerate(segments):
+            self._ops += _replay(name, state, last=(i == len(segments) - 1))
+
+        # writes go on at the end of the last segment
+        self._generation = segments[-1][0] if len(segments) > 0 else max(generation, 1)
+        self._file = open(self._segment(self._generation), "a", encoding="utf-8")
+        _sync_dir(self._path)
+
+        if self._fsync == "interval":
+            self._syncer = threading.Thread(target=self._syncLoop, daemon=True)
+            self._syncer.start()
+
+        log.info("recovered {} objects from {}".format(len(state), self._path))
+        return _objects(state, schema)
+
+    def append(self, op, key, obj):
+        # op is "c"reate, "u"pdate or "d"elete, key the "id/<id>" path
+        # of the object the update or delete applies to
+        if obj is None:
+            self._file.write("{}\t{}\t\t\n".format(op, key))
+        else:
+            self._file.write("{}\t{}\tid/{}\t{}\n".format(
+                op, key or "", obj.Metadata().Identity().Key(), json.dumps(obj.ToDict())))
+        self._file.flush()
+        self._ops += 1
+
+        if self._fsync == "always":
+            if self._held > 0:
+                self._dirty = True
+            else:
+                os.fsync(self._file.fileno())
+
+    @contextlib.contextmanager
+    def hold(self):
+        # the writes made meanwhile are synced together at the end
+        self._held += 1
+        try:
+            yield
+        finally:
+            self._held -= 1
+            if self._held == 0 and self._dirty:
+                self._dirty = False
+                os.fsync(self._file.fileno())
+
+    def due(self) -> bool:
+        # whether enough was written since the last snapshot for a new one
+        if self._snapshot_ops is None or self._ops < self._snapshot_ops:
+            return False
+        return self._snapshotter is None or not self._snapshotter.is_alive()
+
+    def snapshot(self, records):
+        # called by the writer, with records a consistent copy of the
+        # store: later writes go to a new segment while the records are
+        # written out in the background
+        self.wait()
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+        self._generation += 1
+        self._file = open(self._segment(self._generation), "a", encoding="utf-8")
+        self._ops = 0
+
+        self._snapshotter = threading.Thread(
+            target=self._writeSnapshot, args=(records, self._generation), daemon=True)
+        self._snapshotter.start()
+
+    def wait(self):
+        # until the snapshot in progress, if any, is written
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+
+    def close(self):
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        self.wait()
+
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _writeSnapshot(self, records, generation):
+        tmp = os.path.join(self._path, _SNAPSHOT + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"generation": generation, "count": len(records)}) + "\n")
+                for r in records:
+                    f.write("id/{}\t{}\n".format(r.Metadata().Identity().Key(), r.ToJson()))
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp, os.path.join(self._path, _SNAPSHOT))
+            _sync_dir(self._path)
+        except Exception as e:
+            # the segments are kept, recovery still has everything
+            log.error("snapshot failed: {}".format(e))
+            return
+
+        for gen, name in self._segments():
+            if gen < generation:
+                os.remove(name)
+
+        log.info("snapshot of {} objects written".format(len(records)))
+
+    def _syncLoop(self):
+        while not self._closed.wait(self._fsync_ms / 1000.0):
+            f = self._file
+            try:
+                if f is not None:
+                    os.fsync(f.fileno())
+            except (OSError, ValueError):
+                # closed by a snapshot switching segments meanwhile
+                pass
+
+    def _segment(self, generation):
+        return os.path.join(self._path, _SEGMENT.format(generation))
+
+    def _segments(self):
+        # -> [(generation, path)] of the log segments, oldest first
+        segments = []
+        for name in os.listdir(self._path):
+            if name.startswith("wal."):
+                segments.append((int(name[4:]), os.path.join(self._path, name)))
+
+        return sorted(segments)
+
+
+def _load_snapshot(name, state) -> int:
+    with open(name, "rb") as f:
+        header = json.loads(f.readline())
+        for line in f:
+            path, data = line.split(b"\t", 1)
+            state[path.decode()] = data
+
+    if len(state) != header["count"]:
+        raise Exception("snapshot {} is incomplete: {} of {} objects".format(
+            name, len(state), header["count"]))
+
+    return header["generation"]
+
+
+def _objects(state, schema):
+    # the objects of state, decoded one at a time in the order they
+    # were first written, each dropped once it is made
+    for key in list(state.keys()):
+        data = json.loads(state.pop(key))
+        obj = schema.ObjectForKind(data["metadata"]["kind"])
+        if obj is None:
+            raise Exception("cannot find kind: {}".format(data["metadata"]["kind"]))
+        obj.FromDict(data)
+        yield obj
+
+
+def _replay(name, state, last) -> int:
+    # -> the number of writes replayed. a write torn by a crash can only
+    # be the end of the last segment, it never returned to its caller
+    # and is dropped
+    good = 0
+    ops = 0
+    with open(name, "rb") as f:
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete line")
+                op, removed, written, data = line.split(b"\t", 3)
+                if op not in (b"c", b"u", b"d"):
+                    raise ValueError("unknown op")
+            except ValueError:
+                if not last:
+                    raise Exception("corrupt journal segment: {}".format(name))
+
+                log.warning("dropping a torn write at the end of {}".format(name))
+                break
+
+            if op != b"c":
+                state.pop(removed.decode(), None)
+            if op != b"d":
+                state[written.decode()] = data
+
+            good += len(line)
+            ops += 1
+
+    if os.path.getsize(name) != good:
+        os.truncate(name, good)
+
+    return ops
+
+
+def _sync_dir(path):
+    # makes created, renamed and removed files durable
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
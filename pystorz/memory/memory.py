@@ -1,106 +1,74 @@
+import gc
+import time
+import heapq
+import typing
 import logging
+import itertools
+import threading
+import contextlib
 
 from pystorz.internal import constants
-from pystorz.store import store, options, utils
+from pystorz.store import store, options, predicate
+from pystorz.memory import index, frozen as _frozen
+from pystorz.memory.journal import Journal
+from pystorz.memory.tier import TieredStore
 
 
 log = logging.getLogger(__name__)
 
 
-def _match_filter(filterOption, object, sample):
-    # unwrap _ListDeleteOption
-    if isinstance(filterOption, options._ListDeleteOption):
-        copt = options.CommonOptionHolderFactory()
-        filterOption.ApplyFunction()(copt)
-        filterOption = copt.filter
-
-    if isinstance(filterOption, options.AndOption):
-        return all(_match_filter(f, object, sample) for f in filterOption.filters)
-
-    if isinstance(filterOption, options.OrOption):
-        return any(_match_filter(f, object, sample) for f in filterOption.filters)
-
-    if isinstance(filterOption, options.NotOption):
-        return not _match_filter(filterOption.filter, object, sample)
-
-    # validate key exists on sample
-    if utils.object_path(sample, filterOption.key) is None:
-        raise Exception(constants.ErrInvalidFilter)
-
-    val = utils.object_path(object, filterOption.key)
-
-    # helper to compare numbers represented as strings
-    def _try_numeric(a):
-        try:
-            return float(a)
-        except Exception:
-            return None
-
-    if isinstance(filterOption, options.InOption):
-        comp_vals = filterOption.values
-        if val is None:
-            return False
-        return val in comp_vals
-
-    if isinstance(filterOption, options.EqOption):
-        return val == filterOption.value
-
-    if isinstance(filterOption, options.LtOption):
-        if val is None:
-            return False
-        a = _try_numeric(val)
-        b = _try_numeric(filterOption.value)
-        if a is not None and b is not None:
-            return a < b
-        return val < filterOption.value
-
-    if isinstance(filterOption, options.GtOption):
-        if val is None:
-            return False
-        a = _try_numeric(val)
-        b = _try_numeric(filterOption.value)
-        if a is not None and b is not None:
-            return a > b
-        return val > filterOption.value
-
-    if isinstance(filterOption, options.LteOption):
-        if val is None:
-            return False
-        a = _try_numeric(val)
-        b = _try_numeric(filterOption.value)
-        if a is not None and b is not None:
-            return a <= b
-        return val <= filterOption.value
-
-    if isinstance(filterOption, options.GteOption):
-        if val is None:
-            return False
-        a = _try_numeric(val)
-        b = _try_numeric(filterOption.value)
-        if a is not None and b is not None:
-            return a >= b
-        return val >= filterOption.value
-
-    raise Exception(constants.ErrInvalidFilter)
-
-
 class MemoryStore(store.Store):
-    def __init__(self, Schema):
+    def __init__(self, Schema, indexes=None, frozen=False, journal: Journal = None, columns=None):
         self._schema = Schema
-        # storage: dict[type] -> list of records
-        # record: {idpath, pkpath, pkey, type, object}
+        # records by "id/<id>" and "<type>/<pkey>" paths,
+        # and by type, keyed by their "id/<id>" path
         self._id_index = {}
         self._type_index = {}
+        # indexes on the paths the model declares, plus the ones given
+        # here for every kind: dict[type] -> dict[path] -> FieldIndex
+        self._extra_indexes = list(indexes or [])
+        self._indexes = {}
+        # opt-in, the values at these scalar paths are kept in numpy
+        # columns per kind, filters over them run as vectorized masks
+        self._columns = list(columns or [])
+        self._tables = {}
+        if len(self._columns) > 0:
+            from pystorz.memory import columnar
+            self._columnar = columnar
+        # opt-in, stored objects are handed out shared instead of cloned,
+        # wrapped so that the first write through them makes the copy
+        self._out = _frozen.Freeze if frozen else _clone
+        # serializes writers, reentrant so batches can reuse single operations
+        self._lock = threading.RLock()
+        # readers never lock: they copy what they need and check the
+        # version did not move meanwhile. it is odd while a write runs
+        self._version = 0
+        self._writer = None
+
+        # opt-in, writes are logged to disk and replayed on startup
+        self._journal = journal
+        if journal is not None:
+            # everything loaded stays, collections would only walk the
+            # growing store over and over
+            collecting = gc.isenabled()
+            gc.disable()
+            try:
+                self._load(journal.recover(Schema))
+            finally:
+                if collecting:
+                    gc.enable()
 
     def Get(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> store.Object:
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
         log.info(f"get {identity.Path()}")
 
-        if identity.Path() in self._id_index:
-            return self._id_index[identity.Path()].Clone()
+        # a single lookup, a writer may remove the record at any time
+        record = self._id_index.get(identity.Path())
+        if record is None:
+            raise Exception(constants.ErrNoSuchObject)
 
-        raise Exception(constants.ErrNoSuchObject)
+        return self._out(record)
 
     def Create(self, obj: store.Object, *opt: options.CreateOption) -> store.Object:
         if obj is None:
@@ -108,21 +76,26 @@ class MemoryStore(store.Store):
 
         log.info(f"create {obj.Metadata().Kind()} {obj.PrimaryKey()}")
 
-        lk = obj.Metadata().Kind().lower()
-        pkpath = f"{lk}/{obj.PrimaryKey()}"
-        idpath = f"id/{obj.Metadata().Identity().Key()}"
-        if idpath in self._id_index or pkpath in self._id_index:
-            raise Exception(constants.ErrObjectExists)
+        with self._writing():
+            lk = obj.Metadata().Kind().lower()
+            pkpath = f"{lk}/{obj.PrimaryKey()}"
+            idpath = f"id/{obj.Metadata().Identity().Key()}"
+            if idpath in self._id_index or pkpath in self._id_index:
+                raise Exception(constants.ErrObjectExists)
+
+            if self._journal is not None:
+                self._journal.append("c", None, obj)
 
-        cloned = obj.Clone()
+            cloned = obj.Clone()
 
-        self._id_index[idpath] = cloned
-        self._id_index[pkpath] = cloned
-        if lk not in self._type_index:
-            self._type_index[lk] = dict()
-        self._type_index[lk][cloned.ToJson()] = cloned
+            self._id_index[idpath] = cloned
+            self._id_index[pkpath] = cloned
+            if lk not in self._type_index:
+                self._type_index[lk] = dict()
+            self._type_index[lk][idpath] = cloned
+            self._indexRecord(lk, idpath, cloned)
 
-        return cloned.Clone()
+            return self._out(cloned)
 
     def List(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> store.ObjectList:
         if identity is None:
@@ -136,84 +109,313 @@ class MemoryStore(store.Store):
         for o in opt:
             o.ApplyFunction()(copt)
 
-        records = self._type_index.get(identity.Type(), dict())
-        filtered = records.values()
+        res = store.ObjectList()
+        for r in self._select(identity, copt):
+            res.append(self._out(r))
+
+        return res
+
+    def Count(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info(f"count {identity.Path()}")
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
+
+        copt = options.CommonOptionHolderFactory()
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        if not copt.filter:
+            return len(self._type_index.get(identity.Type(), dict()))
 
+        sample = self._schema.ObjectForKind(identity.Type())
+        if sample is None:
+            raise Exception(constants.ErrNoSuchObject)
+        match = predicate.compile_filter(copt.filter, sample)
+        match(sample)
+
+        records, exact, view = self._read(lambda: self._candidates(identity.Type(), copt))
+        if view is not None:
+            return int(view.select(copt.filter, lambda f: predicate.compile_filter(f, sample)).sum())
+        if exact:
+            return len(records)
+
+        count = 0
+        for r in records:
+            try:
+                if match(r):
+                    count += 1
+            except Exception as e:
+                log.error(str(e))
+                continue
+
+        return count
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info(f"exists {identity.Path()}")
+
+        return identity.Path() in self._id_index
+
+    def Iterate(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> typing.Iterator[store.Object]:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info(f"iterate {identity.Path()}")
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
+
+        copt = options.CommonOptionHolderFactory()
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        # the selection only holds references, objects are
+        # cloned one at a time as the caller consumes them
+        return (self._out(r) for r in self._select(identity, copt))
+
+    def _select(self, identity, copt):
+        sample = None
         if copt.filter:
             sample = self._schema.ObjectForKind(identity.Type())
             if sample is None:
                 raise Exception(constants.ErrNoSuchObject)
-            _match_filter(copt.filter, sample, sample)
+            match = predicate.compile_filter(copt.filter, sample)
+            match(sample)
+
+        # everything below works on what was copied from one version
+        filtered, exact, walked, view = self._read(lambda: self._capture(identity.Type(), copt))
 
+        # pagination, an index walk stops at the end of the page
+        start, stop = 0, None
+        if copt.page_offset is not None and copt.page_offset > 0:
+            start = int(copt.page_offset)
+        if copt.page_size is not None and copt.page_size > 0:
+            stop = start + int(copt.page_size)
+
+        ordered = False
+        if view is not None:
+            selected = view.select(copt.filter, lambda f: predicate.compile_filter(f, sample))
+            rows = None
+            if copt.order_by and copt.after_pkey is None:
+                rows = view.order(selected, copt.order_by, not copt.order_incremental, stop)
+
+            ordered = rows is not None
+            filtered = view.pick(rows if ordered else selected)
+        elif copt.filter and not exact:
+            candidates = filtered
             filtered = []
-            for j, r in records.items():
+            for r in candidates:
                 try:
-                    if _match_filter(copt.filter, r, sample):
+                    if match(r):
                         filtered.append(r)
                 except Exception as e:
                     log.error(str(e))
                     continue
-            
-        # ordering
-        if copt.order_by:
-            filtered = sorted(
-                filtered,
-                key=lambda x: utils.object_path(x, copt.order_by),
-                reverse=(not copt.order_incremental))
-
-        # pagination
-        if copt.page_offset is not None and copt.page_offset > 0:
-            filtered = filtered[int(copt.page_offset):]
-        if copt.page_size is not None and copt.page_size > 0:
-            filtered = filtered[: int(copt.page_size)]
 
-        res = store.ObjectList()
-        for r in filtered:
-            res.append(r.Clone())
+        # ordering, the primary key breaks ties so pages never overlap
+        if walked is not None and copt.filter and not ordered:
+            selected = set(id(r) for r in filtered)
+            walked = (r for r in walked if id(r) in selected)
+
+        if ordered:
+            pass
+        elif walked is not None:
+            filtered = walked
+        elif copt.order_by or copt.after_pkey is not None:
+            # every key is computed once. keys end in the primary key,
+            # which is unique, so records are never compared themselves
+            key = _order_key(copt)
+            descending = bool(copt.order_by) and not copt.order_incremental
+            keyed = [(key(r), r) for r in filtered]
+            if copt.after_pkey is not None:
+                keyed = _after(keyed, copt)
+
+            # a bounded page only needs its first stop records, a heap
+            # picks them out without sorting all the others
+            if stop is not None:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                keyed = pick(stop, keyed)
+            else:
+                keyed.sort(reverse=descending)
+
+            filtered = [r for _, r in keyed]
+
+        return list(itertools.islice(filtered, start, stop))
+
+    def _capture(self, lk, copt):
+        # -> (candidate records, exact, records in order or None,
+        # a view of the column table or None)
+        records, exact, view = self._candidates(lk, copt)
+
+        walked = None
+        idx = self._indexes.get(lk, {}).get(copt.order_by) if copt.order_by else None
+        if idx is not None and (view is None or copt.order_by not in view.columns):
+            after = None
+            if copt.after_pkey is not None:
+                after = (copt.after_value, copt.after_pkey)
+
+            # without a filter every walked record is on the page
+            limit = None
+            if not copt.filter and copt.page_size is not None and copt.page_size > 0:
+                limit = int(copt.page_size) + int(copt.page_offset or 0)
+
+            walked = idx.walk(not copt.order_incremental, after, limit)
+
+        return records, exact, walked, view
+
+    def _candidates(self, lk, copt):
+        # -> (records, exact, view), indexed leaves narrow down the candidates
+        # first, when they make up the whole filter nothing is left to check.
+        # otherwise a filter or an order the columns serve gets a view of
+        # the column table in place of the records
+        found, exact = None, not copt.filter
+        if copt.filter:
+            found, exact = index.lookup(self._indexes.get(lk, {}), copt.filter)
+            if found is not None and exact:
+                return list(found.values()), exact, None
+
+        table = self._tables.get(lk)
+        if table is not None:
+            if copt.filter:
+                columned = table.serves(copt.filter)
+            else:
+                columned = copt.order_by and copt.after_pkey is None and table.orders(copt.order_by) \
+                    and copt.order_by not in self._indexes.get(lk, {})
+
+            if columned:
+                return None, False, table.view(table.paths)
+
+        if found is not None:
+            return list(found.values()), exact, None
+
+        return list(self._type_index.get(lk, dict()).values()), exact, None
+
+    def _read(self, capture):
+        # a writer reading its own changes needs no checks
+        if self._writer == threading.get_ident():
+            return capture()
+
+        for _ in range(_READ_ATTEMPTS):
+            version = self._version
+            if version % 2 == 0:
+                try:
+                    res = capture()
+                    if self._version == version:
+                        return res
+                except (KeyError, IndexError, RuntimeError):
+                    # the structures changed while being copied
+                    pass
+
+            # let the writer finish
+            time.sleep(0)
+
+        with self._lock:
+            return capture()
+
+    @contextlib.contextmanager
+    def _writing(self):
+        with self._lock:
+            self._version += 1
+            self._writer = threading.get_ident()
+            try:
+                yield
+                if self._journal is not None and self._journal.due():
+                    self._journal.snapshot(self._records())
+            finally:
+                self._writer = None
+                self._version += 1
+
+    def _batch(self):
+        # a journal syncs the writes of a batch once, at its end
+        if self._journal is None:
+            return contextlib.nullcontext()
+        return self._journal.hold()
+
+    def _records(self):
+        return [r for records in self._type_index.values() for r in records.values()]
+
+    def _load(self, objects):
+        # fills the empty store, each index is sorted once at the end
+        added = {}
+        for obj in objects:
+            lk = obj.Metadata().Kind().lower()
+            idpath = f"id/{obj.Metadata().Identity().Key()}"
 
-        return res
+            self._id_index[idpath] = obj
+            self._id_index[f"{lk}/{obj.PrimaryKey()}"] = obj
+            if lk not in self._type_index:
+                self._type_index[lk] = dict()
+            self._type_index[lk][idpath] = obj
+            added.setdefault(lk, []).append((idpath, obj))
+
+        for lk, records in added.items():
+            indexes = self._kindIndexes(lk)
+            table = self._kindTable(lk)
+            if len(indexes) == 0 and table is None:
+                continue
+
+            paths = list(indexes.keys()) + self._columns
+            values = [index.path_values(r, paths) for _, r in records]
+            for path, idx in indexes.items():
+                idx.extend(
+                    (key, r, v[path], r.PrimaryKey()) for (key, r), v in zip(records, values))
+
+            if table is not None:
+                for (key, r), v in zip(records, values):
+                    table.add(key, r, v, r.PrimaryKey())
+
+    def Snapshot(self):
+        # writes a snapshot of the journaled store now and waits for it
+        if self._journal is None:
+            raise Exception("the store has no journal")
+
+        with self._writing():
+            self._journal.snapshot(self._records())
+        self._journal.wait()
+
+    def Close(self):
+        # syncs and closes the journal, if any
+        if self._journal is not None:
+            with self._lock:
+                self._journal.close()
 
     def Delete(self, identity: store.ObjectIdentity, *opt: options.DeleteOption):
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
 
         log.info(f"delete {identity.Path()}")
-        copt = options.CommonOptionHolderFactory()
-        for o in opt:
-            o.ApplyFunction()(copt)
+        copt = store.delete_options(*opt)
 
-        if copt.filter is None:
-            object_to_delete = self.Get(identity)
+        with self._writing(), self._batch():
+            if copt.filter is None:
+                record = self._id_index.get(identity.Path())
+                if record is None:
+                    raise Exception(constants.ErrNoSuchObject)
 
-            lk = object_to_delete.Metadata().Kind().lower()
+                self._remove(record)
+                return
 
-            idpath = f"id/{object_to_delete.Metadata().Identity().Key()}"
-            pkpath = f"{lk}/{object_to_delete.PrimaryKey()}"
-            print(f"Deleting idpath: {idpath}, pkpath: {pkpath}")
-            if idpath in self._id_index:
-                del self._id_index[idpath]
-            if pkpath in self._id_index:
-                del self._id_index[pkpath]
+            sample = self._schema.ObjectForKind(identity.Type())
+            if sample is None:
+                raise Exception(constants.ErrNoSuchObject)
 
-            del self._type_index[lk][object_to_delete.ToJson()]
-            return
+            for record in self._select(identity, copt):
+                self._remove(record)
 
-        sample = self._schema.ObjectForKind(identity.Type())
-        if sample is None:
-            raise Exception(constants.ErrNoSuchObject)
-
-        objects = self.List(identity, *opt)
-        for obj in objects:
-            lk = obj.Metadata().Kind().lower()
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        with self._lock, self._batch():
+            return store.run_batch(objs, self.Create, *opt)
 
-            idpath = f"id/{obj.Metadata().Identity().Key()}"
-            pkpath = f"{lk}/{obj.PrimaryKey()}"
-            if idpath in self._id_index:
-                del self._id_index[idpath]
-            if pkpath in self._id_index:
-                del self._id_index[pkpath]
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        with self._lock, self._batch():
+            return store.run_batch(items, lambda i: self.Update(i[0], i[1]), *opt)
 
-            del self._type_index[lk][obj.ToJson()]
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        with self._lock, self._batch():
+            return store.run_batch(identities, self.Delete, *opt)
 
     def Update(self, identity: store.ObjectIdentity, obj: store.Object, *opt: options.UpdateOption) -> store.Object:
         if identity is None:
@@ -222,32 +424,148 @@ class MemoryStore(store.Store):
             raise Exception(constants.ErrObjectNil)
 
         log.info(f"update {identity.Path()}")
-        existing = self.Get(identity)
-        if existing.Metadata().Kind() != obj.Metadata().Kind():
-            raise Exception(constants.ErrObjectIdentityMismatch)
+        with self._writing():
+            existing = self._id_index.get(identity.Path())
+            if existing is None:
+                raise Exception(constants.ErrNoSuchObject)
 
-        if existing.PrimaryKey() != obj.PrimaryKey():
-            if existing.Metadata().Identity().Path() != obj.Metadata().Identity().Path():
+            if existing.Metadata().Kind() != obj.Metadata().Kind():
                 raise Exception(constants.ErrObjectIdentityMismatch)
 
-            target_identity = store.ObjectIdentity(
-                f"{existing.Metadata().Kind().lower()}/{obj.PrimaryKey()}")
-            target = None
-            try:
-                target = self.Get(target_identity)
-            except Exception:
-                pass
-            if target is not None:
-                raise Exception(constants.ErrObjectExists)
+            lk = existing.Metadata().Kind().lower()
+            idpath = f"id/{existing.Metadata().Identity().Key()}"
+            pkpath = f"{lk}/{existing.PrimaryKey()}"
+            new_idpath = f"id/{obj.Metadata().Identity().Key()}"
+            new_pkpath = f"{lk}/{obj.PrimaryKey()}"
+
+            if pkpath != new_pkpath and idpath != new_idpath:
+                raise Exception(constants.ErrObjectIdentityMismatch)
+
+            for path in [new_idpath, new_pkpath]:
+                if self._id_index.get(path, existing) is not existing:
+                    raise Exception(constants.ErrObjectExists)
+
+            if self._journal is not None:
+                self._journal.append("u", idpath, obj)
+
+            cloned = obj.Clone()
+
+            # swapped in place, only a changed path moves; the new paths
+            # land first so lock-free readers never miss the record
+            self._unindexRecord(lk, idpath)
+            self._id_index[new_idpath] = cloned
+            self._id_index[new_pkpath] = cloned
+            if pkpath != new_pkpath:
+                del self._id_index[pkpath]
+            if idpath != new_idpath:
+                del self._id_index[idpath]
+                del self._type_index[lk][idpath]
+
+            self._type_index[lk][new_idpath] = cloned
+            self._indexRecord(lk, new_idpath, cloned)
+
+            return self._out(cloned)
+
+    def _remove(self, record):
+        lk = record.Metadata().Kind().lower()
+        idpath = f"id/{record.Metadata().Identity().Key()}"
+
+        if self._journal is not None:
+            self._journal.append("d", idpath, None)
+
+        self._id_index.pop(idpath, None)
+        self._id_index.pop(f"{lk}/{record.PrimaryKey()}", None)
+        del self._type_index[lk][idpath]
+        self._unindexRecord(lk, idpath)
+
+    def _kindIndexes(self, lk):
+        indexes = self._indexes.get(lk)
+        if indexes is None:
+            indexes = {}
+            for path in self._schema.Indexes(lk) + self._extra_indexes:
+                indexes[path] = index.FieldIndex(path)
+            self._indexes[lk] = indexes
+
+        return indexes
+
+    def _kindTable(self, lk):
+        if len(self._columns) == 0:
+            return None
+
+        table = self._tables.get(lk)
+        if table is None:
+            table = self._tables[lk] = self._columnar.ColumnTable(self._columns)
+
+        return table
+
+    def _indexRecord(self, lk, key, record):
+        indexes = self._kindIndexes(lk)
+        table = self._kindTable(lk)
+        if len(indexes) == 0 and table is None:
+            return
+
+        values = index.path_values(record, list(indexes.keys()) + self._columns)
+        for path, idx in indexes.items():
+            idx.add(key, record, values[path], record.PrimaryKey())
+
+        if table is not None:
+            table.add(key, record, values, record.PrimaryKey())
+
+    def _unindexRecord(self, lk, key):
+        for idx in self._kindIndexes(lk).values():
+            idx.remove(key)
+
+        table = self._kindTable(lk)
+        if table is not None:
+            table.remove(key)
+
+
+# optimistic reads before a reader waits for the writers
+_READ_ATTEMPTS = 3
+
+
+def _clone(record):
+    return record.Clone()
+
+
+def _order_key(copt):
+    # the primary key breaks ties, without an order it is the order
+    if not copt.order_by:
+        return lambda r: r.PrimaryKey()
+
+    get = predicate.object_getter(copt.order_by)
+    return lambda r: (get(r), r.PrimaryKey())
+
+
+def _after(keyed, copt):
+    # -> the (key, record) pairs past the after option, in the order given
+    after = copt.after_pkey
+    if copt.order_by:
+        after = (copt.after_value, copt.after_pkey)
+
+    if copt.order_by and not copt.order_incremental:
+        return [k for k in keyed if k[0] < after]
 
-        print("updating object... {} -> {}".format(existing.PrimaryKey(), obj.PrimaryKey()))
+    return [k for k in keyed if k[0] > after]
 
-        # remove old record and insert new
-        idpath = f"id/{existing.Metadata().Identity().Key()}"
-        self.Delete(store.ObjectIdentity(idpath))
 
-        return self.Create(obj)
+def MemoryStoreFactory(
+        schema: store.SchemaHolder, indexes=None, frozen=False, path=None,
+        backing: store.Store = None, max_objects=None, max_bytes=None, columns=None, **kwargs):
+    # path: a directory to keep the store in across restarts, kwargs go
+    # to its Journal (fsync, fsync_ms, snapshot_ops).
+    # backing: a store the least recently used objects are evicted to
+    # beyond max_objects or max_bytes, making this its hot tier.
+    # columns: scalar paths to filter and order by in numpy columns,
+    # numpy comes with the "columns" extra
+    journal = None
+    if path is not None:
+        journal = Journal(path, **kwargs)
+    elif len(kwargs) > 0:
+        raise Exception("journal options without a path: {}".format(", ".join(sorted(kwargs))))
 
+    memory = MemoryStore(schema, indexes, frozen, journal, columns)
+    if backing is None:
+        return memory
 
-def MemoryStoreFactory(schema: store.SchemaHolder):
-    return MemoryStore(schema)
+    return TieredStore(schema, memory, backing, max_objects, max_bytes)
@@ -0,0 +1,301 @@
+import logging
+import threading
+import collections
+
+from pystorz.internal import constants
+from pystorz.store import store, options, predicate
+
+
+log = logging.getLogger(__name__)
+
+
+class TieredStore(store.Store):
+    # a store kept in memory as the hot tier of a backing store. the
+    # least recently used objects beyond max_objects, or beyond max_bytes
+    # of their JSON, are evicted to the backing store and faulted back in
+    # by Get. changes stay in memory until evicted, except deletes and
+    # changes of an object's keys, which reach the backing store at once
+    # so that both tiers agree on the keys that are taken. pages past the
+    # first need an Order or an After, the merged tiers have no stable
+    # order of their own to offset into
+    def __init__(self, schema, hot: store.Store, backing: store.Store, max_objects=None, max_bytes=None):
+        if max_objects is None and max_bytes is None:
+            raise Exception("a tiered store needs max_objects or max_bytes")
+
+        self._hot = hot
+        self._backing = backing
+        self._max_objects = max_objects
+        self._max_bytes = max_bytes
+
+        self._lock = threading.RLock()
+        # id -> [bytes, dirty, stored], least recently used first. stored
+        # is None when it is not known whether the backing store has it
+        self._resident = collections.OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        # whatever the hot store starts with, e.g. from its journal
+        with self._lock:
+            for kind in schema.Types():
+                for obj in hot.Iterate(store.ObjectIdentity("{}/".format(kind))):
+                    self._admit(obj, True, None)
+            self._evict()
+
+    def Metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "resident_objects": len(self._resident),
+                "resident_bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups > 0 else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def Get(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> store.Object:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("get {}".format(identity.Path()))
+
+        with self._lock:
+            obj = _get(self._hot, identity)
+            if obj is not None:
+                self._hits += 1
+                self._resident.move_to_end(_key(obj))
+                return obj
+
+            self._misses += 1
+            obj = self._backing.Get(identity, *opt)
+
+            # faulted in, the least recently used make room for it
+            obj = self._hot.Create(obj)
+            self._admit(obj, False, True)
+            self._evict()
+
+            return obj
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("exists {}".format(identity.Path()))
+
+        with self._lock:
+            return self._hot.Exists(identity) or self._backing.Exists(identity)
+
+    def Create(self, obj: store.Object, *opt: options.CreateOption) -> store.Object:
+        if obj is None:
+            raise Exception(constants.ErrObjectNil)
+        log.info("create {} {}".format(obj.Metadata().Kind(), obj.PrimaryKey()))
+
+        with self._lock:
+            for identity in [obj.Metadata().Identity(), _pkey(obj)]:
+                if self._backing.Exists(identity):
+                    raise Exception(constants.ErrObjectExists)
+
+            created = self._hot.Create(obj, *opt)
+            self._admit(created, True, False)
+            self._evict()
+
+            return created
+
+    def Update(self, identity: store.ObjectIdentity, obj: store.Object, *opt: options.UpdateOption) -> store.Object:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        if obj is None:
+            raise Exception(constants.ErrObjectNil)
+        log.info("update {}".format(identity.Path()))
+
+        with self._lock:
+            existing = self.Get(identity)
+            if existing.Metadata().Kind() != obj.Metadata().Kind():
+                raise Exception(constants.ErrObjectIdentityMismatch)
+
+            key = _key(existing)
+            moved = key != _key(obj) or existing.PrimaryKey() != obj.PrimaryKey()
+            if key != _key(obj) and self._backing.Exists(obj.Metadata().Identity()):
+                raise Exception(constants.ErrObjectExists)
+            if existing.PrimaryKey() != obj.PrimaryKey() and self._backing.Exists(_pkey(obj)):
+                raise Exception(constants.ErrObjectExists)
+
+            updated = self._hot.Update(identity, obj, *opt)
+            _, _, stored = self._release(key)
+
+            if moved and stored is not False:
+                # the stale copy would still hold the old keys
+                self._put(key, updated, stored)
+                self._admit(updated, False, True)
+            else:
+                self._admit(updated, True, stored)
+
+            self._evict()
+            return updated
+
+    def Delete(self, identity: store.ObjectIdentity, *opt: options.DeleteOption):
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("delete {}".format(identity.Path()))
+
+        copt = store.delete_options(*opt)
+
+        with self._lock:
+            if copt.filter is None:
+                obj = _get(self._hot, identity)
+                if obj is None:
+                    self._backing.Delete(identity)
+                    return
+
+                self._drop(_key(obj))
+                return
+
+            for obj in self._hot.List(identity, *opt):
+                self._drop(_key(obj))
+
+            # copies of resident objects may go as well, an
+            # eviction writes them back again
+            self._backing.Delete(identity, *opt)
+
+    def List(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> store.ObjectList:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("list {}".format(identity.Path()))
+
+        copt = options.CommonOptionHolderFactory()
+        unpaged = []
+        for o in opt:
+            o.ApplyFunction()(copt)
+            if not _is_page(o):
+                unpaged.append(o)
+
+        start, stop = 0, None
+        if copt.page_offset is not None and copt.page_offset > 0:
+            start = int(copt.page_offset)
+            if not copt.order_by and copt.after_pkey is None:
+                raise Exception(constants.ErrInvalidOption)
+        if copt.page_size is not None and copt.page_size > 0:
+            stop = start + int(copt.page_size)
+
+        with self._lock:
+            # each tier is asked for enough to fill the page on its own,
+            # the backing store also for the stale copies it may return
+            hot = self._hot.List(identity, *_limit(unpaged, stop, 0))
+            backing = self._backing.List(identity, *_limit(unpaged, stop, len(self._resident)))
+
+            # resident objects take the place of their stale copies, so
+            # unordered lists keep the order of the backing store
+            fresh = {_key(r): r for r in hot}
+            merged = []
+            for r in backing:
+                key = _key(r)
+                if key not in self._resident:
+                    merged.append(r)
+                elif key in fresh:
+                    merged.append(fresh.pop(key))
+            merged.extend(fresh.values())
+
+        if copt.order_by:
+            get = predicate.object_getter(copt.order_by)
+            merged.sort(
+                key=lambda x: (get(x), x.PrimaryKey()),
+                reverse=(not copt.order_incremental))
+        elif copt.after_pkey is not None:
+            merged.sort(key=lambda x: x.PrimaryKey())
+
+        return store.ObjectList(merged[start:stop])
+
+    def Flush(self):
+        # writes every changed resident object to the backing store
+        with self._lock:
+            for key, entry in self._resident.items():
+                if entry[1]:
+                    self._put(key, self._hot.Get(store.ObjectIdentity(key)), entry[2])
+                    entry[1] = False
+                    entry[2] = True
+
+    def Close(self):
+        self.Flush()
+        if hasattr(self._hot, "Close"):
+            self._hot.Close()
+
+    def _admit(self, obj, dirty, stored):
+        size = len(obj.ToJson())
+        self._resident[_key(obj)] = [size, dirty, stored]
+        self._bytes += size
+
+    def _release(self, key):
+        # -> the entry of a resident object that is no longer resident
+        entry = self._resident.pop(key)
+        self._bytes -= entry[0]
+        return entry
+
+    def _drop(self, key):
+        self._hot.Delete(store.ObjectIdentity(key))
+        _, _, stored = self._release(key)
+        if stored is not False:
+            try:
+                self._backing.Delete(store.ObjectIdentity(key))
+            except Exception as e:
+                if str(e) != constants.ErrNoSuchObject:
+                    raise e
+
+    def _evict(self):
+        # the most recently used object always stays
+        while len(self._resident) > 1 and self._over():
+            key, (_, dirty, stored) = next(iter(self._resident.items()))
+            identity = store.ObjectIdentity(key)
+            if dirty:
+                self._put(key, self._hot.Get(identity), stored)
+
+            self._hot.Delete(identity)
+            self._release(key)
+            self._evictions += 1
+
+    def _over(self) -> bool:
+        if self._max_objects is not None and len(self._resident) > self._max_objects:
+            return True
+        return self._max_bytes is not None and self._bytes > self._max_bytes
+
+    def _put(self, key, obj, stored):
+        # writes obj to the backing store, over its copy under key if any
+        if stored is not False:
+            try:
+                self._backing.Update(store.ObjectIdentity(key), obj)
+                return
+            except Exception as e:
+                if str(e) != constants.ErrNoSuchObject:
+                    raise e
+
+        self._backing.Create(obj)
+
+
+def _key(obj) -> str:
+    return str(obj.Metadata().Identity())
+
+
+def _pkey(obj) -> store.ObjectIdentity:
+    return store.ObjectIdentity("{}/{}".format(obj.Metadata().Kind(), obj.PrimaryKey()))
+
+
+def _get(s, identity):
+    try:
+        return s.Get(identity)
+    except Exception as e:
+        if str(e) != constants.ErrNoSuchObject:
+            raise e
+
+    return None
+
+
+def _is_page(opt) -> bool:
+    copt = options.CommonOptionHolderFactory()
+    opt.ApplyFunction()(copt)
+    return copt.page_size is not None or copt.page_offset is not None
+
+
+def _limit(opts, stop, extra):
+    if stop is None:
+        return opts
+    return opts + [options.PageSize(stop + extra)]
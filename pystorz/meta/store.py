@@ -1,4 +1,5 @@
 from pystorz.store import options
+import typing
 import logging
 
 from datetime import datetime
@@ -19,14 +20,7 @@ class MetaStore(store.Store):
         log.info("create {} {}".format(
             obj.Metadata().Kind(), obj.PrimaryKey()))
 
-        meta = obj.Metadata()
-        if isinstance(meta, store.MetaSetter):
-            meta.SetIdentity(store.ObjectIdentityFactory())
-            meta.SetCreated(datetime.now())
-            meta.SetUpdated(obj.Metadata().Created())
-            meta.SetRevision(1)
-
-        return self._Store.Create(obj, *opt)
+        return self._Store.Create(self._created(obj), *opt)
 
     def Update(
         self,
@@ -41,6 +35,48 @@ class MetaStore(store.Store):
 
         log.info("update {}".format(identity.Path()))
 
+        return self._Store.Update(identity, self._updated(identity, obj), *opt)
+
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        log.info("create {} objects".format(len(objs)))
+
+        def prepare(obj):
+            if obj is None:
+                raise Exception(constants.ErrObjectNil)
+            return self._created(obj)
+
+        return store.delegate_batch(
+            objs, prepare, lambda objs: self._Store.CreateMany(objs, *opt), *opt)
+
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        log.info("update {} objects".format(len(items)))
+
+        def prepare(item):
+            identity, obj = item
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
+            if obj is None:
+                raise Exception(constants.ErrObjectNil)
+            return identity, self._updated(identity, obj)
+
+        return store.delegate_batch(
+            items, prepare, lambda items: self._Store.UpdateMany(items, *opt), *opt)
+
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        log.info("delete {} objects".format(len(identities)))
+        return self._Store.DeleteMany(identities, *opt)
+
+    def _created(self, obj: store.Object) -> store.Object:
+        meta = obj.Metadata()
+        if isinstance(meta, store.MetaSetter):
+            meta.SetIdentity(store.ObjectIdentityFactory())
+            meta.SetCreated(datetime.now())
+            meta.SetUpdated(obj.Metadata().Created())
+            meta.SetRevision(1)
+
+        return obj
+
+    def _updated(self, identity: store.ObjectIdentity, obj: store.Object) -> store.Object:
         original = self._Store.Get(identity)
         # if original.Metadata().Kind() != obj.Metadata().Kind():
         #     return constants.ErrObjectIdentityMismatch
@@ -53,7 +89,7 @@ class MetaStore(store.Store):
             meta.SetUpdated(datetime.now())
             meta.SetRevision(original.Metadata().Revision() + 1)
 
-        return self._Store.Update(identity, obj, *opt)
+        return obj
 
     def Delete(self, identity: store.ObjectIdentity, *opt: options.DeleteOption):
         if identity is None:
@@ -77,6 +113,30 @@ class MetaStore(store.Store):
         log.info("list {}".format(identity.Path()))
         return self._Store.List(identity, *opt)
 
+    def Count(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("count {}".format(identity.Path()))
+        return self._Store.Count(identity, *opt)
+
+    def Exists(
+        self, identity: store.ObjectIdentity, *opt: options.GetOption
+    ) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("exists {}".format(identity.Path()))
+        return self._Store.Exists(identity, *opt)
+
+    def Iterate(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> typing.Iterator[store.Object]:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("iterate {}".format(identity.Path()))
+        return self._Store.Iterate(identity, *opt)
+
 
 def MetaStoreFactory(data: store.Store) -> store.Store:
     return MetaStore(data)
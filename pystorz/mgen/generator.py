@@ -16,6 +16,7 @@ log.debug("loading generator.py...")
 
 
 _KNOWN_TYPES = ["string", "str", "int", "float", "bool", "datetime"]
+_METADATA_PROPERTIES = ["kind", "identity", "created", "updated", "revision"]
 
 
 def _javascript_cleanup(content: str) -> str:
@@ -167,9 +168,39 @@ def _validate_model(structs, resources):
                     "resource {} internal: unknown type: {}".format(r.name, r.internal)
                 )
 
+        for i in r.indexes:
+            if not _index_path_exists(structs, r, i):
+                errors.append(
+                    "resource {} index: unknown property: {}".format(r.name, i)
+                )
+
     return errors
 
 
+def _index_path_exists(structs, resource, path):
+    tokens = path.split(".")
+    if tokens[0] == "metadata":
+        return len(tokens) == 2 and tokens[1] in _METADATA_PROPERTIES
+
+    struct_name = None
+    if tokens[0] == "external":
+        struct_name = resource.external
+    elif tokens[0] == "internal":
+        struct_name = resource.internal
+
+    for t in tokens[1:]:
+        if struct_name not in structs:
+            return False
+
+        props = [p for p in structs[struct_name].properties if p.name == t]
+        if len(props) == 0 or props[0].IsMap() or props[0].IsArray():
+            return False
+
+        struct_name = props[0].type
+
+    return struct_name in _KNOWN_TYPES
+
+
 def _read_model(path: str):
     log.debug(f"reading model from {path}")
 
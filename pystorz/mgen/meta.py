@@ -114,6 +114,10 @@ class Resource:
         if "internal" in yaml:
             self.internal = yaml["internal"]
 
+        self.indexes = []
+        if "indexes" in yaml:
+            self.indexes = yaml["indexes"]
+
     def PrimaryKeyFunctionCaller(self):
         tok = self.primary_key.split(".")
         return ".".join(["{}()".format(capitalize(t)) for t in tok])
@@ -1,5 +1,6 @@
+import typing
 import logging
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
 
 from pystorz.internal import constants
 from pystorz.store import store, options, utils
@@ -61,6 +62,17 @@ def _convert_filter(filterOption, sample):
     raise Exception(constants.ErrInvalidFilter)
 
 
+def _after_filter(field, direction, copt):
+    operator = "$gt" if direction == ASCENDING else "$lt"
+    if field is None:
+        return {"pkey": {operator: copt.after_pkey}}
+
+    return {"$or": [
+        {field: {operator: copt.after_value}},
+        {field: copt.after_value, "pkey": {operator: copt.after_pkey}},
+    ]}
+
+
 class MongoStore(store.Store):
     def __init__(self, Schema, URI: str):
         self._schema = Schema
@@ -113,6 +125,132 @@ class MongoStore(store.Store):
         collection.insert_one(record)
         return obj.Clone()
 
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        log.info(f"create {len(objs)} objects")
+        abort = store.abort_on_error(*opt)
+        self._test_connection()
+        collection = self._client[self._db][COLLECTION_NAME]
+
+        # look up all the keys that are already taken in one round trip
+        records = []
+        for obj in objs:
+            if obj is None:
+                records.append(None)
+                continue
+            typ = obj.Metadata().Kind().lower()
+            records.append({
+                "idpath": obj.Metadata().Identity().Path(),
+                "pkpath": f"{typ}/{obj.PrimaryKey()}",
+                "pkey": obj.PrimaryKey(),
+                "type": typ,
+                "object": obj.ToDict(),
+            })
+
+        taken = set(
+            r["pkpath"] for r in collection.find(
+                {"pkpath": {"$in": [r["pkpath"] for r in records if r]}},
+                {"pkpath": 1}))
+
+        res = []
+        pending = []
+        for obj, record in zip(objs, records):
+            if record is None:
+                err = Exception(constants.ErrObjectNil)
+            elif record["pkpath"] in taken:
+                err = Exception(constants.ErrObjectExists)
+            else:
+                taken.add(record["pkpath"])
+                pending.append(record)
+                res.append(obj.Clone())
+                continue
+
+            if abort:
+                raise err
+            res.append(err)
+
+        if len(pending) > 0:
+            collection.insert_many(pending, ordered=False)
+
+        return store.BatchResult(res)
+
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        log.info(f"update {len(items)} objects")
+        abort = store.abort_on_error(*opt)
+        self._test_connection()
+        collection = self._client[self._db][COLLECTION_NAME]
+
+        def key(identity):
+            return "idpath" if identity.IsId() else "pkpath"
+
+        # fetch every record the batch touches, including the ones
+        # whose primary keys the updates would move onto
+        existing = {}
+        targets = set()
+        paths = {"idpath": [], "pkpath": []}
+        for identity, obj in items:
+            if identity is not None:
+                paths[key(identity)].append(identity.Path())
+            if obj is not None:
+                paths["pkpath"].append(
+                    f"{obj.Metadata().Kind().lower()}/{obj.PrimaryKey()}")
+
+        for k, p in paths.items():
+            if len(p) > 0:
+                for r in collection.find({k: {"$in": p}}):
+                    existing[("idpath", r["idpath"])] = r
+                    existing[("pkpath", r["pkpath"])] = r
+                    targets.add(r["pkpath"])
+
+        res = []
+        pending = []
+        for identity, obj in items:
+            try:
+                if identity is None:
+                    raise Exception(constants.ErrInvalidPath)
+                if obj is None:
+                    raise Exception(constants.ErrObjectNil)
+
+                record = existing.get((key(identity), identity.Path()))
+                if record is None:
+                    raise Exception(constants.ErrNoSuchObject)
+
+                typ = obj.Metadata().Kind().lower()
+                if record["type"] != typ:
+                    raise Exception(constants.ErrObjectIdentityMismatch)
+
+                pkpath = f"{typ}/{obj.PrimaryKey()}"
+                if pkpath != record["pkpath"]:
+                    if record["idpath"] != obj.Metadata().Identity().Path():
+                        raise Exception(constants.ErrObjectIdentityMismatch)
+                    if pkpath in targets:
+                        raise Exception(constants.ErrObjectExists)
+
+                    # later items address the record by its new key only
+                    targets.discard(record["pkpath"])
+                    targets.add(pkpath)
+                    del existing[("pkpath", record["pkpath"])]
+                    existing[("pkpath", pkpath)] = record
+                    record["pkpath"] = pkpath
+            except Exception as e:
+                if abort:
+                    raise e
+                res.append(e)
+                continue
+
+            pending.append(UpdateOne(
+                {"idpath": record["idpath"]},
+                {"$set": {
+                    "pkey": obj.PrimaryKey(),
+                    "pkpath": pkpath,
+                    "object": obj.ToDict(),
+                }}))
+            res.append(obj.Clone())
+
+        if len(pending) > 0:
+            collection.bulk_write(pending, ordered=True)
+
+        return store.BatchResult(res)
+
     def Update(
         self,
         identity: store.ObjectIdentity,
@@ -168,9 +306,7 @@ class MongoStore(store.Store):
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
         log.info(f"delete {identity.Path()}")
-        copt = options.CommonOptionHolderFactory()
-        for o in opt:
-            o.ApplyFunction()(copt)
+        copt = store.delete_options(*opt)
         self._test_connection()
         collection = self._client[self._db][COLLECTION_NAME]
         if copt.filter is None:
@@ -193,6 +329,45 @@ class MongoStore(store.Store):
             log.info(f"filter: {filter_}")
             collection.delete_many(filter_)
 
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        log.info(f"delete {len(identities)} objects")
+        abort = store.abort_on_error(*opt)
+        self._test_connection()
+        collection = self._client[self._db][COLLECTION_NAME]
+
+        def key(identity):
+            return "idpath" if identity.IsId() else "pkpath"
+
+        found = set()
+        for k in ["idpath", "pkpath"]:
+            paths = [i.Path() for i in identities if i is not None and key(i) == k]
+            if len(paths) > 0:
+                for r in collection.find({k: {"$in": paths}}, {k: 1}):
+                    found.add((k, r[k]))
+
+        res = []
+        pending = {"idpath": [], "pkpath": []}
+        for identity in identities:
+            if identity is None:
+                err = Exception(constants.ErrInvalidPath)
+            elif (key(identity), identity.Path()) not in found:
+                err = Exception(constants.ErrNoSuchObject)
+            else:
+                found.discard((key(identity), identity.Path()))
+                pending[key(identity)].append(identity.Path())
+                res.append(None)
+                continue
+
+            if abort:
+                raise err
+            res.append(err)
+
+        for k, paths in pending.items():
+            if len(paths) > 0:
+                collection.delete_many({k: {"$in": paths}})
+
+        return store.BatchResult(res)
+
     def Get(
         self, identity: store.ObjectIdentity, *opt: options.GetOption
     ) -> store.Object:
@@ -227,6 +402,84 @@ class MongoStore(store.Store):
         for o in opt:
             o.ApplyFunction()(copt)
 
+        res = store.ObjectList()
+        for r in self._find(identity, copt):
+            resource = self._parse(identity, r)
+            if resource is not None:
+                res.append(resource)
+        return res
+
+    def Count(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info(f"count {identity.Path()}")
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
+        copt = options.CommonOptionHolderFactory()
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        self._test_connection()
+        collection = self._client[self._db][COLLECTION_NAME]
+        filter_ = {"type": identity.Type()}
+
+        if copt.filter:
+            obj = self._schema.ObjectForKind(identity.Type())
+            if obj is None:
+                raise Exception(constants.ErrNoSuchObject)
+
+            filter_ = {"$and": [filter_, _convert_filter(copt.filter, obj)]}
+            log.info(f"filter: {filter_}")
+
+        return collection.count_documents(filter_)
+
+    def Exists(
+        self, identity: store.ObjectIdentity, *opt: options.GetOption
+    ) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info(f"exists {identity.Path()}")
+        self._test_connection()
+        collection = self._client[self._db][COLLECTION_NAME]
+        key = "idpath" if identity.IsId() else "pkpath"
+        return collection.count_documents({key: identity.Path()}, limit=1) > 0
+
+    def Iterate(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> typing.Iterator[store.Object]:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info(f"iterate {identity.Path()}")
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
+        copt = options.CommonOptionHolderFactory()
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        cur = self._find(identity, copt).batch_size(
+            copt.batch_size or store.DEFAULT_BATCH_SIZE)
+
+        def iterate():
+            with cur:
+                for r in cur:
+                    resource = self._parse(identity, r)
+                    if resource is not None:
+                        yield resource
+
+        return iterate()
+
+    def _parse(self, identity, r):
+        try:
+            resource = self._schema.ObjectForKind(identity.Type())
+            resource.FromDict(r["object"])
+            return resource
+        except Exception as e:
+            log.error(str(e))
+            return None
+
+    def _find(self, identity, copt):
         self._test_connection()
         collection = self._client[self._db][COLLECTION_NAME]
         filter_ = {"type": identity.Type()}
@@ -239,31 +492,29 @@ class MongoStore(store.Store):
             filter_ = {"$and": [filter_, _convert_filter(copt.filter, obj)]}
             log.info(f"filter: {filter_}")
 
+        # the primary key breaks ties so pages never overlap or skip
+        field = f"object.{copt.order_by}" if copt.order_by else None
+        direction = ASCENDING
+        if copt.order_by and not copt.order_incremental:
+            direction = DESCENDING
+
+        if copt.after_pkey is not None:
+            filter_ = {"$and": [filter_, _after_filter(field, direction, copt)]}
+            log.info(f"filter: {filter_}")
+
         cur = collection.find(filter_)
 
-        if copt.order_by:
-            cur = cur.sort(
-                f"object.{copt.order_by}",
-                ASCENDING if copt.order_incremental else DESCENDING,
-            )
+        if field:
+            cur = cur.sort([(field, direction), ("pkey", direction)])
+        elif copt.after_pkey is not None:
+            cur = cur.sort("pkey", ASCENDING)
 
         if copt.page_size is not None and copt.page_size > 0:
             cur = cur.limit(int(copt.page_size))
         if copt.page_offset is not None and copt.page_offset > 0:
             cur = cur.skip(int(copt.page_offset))
 
-        rows = list(cur)
-        res = store.ObjectList()
-        for r in rows:
-            try:
-                resource = self._schema.ObjectForKind(identity.Type())
-                resource.FromDict(r["object"])
-
-                res.append(resource)
-            except Exception as e:
-                log.error(str(e))
-                continue
-        return res
+        return cur
 
 
 def MongoStoreFactory(schema: store.SchemaHolder, URI: str):
@@ -99,6 +99,10 @@ def list_parameters(ropt):
     if opt.filter:
         q[server.FilterArg] = opt.filter.ToJson()
 
+    if opt.after_pkey is not None:
+        q[server.AfterKeyArg] = opt.after_pkey
+        q[server.AfterValueArg] = json.dumps(opt.after_value)
+
     return "&".join([f"{k}={quote(v)}" for k, v in q.items()])
 
 
@@ -211,6 +215,8 @@ class Client(store.Store):
 
         copt = new_rest_options(self)
         for o in opt:
+            if not isinstance(o, options.DeleteOption):
+                raise Exception(constants.ErrInvalidOption)
             o.ApplyFunction()(copt)
 
         params = list_parameters(copt)
@@ -265,6 +271,53 @@ class Client(store.Store):
 
         return marshalledResult
 
+    def Count(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info("count {}".format(identity.Path()))
+
+        copt = new_rest_options(self)
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        params = ""
+        pf = filter_parameter(copt)
+        if pf:
+            params = "{}={}".format(server.FilterArg, quote(pf))
+
+        path = make_path_for_identity(self.base_url, identity, params)
+        res = self._process_request(path, "", server.ActionHead, copt.headers)
+
+        return json.loads(res)["count"]
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info("exists {}".format(identity.Path()))
+
+        copt = new_rest_options(self)
+        for o in opt:
+            o.ApplyFunction()(copt)
+
+        try:
+            self._process_request(
+                make_path_for_identity(self.base_url, identity, ""),
+                "",
+                server.ActionHead,
+                copt.headers,
+            )
+        except Exception as e:
+            if str(e) == constants.ErrNoSuchObject:
+                return False
+            raise e
+
+        return True
+
     def _make_request(self, path, content, request_type, headers):
         # headers.update(self.headers)
         log.debug(f"making {request_type} request to {path}")
@@ -275,6 +328,16 @@ class Client(store.Store):
 
         # response.raise_for_status()
 
+        # answers to HEAD have no body, their status is all there is
+        if request_type == server.ActionHead:
+            if response.status_code == 404:
+                return json.dumps({"error": constants.ErrNoSuchObject}).encode("utf-8")
+            if response.status_code < 200 or response.status_code >= 300:
+                return json.dumps({"error": "http {}".format(response.status_code)}).encode("utf-8")
+            if server.CountHeader in response.headers:
+                count = int(response.headers[server.CountHeader])
+                return json.dumps({"count": count}).encode("utf-8")
+
         return response.content
         # return str(response.content)
 
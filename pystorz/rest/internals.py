@@ -1,3 +1,4 @@
+import typing
 import logging
 
 from pystorz.internal import constants
@@ -73,3 +74,27 @@ class InternalStore(store.Store):
             raise Exception(constants.ErrInvalidPath)
         log.info("list {}".format(identity.Path()))
         return self.Store.List(identity, *opt)
+
+    def Count(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("count {}".format(identity.Path()))
+        return self.Store.Count(identity, *opt)
+
+    def Exists(
+        self, identity: store.ObjectIdentity, *opt: options.GetOption
+    ) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("exists {}".format(identity.Path()))
+        return self.Store.Exists(identity, *opt)
+
+    def Iterate(
+        self, identity: store.ObjectIdentity, *opt: options.ListOption
+    ) -> typing.Iterator[store.Object]:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+        log.info("iterate {}".format(identity.Path()))
+        return self.Store.Iterate(identity, *opt)
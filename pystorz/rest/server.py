@@ -26,17 +26,22 @@ IncrementalArg = "inc"
 PageSizeArg = "ps"
 PageOffsetArg = "po"
 OrderByArg = "ob"
+AfterValueArg = "av"
+AfterKeyArg = "ak"
+CountHeader = "X-Count"
 
 
 ActionGet = "GET"
 ActionCreate = "POST"
 ActionUpdate = "PUT"
 ActionDelete = "DELETE"
+ActionHead = "HEAD"
 
 HEADERS = {
     "Content-Type": "application/json",
     "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Methods": "GET, POST"
+    "Access-Control-Allow-Methods": "GET, POST",
+    "Access-Control-Expose-Headers": CountHeader
 }
 
 def _handle_exceptions(e):
@@ -67,16 +72,41 @@ def _error_response(code: int, message: str):
     return _json_response(code, {"error": message})
 
 
+def _action(method):
+    # HEAD is the cheap form of GET and allowed wherever GET is
+    if method == ActionHead:
+        return ActionGet
+    return method
+
+
 def _make_id_handler(stor, schema, exposed):
+    # HEAD needs the kind of the object only when some kind does not allow GET
+    head_by_kind = any(m is None or ActionGet not in m for m in exposed.values())
+
     def handler(id):
         iddentifier = store.ObjectIdentity(id)
+        if request.method == ActionHead:
+            try:
+                if not stor.Exists(iddentifier):
+                    return "", 404, HEADERS
+
+                if head_by_kind:
+                    kind = stor.Get(iddentifier).Metadata().Kind()
+                    obj_methods = exposed.get(kind)
+                    if obj_methods is None or ActionGet not in obj_methods:
+                        return _error_response(405, constants.ErrInvalidMethod)
+            except Exception as e:
+                return _handle_exceptions(e)
+
+            return "", 200, HEADERS
+
         existing = stor.Get(iddentifier)
 
         robject = None
         if existing is not None:
             kind = existing.Metadata().Kind()
             obj_methods = exposed[kind]
-            if obj_methods is None or request.method not in obj_methods:
+            if obj_methods is None or _action(request.method) not in obj_methods:
                 return _error_response(405, constants.ErrInvalidMethod)
 
             try:
@@ -95,7 +125,16 @@ def _handle_path(
     log.info("method {}".format(request.method))
 
     ret = None
-    if request.method == ActionGet:
+    if request.method == ActionHead:
+        # existence check, the status code is the answer
+        try:
+            if stor.Exists(identity):
+                return "", 200, HEADERS
+        except Exception as e:
+            return _handle_exceptions(e)
+
+        return "", 404, HEADERS
+    elif request.method == ActionGet:
         try:
             ret = stor.Get(identity)
         except Exception as e:
@@ -136,7 +175,7 @@ def _make_object_handler(
         except Exception as e:
             log.debug("unmarshal error: {}".format(e))
 
-        if request.method not in methods:
+        if _action(request.method) not in methods:
             return _error_response(405, constants.ErrInvalidMethod)
 
         return _handle_path(stor, id, robject)
@@ -153,10 +192,11 @@ def _make_type_handler(
     def handler():
         log.info("handle type {} {} (allowed {})".format(t, request.method, methods))
 
-        if request.method not in methods:
+        if _action(request.method) not in methods:
             return _error_response(405, constants.ErrInvalidMethod)
 
-        if request.method == ActionGet or request.method == ActionDelete:
+        # HEAD takes the same options as GET, without the body
+        if _action(request.method) == ActionGet or request.method == ActionDelete:
             url = urlparse(request.url)
             query_params = parse_qs(url.query)
             log.debug("query: {}".format(query_params))
@@ -192,7 +232,19 @@ def _make_type_handler(
                 opts.append(options.Order(query_params[OrderByArg][0], ascending))
 
             try:
-                if request.method == ActionGet:
+                if AfterKeyArg in query_params:
+                    value = None
+                    if AfterValueArg in query_params:
+                        value = json.loads(query_params[AfterValueArg][0])
+
+                    opts.append(options.After(value, query_params[AfterKeyArg][0]))
+
+                if request.method == ActionHead:
+                    # counted rather than listed, the count travels in a
+                    # header of the response without a body
+                    ret = stor.Count(store.ObjectIdentity(t.lower() + "/"), *opts)
+                    return "", 200, {**HEADERS, CountHeader: str(ret)}
+                elif _action(request.method) == ActionGet:
                     ret = stor.List(store.ObjectIdentity(t.lower() + "/"), *opts)
                     return _json_response(200, [r.ToDict() for r in ret])                
                 else:
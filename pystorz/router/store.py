@@ -1,3 +1,4 @@
+import typing
 import logging
 from pystorz.store import store
 from pystorz.store import options
@@ -57,6 +58,85 @@ class RouterStore(store.Store):
 
         return self._getStore(identity.Type()).List(identity, *opt)
 
+    def Count(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> int:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info(f"count {identity.Type()}")
+
+        return self._getStore(identity.Type()).Count(identity, *opt)
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info(f"exists {identity.Path()}")
+
+        return self._getStore(identity.Type()).Exists(identity, *opt)
+
+    def Iterate(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> typing.Iterator[store.Object]:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info(f"iterate {identity.Type()}")
+
+        return self._getStore(identity.Type()).Iterate(identity, *opt)
+
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        log.info(f"create {len(objs)} objects")
+
+        def kind(obj):
+            if obj is None:
+                raise Exception(constants.ErrObjectNil)
+            return obj.Metadata().Kind()
+
+        return self._routeBatch(
+            objs, kind, lambda s, objs: s.CreateMany(objs, *opt), *opt)
+
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        log.info(f"update {len(items)} objects")
+
+        def kind(item):
+            if item[1] is None:
+                raise Exception(constants.ErrObjectNil)
+            return item[1].Metadata().Kind()
+
+        return self._routeBatch(
+            items, kind, lambda s, items: s.UpdateMany(items, *opt), *opt)
+
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        log.info(f"delete {len(identities)} objects")
+
+        def kind(identity):
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
+            return identity.Type()
+
+        return self._routeBatch(
+            identities, kind, lambda s, identities: s.DeleteMany(identities, *opt), *opt)
+
+    def _routeBatch(self, items: list, kind, run, *opt) -> store.BatchResult:
+        # split the batch per target store and stitch the results back
+        # together in the original order
+        def route(item):
+            return self._getStore(kind(item)), item
+
+        def run_routed(routed):
+            groups = {}
+            for i, (s, item) in enumerate(routed):
+                groups.setdefault(id(s), (s, [], []))
+                groups[id(s)][1].append(i)
+                groups[id(s)][2].append(item)
+
+            res = [None] * len(routed)
+            for s, positions, group in groups.values():
+                for i, r in zip(positions, run(s, group)):
+                    res[i] = r
+
+            return res
+
+        return store.delegate_batch(items, route, run_routed, *opt)
+
     def _getStore(self, kind: str) -> store.Store:
         kind = kind.lower().replace("/", "")
 
@@ -3,9 +3,20 @@ log = logging.getLogger(__name__)
 
 
 class SQLAdapter:
+    # statements are written with "?" markers and translated
+    # to the driver parameter style once per connection, see translate
+    paramstyle = "qmark"
+
+    # driver exceptions raised for constraint violations
+    integrity_errors = ()
+
+    # column type for binary payloads
+    blob_type = "BLOB"
+
     def __init__(self):
         self._connection = None
         self._cursor = None
+        self._statements = {}
 
     def connect(self):
         raise NotImplementedError()
@@ -32,6 +43,61 @@ class SQLAdapter:
         self._cursor = None
         return self.cursor(False)
 
+    def ping(self):
+        try:
+            cursor = self.connection().cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def translate(self, query):
+        # only the placeholder rewrite is cached here, nothing is prepared
+        # on the server. statement reuse comes from the driver: sqlite keeps
+        # compiled statements per connection (cached_statements), mysql
+        # parses every statement it is sent
+        stmt = self._statements.get(query)
+        if stmt is None:
+            if self.paramstyle == "format":
+                stmt = query.replace("?", "%s")
+            else:
+                stmt = query
+
+            self._statements[query] = stmt
+
+        return stmt
+
+    def json_expression(self, path, sample=None):
+        # expression used both in index definitions and in the predicates
+        # they serve, the two must match exactly for the index to be used
+        return "json_extract(Object, '{}')".format(path)
+
+    def create_index(self, name, table, *expressions):
+        self.execute("CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+            name, table, ", ".join(expressions)))
+
+    def add_column(self, table, column, type):
+        # tables created before the column existed get it added
+        try:
+            self.execute("SELECT {} FROM {} LIMIT 0".format(column, table), retry=False)
+            self.fetchall()
+            return
+        except Exception:
+            pass
+
+        self.execute("ALTER TABLE {} ADD COLUMN {} {}".format(table, column, type))
+
+    def explain(self, query, params):
+        # the plan as lines of text, on a cursor of its own
+        cursor = self.connection().cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            return [str(r[-1]) for r in cursor.fetchall()]
+        finally:
+            cursor.close()
+
     def close(self):
         try:
             if self._cursor:
@@ -52,6 +118,9 @@ class SQLAdapter:
                 return cursor.execute(query, params)
             else:
                 return cursor.execute(query)
+        except self.integrity_errors as err:
+            # the statement was rejected, the connection is fine
+            raise err
         except Exception as err:
             if not retry:
                 raise err
@@ -60,6 +129,34 @@ class SQLAdapter:
         self._connection = None
         return self.execute(query, params, False)
 
+    def executemany(self, query, params, retry=True):
+        try:
+            return self.cursor().executemany(query, params)
+        except self.integrity_errors as err:
+            raise err
+        except Exception as err:
+            if not retry:
+                raise err
+
+        self._cursor = None
+        self._connection = None
+        return self.executemany(query, params, False)
+
+    def iterate(self, query, params, batch_size):
+        # a cursor of its own, the shared one stays free for the
+        # statements issued while the caller consumes the rows
+        cursor = self.connection().cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+
+                yield rows
+        finally:
+            cursor.close()
+
     def fetchall(self, retry=True):
         try:
             return self.cursor().fetchall()
@@ -0,0 +1,61 @@
+import re
+import zlib
+
+from collections import Counter
+
+
+class ZlibCodec:
+    # compresses stored payloads. a dictionary made of fragments that
+    # recur across objects (property names, common values) lets even
+    # small payloads compress well, the same dictionary must be used
+    # for as long as the stored payloads exist
+    def __init__(self, level: int = 6, dictionary: bytes = None):
+        if level < 0 or level > 9:
+            raise Exception("invalid compression level: {}".format(level))
+
+        self._level = level
+        self._dictionary = dictionary
+
+    def encode(self, data: bytes) -> bytes:
+        if self._dictionary is None:
+            return zlib.compress(data, self._level)
+
+        compressor = zlib.compressobj(self._level, zdict=self._dictionary)
+        return compressor.compress(data) + compressor.flush()
+
+    def decode(self, data: bytes) -> bytes:
+        if self._dictionary is None:
+            return zlib.decompress(data)
+
+        decompressor = zlib.decompressobj(zdict=self._dictionary)
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+# json strings, including the colon when they are property names
+_FRAGMENT = re.compile(r'"(?:[^"\\]|\\.)*"(?:\s*:\s*)?')
+
+
+def TrainDictionary(samples: list, size: int = 32 * 1024) -> bytes:
+    # samples are serialized objects (ToJson) representative of what
+    # gets stored. zlib looks back at most 32KiB and finds the end of
+    # the dictionary cheapest, so the most frequent fragments go last
+    counts = Counter()
+    for s in samples:
+        if isinstance(s, bytes):
+            s = s.decode("utf-8")
+        counts.update(_FRAGMENT.findall(s))
+
+    picked = []
+    total = 0
+    for fragment, count in counts.most_common():
+        if count < 2:
+            break
+
+        encoded = fragment.encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+
+        picked.append(encoded)
+        total += len(encoded)
+
+    return b"".join(reversed(picked))
@@ -0,0 +1,134 @@
+import time
+import queue
+import logging
+import threading
+
+from concurrent.futures import Future
+
+log = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    # runs the write operations of many callers in one transaction.
+    # the first queued operation opens a group, which is committed once
+    # max_ops operations joined it or max_delay seconds went by. every
+    # operation runs in a savepoint of its own, so one that fails is
+    # rolled back alone and only its caller sees the exception
+    def __init__(self, pool, max_delay=0.005, max_ops=100):
+        if max_ops < 1:
+            raise Exception("group commit size must be positive")
+
+        self._pool = pool
+        self._max_delay = max_delay
+        self._max_ops = max_ops
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self._groups = 0
+        self._ops = 0
+
+    def submit(self, operation):
+        # blocks until the group the operation joined is committed
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise Exception("group committer is closed")
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="pystorz-group-commit", daemon=True)
+                self._thread.start()
+
+            self._queue.put((operation, future))
+
+        return future.result()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "groups": self._groups,
+                "grouped_ops": self._ops,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            group = [item]
+            deadline = time.monotonic() + self._max_delay
+            stop = False
+            while len(group) < self._max_ops:
+                # whatever queued up meanwhile joins right away,
+                # then wait for more until the deadline
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                if item is None:
+                    stop = True
+                    break
+
+                group.append(item)
+
+            self._commit(group)
+            if stop:
+                return
+
+    def _commit(self, group):
+        results = []
+        try:
+            with self._pool.connection() as db:
+                try:
+                    db.execute("BEGIN")
+                    for operation, _ in group:
+                        db.execute("SAVEPOINT group_item")
+                        try:
+                            results.append((operation(db), None))
+                        except Exception as e:
+                            db.execute("ROLLBACK TO SAVEPOINT group_item")
+                            results.append((None, e))
+
+                        db.execute("RELEASE SAVEPOINT group_item")
+
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    raise e
+        except Exception as e:
+            # nothing of the group made it to the database
+            log.error("group commit failed: {}".format(e))
+            for _, future in group:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._groups += 1
+            self._ops += len(group)
+
+        for (_, future), (result, err) in zip(group, results):
+            if err is not None:
+                future.set_exception(err)
+            else:
+                future.set_result(result)
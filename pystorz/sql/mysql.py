@@ -6,15 +6,21 @@ from pystorz.sql.adapter import SQLAdapter
 
 log = logging.getLogger(__name__)
 
+_ER_DUP_KEYNAME = 1061
 
-def MySqlStoreFactory(schema, host, port, user, password, database):
+
+def MySqlStoreFactory(schema, host, port, user, password, database, **kwargs):
     def connector():
         return _MySQLAdapter(host, port, user, password, database)
 
-    return SqlStore(schema, connector)
+    return SqlStore(schema, connector, **kwargs)
 
 
 class _MySQLAdapter(SQLAdapter):
+    paramstyle = "format"
+    integrity_errors = (mysql.connector.IntegrityError,)
+    blob_type = "LONGBLOB"
+
     def __init__(self, host, port, username, password, database):
         super().__init__()
 
@@ -24,11 +30,66 @@ class _MySQLAdapter(SQLAdapter):
         self._password = password
         self._database = database
 
+    def json_expression(self, path, sample=None):
+        # JSON documents cannot be indexed directly, cast to the type
+        # of the sample value so the functional index has a scalar key
+        expression = "JSON_EXTRACT(Object, '{}')".format(path)
+        if isinstance(sample, (bool, int)):
+            return "CAST({} AS SIGNED)".format(expression)
+        if isinstance(sample, float):
+            return "CAST({} AS DOUBLE)".format(expression)
+
+        return "CAST(JSON_UNQUOTE({}) AS CHAR(255)) COLLATE utf8mb4_bin".format(
+            expression)
+
+    def create_index(self, name, table, *expressions):
+        key_parts = []
+        for e in expressions:
+            if e.isidentifier():
+                key_parts.append(e)
+            else:
+                key_parts.append("({})".format(e))
+
+        try:
+            self.execute("CREATE INDEX {} ON {} ({})".format(
+                name, table, ", ".join(key_parts)), retry=False)
+        except Exception as err:
+            # mysql has no IF NOT EXISTS for indexes
+            if getattr(err, "errno", None) != _ER_DUP_KEYNAME:
+                raise err
+
+    def explain(self, query, params):
+        cursor = self.connection().cursor()
+        try:
+            cursor.execute("EXPLAIN FORMAT=TREE " + query, params)
+            return [line for r in cursor.fetchall() for line in str(r[0]).splitlines()]
+        finally:
+            cursor.close()
+
+    def iterate(self, query, params, batch_size):
+        # rows are streamed from the server, which leaves the connection
+        # busy until they are all read, so iterate over a connection of its own
+        connection = self.connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+
+                yield rows
+        finally:
+            connection.close()
+
     def connect(self):
         return mysql.connector.connect(
             host=self._host,
             port=self._port,
             user=self._username,
             password=self._password,
-            database=self._database
+            database=self._database,
+            # reads see committed data without committing themselves,
+            # writes still open their own transaction with BEGIN
+            autocommit=True,
         )
@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+import contextlib
+
+from pystorz.internal import constants
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    # hands out adapters made by connector to one thread at a time.
+    # a thread checking out again while it holds an adapter gets the
+    # same one back, so nested operations (a Get while iterating) share
+    # their connection instead of locking each other out.
+    # idle adapters are reused most recently used first, so the ones
+    # that stay idle long enough get evicted when traffic drops
+    def __init__(
+        self,
+        connector,
+        prepare=None,
+        max_size=10,
+        timeout=30.0,
+        max_idle=300.0,
+        check_after=30.0,
+    ):
+        if max_size < 1:
+            raise Exception("pool size must be positive")
+
+        self._connector = connector
+        self._prepare = prepare
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+
+        self._max_size = max_size
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._size = 0
+        # thread id -> [adapter, checkouts]
+        self._held = {}
+
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._evicted = 0
+        self._replaced = 0
+
+    @contextlib.contextmanager
+    def connection(self):
+        db = self.checkout()
+        try:
+            yield db
+        finally:
+            self.checkin(db)
+
+    def checkout(self):
+        tid = threading.get_ident()
+        with self._cond:
+            held = self._held.get(tid)
+            if held is not None:
+                held[1] += 1
+                return held[0]
+
+            self._evict()
+
+            waited = None
+            while True:
+                if len(self._idle) > 0:
+                    db, since = self._idle.pop()
+                    break
+
+                if self._size < self._max_size:
+                    db, since = None, None
+                    self._size += 1
+                    break
+
+                if waited is None:
+                    waited = time.monotonic()
+                    self._waits += 1
+
+                remaining = self._timeout - (time.monotonic() - waited)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._wait_time += time.monotonic() - waited
+                    raise Exception(constants.ErrPoolTimeout)
+
+                self._cond.wait(remaining)
+
+            if waited is not None:
+                self._wait_time += time.monotonic() - waited
+
+            self._in_use += 1
+            self._checkouts += 1
+
+        # connecting and pinging happen outside of the lock
+        try:
+            if db is None:
+                db = self._open()
+            elif time.monotonic() - since > self._check_after and not db.ping():
+                log.info("replacing broken connection")
+                db.close()
+                db = self._open()
+                with self._cond:
+                    self._replaced += 1
+        except Exception as e:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise e
+
+        with self._cond:
+            self._held[tid] = [db, 1]
+
+        return db
+
+    def checkin(self, db):
+        with self._cond:
+            # usually the calling thread holds it, unless an
+            # iterator was finished by another thread
+            for tid, held in list(self._held.items()):
+                if held[0] is db:
+                    held[1] -= 1
+                    if held[1] > 0:
+                        return
+                    del self._held[tid]
+
+            self._idle.append((db, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def ready(self):
+        # opens a first connection if there is none, which prepares the schema
+        with self.connection():
+            pass
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self._max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "timeouts": self._timeouts,
+                "evicted": self._evicted,
+                "replaced": self._replaced,
+            }
+
+    def close(self):
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+
+        for db, _ in idle:
+            db.close()
+
+    def _open(self):
+        db = self._connector()
+
+        # the schema only needs to be prepared by the first connection
+        if not self._prepared:
+            with self._prepare_lock:
+                if not self._prepared:
+                    if self._prepare is not None:
+                        self._prepare(db)
+                    self._prepared = True
+
+        return db
+
+    def _evict(self):
+        # idle adapters are ordered oldest first
+        now = time.monotonic()
+        while len(self._idle) > 0 and now - self._idle[0][1] > self._max_idle:
+            db, _ = self._idle.pop(0)
+            self._size -= 1
+            self._evicted += 1
+            db.close()
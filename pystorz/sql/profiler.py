@@ -0,0 +1,67 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# slow queries go to a logger of their own, so they can be routed
+# and leveled apart from the rest of the store logging
+slow_log = logging.getLogger("pystorz.sql.slow")
+
+
+class QueryProfiler:
+    # keeps latency statistics per statement text. statements that
+    # take at least slow_ms are logged with the filter they came from,
+    # their query plan when explain is set, and handed to callback
+    def __init__(self, slow_ms=None, explain=False, callback=None):
+        self._slow = slow_ms / 1000.0 if slow_ms is not None else None
+        self._explain = explain
+        self._callback = callback
+
+        self._lock = threading.Lock()
+        # statement -> [count, total seconds, max seconds]
+        self._stats = {}
+
+    def record(self, db, query, params, elapsed, flt=None):
+        with self._lock:
+            stats = self._stats.get(query)
+            if stats is None:
+                stats = self._stats[query] = [0, 0.0, 0.0]
+
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+        if self._slow is None or elapsed < self._slow:
+            return
+
+        plan = None
+        if self._explain:
+            try:
+                plan = db.explain(db.translate(query), params)
+            except Exception as e:
+                plan = ["explain failed: {}".format(e)]
+
+        slow = {
+            "query": query,
+            "params": list(params),
+            "elapsed": elapsed,
+            "filter": str(flt) if flt is not None else None,
+            "plan": plan,
+        }
+
+        slow_log.warning("slow query, {:.1f}ms: {} | params: {} | filter: {} | plan: {}".format(
+            elapsed * 1000, " ".join(query.split()), slow["params"], slow["filter"],
+            " | ".join(plan) if plan is not None else None))
+
+        if self._callback is not None:
+            try:
+                self._callback(slow)
+            except Exception as e:
+                log.error("slow query callback failed: {}".format(e))
+
+    def statements(self) -> dict:
+        with self._lock:
+            return {
+                query: {"count": s[0], "total": s[1], "max": s[2]}
+                for query, s in self._stats.items()
+            }
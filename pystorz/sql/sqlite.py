@@ -1,22 +1,142 @@
 import logging
+import pathlib
 import sqlite3
 from pystorz.sql.store import SqlStore
 from pystorz.sql.adapter import SQLAdapter
 
 log = logging.getLogger(__name__)
 
+_JOURNAL_MODES = ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]
+_SYNCHRONOUS = ["OFF", "NORMAL", "FULL", "EXTRA"]
+_TEMP_STORE = ["DEFAULT", "FILE", "MEMORY"]
+
+
+class SqliteProfile:
+    # connection pragmas, None leaves the sqlite default in place.
+    # cache_size follows the pragma: positive in pages, negative in KiB
+    def __init__(
+        self,
+        journal_mode=None,
+        synchronous=None,
+        mmap_size=None,
+        cache_size=None,
+        temp_store=None,
+        busy_timeout=None,
+    ):
+        self.journal_mode = _choice("journal_mode", journal_mode, _JOURNAL_MODES)
+        self.synchronous = _choice("synchronous", synchronous, _SYNCHRONOUS)
+        self.mmap_size = _integer("mmap_size", mmap_size)
+        self.cache_size = _integer("cache_size", cache_size)
+        self.temp_store = _choice("temp_store", temp_store, _TEMP_STORE)
+        self.busy_timeout = _integer("busy_timeout", busy_timeout)
+
+    def Pragmas(self) -> list[str]:
+        pragmas = []
+        # the busy timeout goes first so the rest already waits for locks
+        for name in ["busy_timeout", "journal_mode", "synchronous",
+                     "mmap_size", "cache_size", "temp_store"]:
+            value = getattr(self, name)
+            if value is not None:
+                pragmas.append("PRAGMA {} = {}".format(name, value))
+
+        return pragmas
+
+
+def ReadOptimizedProfile() -> SqliteProfile:
+    # readers never block the writer, commits skip the fsync of the
+    # WAL (a power loss may drop the last transactions, never corrupts)
+    return SqliteProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+    )
+
+
+def DurableProfile() -> SqliteProfile:
+    # every commit is synced to disk before it returns
+    return SqliteProfile(
+        journal_mode="WAL",
+        synchronous="FULL",
+        cache_size=-16 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=10000,
+    )
+
+
+def SqliteStoreFactory(schema, path, profile: SqliteProfile = None, single_writer=False, **kwargs):
+    # single_writer: one connection does all the writing, reads run on a
+    # pool of read-only connections that the writer never blocks in WAL mode
+    if single_writer:
+        if profile is None:
+            profile = ReadOptimizedProfile()
+
+        if profile.journal_mode != "WAL":
+            raise Exception("single writer mode needs the WAL journal mode")
+
+        def reader():
+            return _SqliteAdapter(path, profile, read_only=True)
+
+        kwargs["read_connector"] = reader
 
-def SqliteStoreFactory(schema, path):
     def connector():
-        return _SqliteAdapter(path)
+        return _SqliteAdapter(path, profile)
 
-    return SqlStore(schema, connector)
+    return SqlStore(schema, connector, **kwargs)
 
 
 class _SqliteAdapter(SQLAdapter):
-    def __init__(self, path):
+    integrity_errors = (sqlite3.IntegrityError,)
+
+    def __init__(self, path, profile=None, read_only=False):
         super().__init__()
         self._path = path
+        self._profile = profile
+        self._read_only = read_only
 
     def connect(self):
-        return sqlite3.connect(self._path)
+        # sqlite keeps compiled statements per connection keyed by the
+        # statement text, SqlStore statements are constant so they all fit.
+        # the pool hands connections to one thread at a time, but not
+        # always to the thread that opened them
+        if self._read_only:
+            connection = sqlite3.connect(
+                pathlib.Path(self._path).absolute().as_uri() + "?mode=ro",
+                uri=True, cached_statements=256, check_same_thread=False)
+        else:
+            connection = sqlite3.connect(
+                self._path, cached_statements=256, check_same_thread=False)
+
+        if self._profile is not None:
+            for pragma in self._profile.Pragmas():
+                # the journal mode is set by the writer, for the database
+                if self._read_only and "journal_mode" in pragma:
+                    continue
+
+                log.debug(pragma)
+                connection.execute(pragma).fetchall()
+
+        return connection
+
+
+def _choice(name, value, allowed):
+    if value is None:
+        return None
+
+    value = str(value).upper()
+    if value not in allowed:
+        raise Exception("invalid {}: {}".format(name, value))
+
+    return value
+
+
+def _integer(name, value):
+    if value is None:
+        return None
+
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise Exception("invalid {}: {}".format(name, value))
+
+    return value
@@ -1,26 +1,109 @@
+import re
+import json
+import time
+import typing
 import logging
-import threading
-import sqlparse
 
 from pystorz.internal import constants
 from pystorz.store import store, options, utils
+from pystorz.sql import pool, committer, profiler
 
 log = logging.getLogger(__name__)
 
 
 class SqlStore(store.Store):
-    def __init__(self, Schema, connector):
+    def __init__(
+        self,
+        Schema,
+        connector,
+        indexes=None,
+        pool_size=10,
+        pool_timeout=30.0,
+        pool_idle=300.0,
+        group_commit_ms=None,
+        group_commit_ops=100,
+        codec=None,
+        read_connector=None,
+        slow_query_ms=None,
+        explain_slow_queries=False,
+        on_slow_query=None,
+    ):
         self._schema = Schema
-        self._makeConnection = connector
-        self._connection_cache = {}
+        # opt-in, objects are stored compressed with only the metadata
+        # and the indexed properties left in the queryable Object column
+        self._codec = codec
+        self._indexes = self._collectIndexes(indexes or [])
+        self._indexed = {}
+        self._prepared = False
+
+        # opt-in, statement latencies are kept and slow statements
+        # reported, along with their query plan when asked for
+        self._profiler = None
+        if slow_query_ms is not None:
+            self._profiler = profiler.QueryProfiler(
+                slow_query_ms, explain_slow_queries, on_slow_query)
+
+        if read_connector is None:
+            self._pool = pool.ConnectionPool(
+                connector,
+                prepare=self._prepareTables,
+                max_size=pool_size,
+                timeout=pool_timeout,
+                max_idle=pool_idle,
+            )
+            self._readPool = self._pool
+        else:
+            # a single writer connection that writers queue up for,
+            # reads go to connections of their own
+            self._pool = pool.ConnectionPool(
+                connector,
+                prepare=self._prepareTables,
+                max_size=1,
+                timeout=pool_timeout,
+                max_idle=pool_idle,
+            )
+            self._readPool = pool.ConnectionPool(
+                read_connector,
+                prepare=lambda db: self._pool.ready(),
+                max_size=pool_size,
+                timeout=pool_timeout,
+                max_idle=pool_idle,
+            )
+
+        # opt-in, concurrent writes share transactions and their commits
+        self._committer = None
+        if group_commit_ms is not None:
+            self._committer = committer.GroupCommitter(
+                self._pool,
+                max_delay=group_commit_ms / 1000.0,
+                max_ops=group_commit_ops,
+            )
+
+    def Metrics(self) -> dict:
+        metrics = self._pool.metrics()
+        if self._readPool is not self._pool:
+            for k, v in self._readPool.metrics().items():
+                metrics["read_" + k] = v
 
-    def _connection(self):
-        tid = threading.get_ident()
-        if tid not in self._connection_cache:
-            self._connection_cache[tid] = self._makeConnection()
-            self._prepareTables(self._connection_cache[tid])
+        if self._committer is not None:
+            metrics.update(self._committer.metrics())
 
-        return self._connection_cache[tid]
+        return metrics
+
+    def Statements(self) -> dict:
+        # statement -> count, total and max seconds, when profiling
+        if self._profiler is None:
+            return {}
+
+        return self._profiler.statements()
+
+    def Close(self):
+        if self._committer is not None:
+            self._committer.close()
+
+        self._pool.close()
+        if self._readPool is not self._pool:
+            self._readPool.close()
 
     def Create(self, obj: store.Object, *opt: options.CreateOption) -> store.Object:
         if obj is None:
@@ -34,38 +117,7 @@ class SqlStore(store.Store):
         # for o in opt:
         #     o.ApplyFunction()(copt)
 
-        lk = obj.Metadata().Kind().lower()
-        path = "{}/{}".format(lk, obj.PrimaryKey())
-        existing = None
-        try:
-            existing = self.Get(store.ObjectIdentity(path))
-        except Exception as e:
-            pass
-
-        if existing is not None:
-            raise Exception(constants.ErrObjectExists)
-
-        db = self._connection()
-
-        try:
-            # Start a transaction
-            db.execute("BEGIN")
-
-            self._setIdentity(
-                db,
-                obj.Metadata().Identity().Path(),
-                obj.PrimaryKey(),
-                obj.Metadata().Kind(),
-            )
-
-            self._setObject(db, obj.PrimaryKey(), obj.Metadata().Kind(), obj)
-
-            # Commit the transaction
-            db.commit()
-            return obj.Clone()
-        except Exception as e:
-            db.rollback()
-            raise e
+        return self._write(lambda db: self._createObject(db, obj))
 
     def Update(self, identity: store.ObjectIdentity, obj: store.Object, *opt: options.UpdateOption) -> store.Object:
         # copt = options.CommonOptionHolderFactory()
@@ -80,122 +132,182 @@ class SqlStore(store.Store):
 
         log.info("update {}".format(identity.Path()))
 
-        existing = self.Get(identity)
-        if existing.Metadata().Kind() != obj.Metadata().Kind():
-            raise Exception(constants.ErrObjectIdentityMismatch)
+        return self._write(lambda db: self._updateObject(db, identity, obj))
 
-        if existing.PrimaryKey() != obj.PrimaryKey():
-            # log.info("primary key changed from {} to {}".format(
-            #     existing.PrimaryKey(), obj.PrimaryKey())
-            # )
-
-            if (
-                existing.Metadata().Identity().Path()
-                != obj.Metadata().Identity().Path()
-            ):
-                raise Exception(constants.ErrObjectIdentityMismatch)
-
-            # see if there is an object with the new primary key value
-            target_identity = store.ObjectIdentity(
-                "{}/{}".format(existing.Metadata().Kind().lower(),
-                               obj.PrimaryKey())
-            )
+    def Delete(self, identity: store.ObjectIdentity, *opt: options.DeleteOption):
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info("delete {}".format(identity.Path()))
+        copt = store.delete_options(*opt)
 
-            target = None
+        def delete(db):
+            if copt.filter is None:
+                self._deleteObject(db, identity)
+            else:
+                # identities go first, the filter matches on Objects
+                clause, params = self._buildFilterClause(copt, identity)
+                self._removeIdentities(db, identity.Type(), clause, params, copt.filter)
+                self._removeObjects(db, identity.Type(), clause, params, copt.filter)
+
+        self._write(delete)
+
+    def CreateMany(self, objs: list[store.Object], *opt: options.CreateOption) -> store.BatchResult:
+        log.info("create {} objects".format(len(objs)))
+
+        abort = store.abort_on_error(*opt)
+        for obj in objs:
+            if obj is None and abort:
+                raise Exception(constants.ErrObjectNil)
+
+        def create(db):
+            valid = [o for o in objs if o is not None]
+            db.execute("SAVEPOINT create_many")
             try:
-                target = self.Get(target_identity)
-            except Exception as e:
-                pass
+                self._setIdentities(db, valid)
+                self._setObjects(db, valid)
+            except db.integrity_errors:
+                if abort:
+                    raise Exception(constants.ErrObjectExists)
 
-            if target is not None:
-                raise Exception(constants.ErrObjectExists)
+                # find out which ones collided, one item at a time
+                db.execute("ROLLBACK TO SAVEPOINT create_many")
+                db.execute("RELEASE SAVEPOINT create_many")
+                return self._runBatch(
+                    db, objs, lambda o: self._createObject(db, o), abort)
 
-        db = self._connection()
+            db.execute("RELEASE SAVEPOINT create_many")
+            return store.BatchResult(
+                [self._createdOrNil(o) for o in objs])
 
-        try:
-            # Start a transaction
-            db.execute("BEGIN")
+        return self._write(create)
 
-            self._removeIdentity(db, existing.Metadata().Identity().Path())
-            self._setIdentity(
-                db,
-                obj.Metadata().Identity().Path(),
-                obj.PrimaryKey(),
-                obj.Metadata().Kind(),
-            )
+    def UpdateMany(self, items: list[tuple[store.ObjectIdentity, store.Object]], *opt: options.UpdateOption) -> store.BatchResult:
+        log.info("update {} objects".format(len(items)))
 
-            self._removeObject(
-                db, existing.PrimaryKey(), existing.Metadata().Kind()
-            )
-            self._setObject(db, obj.PrimaryKey(), obj.Metadata().Kind(), obj)
+        def update(db, item):
+            identity, obj = item
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
 
-            db.commit()
-            return obj.Clone()
-        except Exception as e:
-            db.rollback()
-            raise e
+            return self._updateObject(db, identity, obj)
 
-    def Delete(self, identity: store.ObjectIdentity, *opt: options.DeleteOption):
+        abort = store.abort_on_error(*opt)
+        return self._write(lambda db: self._runBatch(
+            db, items, lambda item: update(db, item), abort))
+
+    def DeleteMany(self, identities: list[store.ObjectIdentity], *opt: options.DeleteOption) -> store.BatchResult:
+        log.info("delete {} objects".format(len(identities)))
+
+        def delete(db, identity):
+            if identity is None:
+                raise Exception(constants.ErrInvalidPath)
+
+            self._deleteObject(db, identity)
+
+        abort = store.abort_on_error(*opt)
+        return self._write(lambda db: self._runBatch(
+            db, identities, lambda identity: delete(db, identity), abort))
+
+    def _write(self, operation):
+        # runs operation(db) in a transaction of its own, or hands
+        # it to the committer to share one with concurrent writers
+        if self._committer is not None:
+            return self._committer.submit(operation)
+
+        with self._pool.connection() as db:
+            try:
+                db.execute("BEGIN")
+                res = operation(db)
+                db.commit()
+                return res
+            except Exception as e:
+                db.rollback()
+                raise e
+
+    def Get(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> store.Object:
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
 
-        log.info("delete {}".format(identity.Path()))
+        log.info("get {}".format(identity.Path()))
+
         copt = options.CommonOptionHolderFactory()
         for o in opt:
             o.ApplyFunction()(copt)
 
-        db = self._connection()
+        with self._readPool.connection() as db:
+            # reads run outside of a transaction, nothing to commit
+            if identity.Type() == "id":
+                return self._getObjectById(db, identity.Path())
 
-        try:
-            # Start a transaction
-            db.execute("BEGIN")
+            return self._getObject(db, identity.Key(), identity.Type())
 
-            if copt.filter is None:
-                existing = self.Get(identity)
+    def List(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> store.ObjectList:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
 
-                self._removeIdentity(db, existing.Metadata().Identity().Path())
-                self._removeObject(
-                    db, existing.PrimaryKey(), existing.Metadata().Kind()
-                )
-            else:
-                clause = self._buildFilterClause(copt, identity)
-                keys = self._getObjectKeys(db, identity.Type(), clause)
+        log.info("list {}".format(identity.Path()))
 
-                self._removeObjects(db, identity.Type(), clause)
-                self._removeIdentities(db, identity.Type(), keys)
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
 
-            db.commit()
-        except Exception as e:
-            db.rollback()
-            raise e
+        copt = options.CommonOptionHolderFactory()
+        for o in opt:
+            o.ApplyFunction()(copt)
 
-    def Get(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> store.Object:
+        with self._readPool.connection() as db:
+            query, params = self._buildListQuery(copt, identity)
+            rows = self._do_query(db, query, params, copt.filter, fetch=True)
+            return self._parseObjectRows(rows, identity.Type())
+
+    def Count(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> int:
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
 
-        log.info("get {}".format(identity.Path()))
+        log.info("count {}".format(identity.Path()))
+
+        if len(identity.Key()) > 0:
+            raise Exception(constants.ErrInvalidPath)
 
         copt = options.CommonOptionHolderFactory()
         for o in opt:
             o.ApplyFunction()(copt)
 
-        db = self._connection()
+        query = """SELECT COUNT(*) FROM Objects
+        WHERE Type = ?"""
+
+        with self._readPool.connection() as db:
+            # the index expressions are known once the tables are prepared
+            clause, params = self._buildFilterClause(copt, identity)
+            return self._fetchSingle(
+                db, query + clause, [identity.Type()] + params, copt.filter)[0]
+
+    def Exists(self, identity: store.ObjectIdentity, *opt: options.GetOption) -> bool:
+        if identity is None:
+            raise Exception(constants.ErrInvalidPath)
+
+        log.info("exists {}".format(identity.Path()))
 
-        res = None
-        if identity.IsId():
-            pkey, typ = self._getIdentity(db, identity.Path())
-            res = self._getObject(db, pkey, typ)
+        if len(identity.Key()) == 0:
+            raise Exception(constants.ErrInvalidPath)
+
+        if identity.Type() == "id":
+            query = """SELECT 1 FROM IdIndex
+            WHERE Path = ?"""
+            params = (identity.Path(),)
         else:
-            res = self._getObject(db, identity.Key(), identity.Type())
+            query = """SELECT 1 FROM Objects
+            WHERE Pkey = ? AND Type = ?"""
+            params = (identity.Key(), identity.Type().lower())
 
-        db.commit()
-        return res
+        with self._readPool.connection() as db:
+            return self._fetchSingle(db, query, params) is not None
 
-    def List(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> store.ObjectList:
+    def Iterate(self, identity: store.ObjectIdentity, *opt: options.ListOption) -> typing.Iterator[store.Object]:
         if identity is None:
             raise Exception(constants.ErrInvalidPath)
 
-        log.info("list {}".format(identity.Path()))
+        log.info("iterate {}".format(identity.Path()))
 
         if len(identity.Key()) > 0:
             raise Exception(constants.ErrInvalidPath)
@@ -204,37 +316,94 @@ class SqlStore(store.Store):
         for o in opt:
             o.ApplyFunction()(copt)
 
-        db = self._connection()
+        # the query is built right away, so that invalid options raise
+        # here, the connection is only checked out once iterating starts
+        if not self._prepared:
+            self._pool.ready()
+
+        query, params = self._buildListQuery(copt, identity)
+
+        return self._iterateRows(
+            query, params,
+            copt.batch_size or store.DEFAULT_BATCH_SIZE,
+            identity.Type(),
+            copt.filter)
+
+    def _iterateRows(self, query, params, batch_size, typ, flt):
+        # the connection stays checked out until the caller
+        # is done with the iterator
+        with self._readPool.connection() as db:
+            log.debug("running query: {}".format(query))
+
+            # the statement is timed up to its first batch, the
+            # rest depends on how fast the caller consumes them
+            start = time.perf_counter()
+            for rows in db.iterate(db.translate(query), params, batch_size):
+                if start is not None:
+                    self._profile(db, query, params, start, flt)
+                    start = None
+
+                for row in rows:
+                    yield self._parseObjectRow(row, typ)
+
+            if start is not None:
+                self._profile(db, query, params, start, flt)
+
+    def _buildListQuery(self, copt, identity):
+        query = """SELECT Object, Payload FROM Objects
+        WHERE Type = ?"""
+        params = [identity.Type()]
+
+        clause, clause_params = self._buildFilterClause(copt, identity)
+        query += clause
+        params += clause_params
+
+        # the primary key breaks ties so pages never overlap or skip
+        expression, expression_params = "Pkey", []
+        if copt.order_by is not None and len(copt.order_by) > 0:
+            expression, expression_params = self._jsonExpression(copt.order_by)
 
-        query = """SELECT Object FROM Objects 
-        WHERE Type = '{}'""".format(
-            identity.Type()
-        )
+        direction = "ASC"
+        if copt.order_incremental is not None and not copt.order_incremental:
+            direction = "DESC"
 
-        query += self._buildFilterClause(copt, identity)
+        if copt.after_pkey is not None:
+            clause, clause_params = self._buildAfterClause(
+                copt, expression, expression_params, direction)
+            query += clause
+            params += clause_params
 
-        if copt.order_by is not None and len(copt.order_by) > 0:
+        if expression != "Pkey":
             query += """
-            ORDER BY json_extract(Object, '$.{}')""".format(
-                copt.order_by
-            )
-            if copt.order_incremental is None or copt.order_incremental:
-                query = query + " ASC"
-            else:
-                query = query + " DESC"
+            ORDER BY {} {}, Pkey {}""".format(expression, direction, direction)
+            params += expression_params
+        elif copt.after_pkey is not None:
+            query += """
+            ORDER BY Pkey ASC"""
 
         if copt.page_size is not None and copt.page_size > 0:
-            query = query + " LIMIT {}".format(copt.page_size)
+            query = query + " LIMIT ?"
+            params.append(int(copt.page_size))
 
         if copt.page_offset is not None and copt.page_offset > 0:
-            query = query + " OFFSET {}".format(copt.page_offset)
+            query = query + " OFFSET ?"
+            params.append(int(copt.page_offset))
 
-        self._do_query(db, query)
-        rows = db.fetchall()
+        return query, params
 
-        res = self._parseObjectRows(rows, identity.Type())
-        db.commit()
-        return res
+    def _buildAfterClause(self, copt, expression, expression_params, direction):
+        operator = ">" if direction == "ASC" else "<"
+        if expression == "Pkey":
+            return """
+            AND Pkey {} ?""".format(operator), [copt.after_pkey]
+
+        # the leading range on the order expression keeps the clause
+        # usable by an index on it
+        return """
+            AND {e} {o}= ? AND ({e} {o} ? OR Pkey {o} ?)""".format(
+            e=expression, o=operator), (
+            expression_params + [copt.after_value] +
+            expression_params + [copt.after_value, copt.after_pkey])
 
     def _prepareTables(self, db):
         create = """
@@ -244,27 +413,73 @@ class SqlStore(store.Store):
             Type VARCHAR(25) NOT NULL);
         """
 
-        self._do_query(db, create)
+        db.execute(create)
 
         create = """
         CREATE TABLE IF NOT EXISTS Objects (
             Pkey NVARCHAR(50) NOT NULL,
             Type VARCHAR(25) NOT NULL,
             Object JSON,
+            Payload {},
             PRIMARY KEY (Pkey,Type));
+        """.format(db.blob_type)
+
+        db.execute(create)
+        db.add_column("Objects", "Payload", db.blob_type)
+        db.create_index("IX_IdIndex_Type_Pkey", "IdIndex", "Type", "Pkey")
+
+        create = """
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            Version INTEGER NOT NULL);
         """
 
         db.execute(create)
+        self._migrate(db)
+
+        for path, sample in self._indexes.items():
+            expression = db.json_expression(_json_path(path), sample)
+            db.create_index(_index_name(path), "Objects", expression, "Pkey")
+            self._indexed[path] = expression
+
         db.commit()
+        self._prepared = True
+
+    def _migrate(self, db):
+        # databases without a version were written before values were
+        # bound, their objects have single quotes escaped as $%#
+        db.execute("SELECT MAX(Version) FROM SchemaVersion")
+        version = db.fetchall()[0][0]
+        if version is not None and version >= _SCHEMA_VERSION:
+            return
+
+        query = """UPDATE Objects SET Object = REPLACE(Object, ?, ?)
+        WHERE INSTR(Object, ?) > 0"""
+
+        db.execute(db.translate(query), ("$%#", "'", "$%#"))
+        db.execute("DELETE FROM SchemaVersion")
+        db.execute(db.translate("INSERT INTO SchemaVersion (Version) VALUES (?)"), (_SCHEMA_VERSION,))
+
+    def _collectIndexes(self, extra):
+        # index path -> sample value, the sample types the index expression
+        indexes = {}
+        for kind in self._schema.Types():
+            sample = self._schema.ObjectForKind(kind)
+            for path in self._schema.Indexes(kind) + list(extra):
+                value = utils.object_path(sample, path)
+                if value is not None or path not in indexes:
+                    indexes[path] = value
+
+        for path in indexes.keys():
+            if not _INDEX_PATH.match(path):
+                raise Exception("invalid index path: {}".format(path))
+
+        return indexes
 
     def _getIdentity(self, db, path):
-        query = """SELECT Pkey, Type FROM IdIndex 
-        WHERE Path='{}'""".format(
-            path
-        )
+        query = """SELECT Pkey, Type FROM IdIndex
+        WHERE Path = ?"""
 
-        self._do_query(db, query)
-        result = db.fetchone()
+        result = self._fetchSingle(db, query, (path,))
 
         if result is not None:
             pkey, typ = result
@@ -273,155 +488,254 @@ class SqlStore(store.Store):
             raise Exception(constants.ErrNoSuchObject)
 
     def _setIdentity(self, db, path, pkey, typ):
-        # existing_pkey, existing_typ = None, None
-
-        # try:
-        #     existing_pkey, existing_typ = self._getIdentity(db, path)
-        # except Exception as e:
-        #     log.debug("identity get failed: {}".format(e))
-
-        # query = ""
-        # if existing_pkey is not None and existing_typ is not None:
-        #     query = """UPDATE IdIndex SET Pkey='{}', Type='{}'
-        #     WHERE Path='{}'""".format(
-        #         pkey, typ.lower(), path
-        #     )
-        # else:
         query = """INSERT INTO IdIndex (Pkey, Type, Path)
-        VALUES ('{}', '{}', '{}')""".format(
-            pkey, typ.lower(), path
-        )
+        VALUES (?, ?, ?)"""
+
+        self._do_query(db, query, (pkey, typ.lower(), path))
 
-        self._do_query(db, query)
+    def _setIdentities(self, db, objs):
+        query = """INSERT INTO IdIndex (Pkey, Type, Path)
+        VALUES (?, ?, ?)"""
+
+        db.executemany(db.translate(query), [(
+            o.PrimaryKey(),
+            o.Metadata().Kind().lower(),
+            o.Metadata().Identity().Path()) for o in objs])
 
     def _removeIdentity(self, db, path):
         query = """DELETE FROM IdIndex
-        WHERE Path = '{}'""".format(
-            path
-        )
+        WHERE Path = ?"""
+
+        self._do_query(db, query, (path,))
+
+    def _getIdentityRow(self, db, identity):
+        if identity.Type() == "id":
+            query = """SELECT Path, Pkey, Type FROM IdIndex
+            WHERE Path = ?"""
+            params = (identity.Path(),)
+        else:
+            query = """SELECT Path, Pkey, Type FROM IdIndex
+            WHERE Type = ? AND Pkey = ?"""
+            params = (identity.Type(), identity.Key())
+
+        result = self._fetchSingle(db, query, params)
+
+        if result is None:
+            raise Exception(constants.ErrNoSuchObject)
+
+        return result
+
+    def _createObject(self, db, obj):
+        if obj is None:
+            raise Exception(constants.ErrObjectNil)
+
+        # both tables reject duplicates by their primary keys
+        try:
+            self._setIdentity(
+                db,
+                obj.Metadata().Identity().Path(),
+                obj.PrimaryKey(),
+                obj.Metadata().Kind(),
+            )
+
+            self._setObject(db, obj.PrimaryKey(), obj.Metadata().Kind(), obj)
+        except db.integrity_errors:
+            raise Exception(constants.ErrObjectExists)
+
+        return obj.Clone()
+
+    def _deleteObject(self, db, identity):
+        path, pkey, typ = self._getIdentityRow(db, identity)
+
+        self._removeIdentity(db, path)
+        self._removeObject(db, pkey, typ)
 
-        self._do_query(db, query)
+    def _runBatch(self, db, items, operation, abort):
+        # every item runs in its own savepoint so a failed item
+        # leaves the rest of the transaction intact
+        res = store.BatchResult()
+        for item in items:
+            db.execute("SAVEPOINT batch_item")
+            try:
+                res.append(operation(item))
+            except Exception as e:
+                if abort:
+                    raise e
+
+                db.execute("ROLLBACK TO SAVEPOINT batch_item")
+                res.append(e)
+
+            db.execute("RELEASE SAVEPOINT batch_item")
+
+        return res
+
+    def _createdOrNil(self, obj):
+        if obj is None:
+            return Exception(constants.ErrObjectNil)
+
+        return obj.Clone()
+
+    def _updateObject(self, db, identity, obj):
+        # updates in place, the primary keys of Objects and IdIndex
+        # reject a new primary key or identity that is already taken
+        path, pkey, typ = self._getIdentityRow(db, identity)
+        if typ != obj.Metadata().Kind().lower():
+            raise Exception(constants.ErrObjectIdentityMismatch)
+
+        new_path = obj.Metadata().Identity().Path()
+        new_pkey = obj.PrimaryKey()
+        if pkey != new_pkey and path != new_path:
+            raise Exception(constants.ErrObjectIdentityMismatch)
+
+        query = """UPDATE Objects SET Pkey = ?, Object = ?, Payload = ?
+        WHERE Pkey = ? AND Type = ?"""
+
+        data, payload = self._encodeObject(obj)
+        try:
+            self._do_query(db, query, (new_pkey, data, payload, pkey, typ))
+        except db.integrity_errors:
+            raise Exception(constants.ErrObjectExists)
+
+        if pkey != new_pkey or path != new_path:
+            query = """UPDATE IdIndex SET Path = ?, Pkey = ?
+            WHERE Path = ?"""
+
+            try:
+                self._do_query(db, query, (new_path, new_pkey, path))
+            except db.integrity_errors:
+                raise Exception(constants.ErrObjectExists)
+
+        return obj.Clone()
 
     def _getObject(self, db, pkey, typ):
-        query = """SELECT Object FROM Objects
-        WHERE Pkey='{}' AND Type='{}'""".format(
-            pkey, typ.lower()
-        )
+        query = """SELECT Object, Payload FROM Objects
+        WHERE Pkey = ? AND Type = ?"""
+
+        result = self._fetchSingle(db, query, (pkey, typ.lower()))
+
+        if result is not None:
+            return self._parseObjectRow(result, typ)
+        else:
+            raise Exception(constants.ErrNoSuchObject)
+
+    def _getObjectById(self, db, path):
+        query = """SELECT Objects.Object, Objects.Payload, Objects.Type FROM IdIndex
+        JOIN Objects
+        ON Objects.Pkey = IdIndex.Pkey AND Objects.Type = IdIndex.Type
+        WHERE IdIndex.Path = ?"""
 
-        self._do_query(db, query)
-        result = db.fetchone()
+        result = self._fetchSingle(db, query, (path,))
 
         if result is not None:
-            data = result[0]
-            data = utils.decode_string(data)
-            return self._parseObjectRow(data, typ)
+            return self._parseObjectRow(result, result[2])
         else:
             raise Exception(constants.ErrNoSuchObject)
 
+    def _fetchSingle(self, db, query, params=(), flt=None):
+        # drain the statement so it releases its read lock right away
+        rows = self._do_query(db, query, params, flt, fetch=True)
+        if len(rows) == 0:
+            return None
+
+        return rows[0]
+
     def _setObject(self, db, pkey, typ, obj):
-        query = ""
-        # existing_obj = None
-
-        # try:
-        #     existing_obj = self._getObject(db, pkey, typ)
-        # except Exception as e:
-        #     log.debug("object get failed: {}".format(e))
-
-        data = obj.ToJson()
-        # encode the data so it doesn't contain any SQL unfriendly characters
-        data = utils.encode_string(data)
-
-        # if existing_obj is not None:
-        #     query = """UPDATE Objects SET Object='{}'
-        #     WHERE Pkey = '{}' AND Type = '{}'""".format(
-        #         data, pkey, typ.lower()
-        #     )
-        # else:
-        query = """INSERT INTO Objects (Object, Pkey, Type)
-        VALUES ('{}', '{}', '{}')""".format(
-            data, pkey, typ.lower()
-        )
+        query = """INSERT INTO Objects (Object, Payload, Pkey, Type)
+        VALUES (?, ?, ?, ?)"""
+
+        data, payload = self._encodeObject(obj)
+        self._do_query(db, query, (data, payload, pkey, typ.lower()))
+
+    def _setObjects(self, db, objs):
+        query = """INSERT INTO Objects (Object, Payload, Pkey, Type)
+        VALUES (?, ?, ?, ?)"""
 
-        self._do_query(db, query)
+        db.executemany(db.translate(query), [
+            self._encodeObject(o) + (o.PrimaryKey(), o.Metadata().Kind().lower())
+            for o in objs])
 
     def _removeObject(self, db, pkey, typ):
         query = """DELETE FROM Objects
-        WHERE Pkey = '{}' AND Type = '{}'""".format(
-            pkey, typ.lower()
-        )
+        WHERE Pkey = ? AND Type = ?"""
 
-        self._do_query(db, query)
+        self._do_query(db, query, (pkey, typ.lower()))
 
-    def _getObjectKeys(self, db, typ, clause):
-        query = """SELECT Pkey FROM Objects
-        WHERE Type = '{}' {}""".format(
-            typ.lower(),
-            clause,
-        )
+    def _removeIdentities(self, db, typ, clause, params, flt):
+        # the matching keys never leave the database, IX_IdIndex_Type_Pkey
+        # serves the lookup of each one of them
+        query = """DELETE FROM IdIndex
+        WHERE Type = ? AND Pkey IN (
+            SELECT Pkey FROM Objects
+            WHERE Type = ? {})""".format(clause)
 
-        self._do_query(db, query)
-        rows = db.fetchall()
-        res = []
-        for row in rows:
-            res.append(row[0])
-        return res
+        self._do_query(db, query, [typ.lower(), typ.lower()] + params, flt)
 
-    def _removeIdentities(self, db, typ, keys):
-        batch_size = 100
-        for i in range(0, len(keys), batch_size):
-            batch = keys[i: i + batch_size]
-            clause = "Pkey IN ({})".format(
-                ",".join(["'{}'".format(k) for k in batch]))
-
-            query = """DELETE FROM IdIndex
-                WHERE Type = '{}' AND {}""".format(
-                typ.lower(),
-                clause,
-            )
+    def _removeObjects(self, db, typ, clause, params, flt):
+        query = """DELETE FROM Objects
+        WHERE Type = ? {}""".format(clause)
 
-            self._do_query(db, query)
+        self._do_query(db, query, [typ.lower()] + params, flt)
 
-    def _removeObjects(self, db, typ, clause):
-        query = """DELETE FROM Objects
-        WHERE Type = '{}' {}""".format(
-            typ.lower(),
-            clause,
-        )
+    def _encodeObject(self, obj):
+        # -> (Object, Payload) column values
+        if self._codec is None:
+            return obj.ToJson(), None
+
+        data = obj.ToDict()
+        projection = {"metadata": data.get("metadata")}
+        for path in self._indexes.keys():
+            _project(data, path.split("."), projection)
 
-        self._do_query(db, query)
+        return json.dumps(projection), self._codec.encode(json.dumps(data).encode("utf-8"))
+
+    def _parseObjectRow(self, row, typ):
+        # row starts with the Object and Payload columns
+        data, payload = row[0], row[1]
+        if payload is not None:
+            if self._codec is None:
+                raise Exception("object {} is compressed, a codec is needed to read it".format(typ))
+
+            data = self._codec.decode(payload).decode("utf-8")
 
-    def _parseObjectRow(self, data, typ):
         return utils.unmarshal_object(data, self._schema, typ)
 
     def _parseObjectRows(self, rows, typ) -> store.ObjectList:
         res = store.ObjectList()
         for row in rows:
-            data = utils.decode_string(row[0])
-            res.append(self._parseObjectRow(data, typ))
+            res.append(self._parseObjectRow(row, typ))
         return res
 
-    def _do_query(self, db, query):
+    def _do_query(self, db, query, params=(), flt=None, fetch=False):
+        # values are always bound, never formatted into the statement.
+        # fetch returns the rows, which are then part of the timing
         log.debug("running query: {}".format(query))
 
-        statements = sqlparse.parse(query)
-        if len(statements) > 1:
-            raise Exception(constants.ErrInvalidRequest)
+        if self._profiler is None:
+            db.execute(db.translate(query), params)
+            return db.fetchall() if fetch else None
+
+        start = time.perf_counter()
+        db.execute(db.translate(query), params)
+        rows = db.fetchall() if fetch else None
+        self._profile(db, query, params, start, flt)
+        return rows
 
-        db.execute(query)
+    def _profile(self, db, query, params, start, flt):
+        if self._profiler is not None:
+            self._profiler.record(db, query, params, time.perf_counter() - start, flt)
 
     def _buildFilterClause(self, copt, identity):
         if copt.filter is None:
-            return ""
+            return "", []
 
         sample = self._schema.ObjectForKind(identity.Type())
         # if sample is None:
         #     raise Exception(constants.ErrInvalidPath)
 
+        clause, params = self._convertFilter(copt.filter, sample)
         return """
             AND ({})
-            """.format(
-            self._convertFilter(copt.filter, sample)
-        )
+            """.format(clause), params
 
     def _convertFilter(self, filterOption, sample):
         if isinstance(filterOption, options._ListDeleteOption):
@@ -430,68 +744,87 @@ class SqlStore(store.Store):
             filterOption = copt.filter
 
         if isinstance(filterOption, options.AndOption):
-            return "( {} )".format(
-                " AND ".join(
-                    [self._convertFilter(f, sample)
-                     for f in filterOption.filters]
-                )
-            )
+            return self._joinFilters(" AND ", filterOption.filters, sample)
 
         if isinstance(filterOption, options.OrOption):
-            return "( {} )".format(
-                " OR ".join(
-                    [self._convertFilter(f, sample)
-                     for f in filterOption.filters]
-                )
-            )
+            return self._joinFilters(" OR ", filterOption.filters, sample)
 
         if isinstance(filterOption, options.NotOption):
-            return "( NOT {} )".format(
-                self._convertFilter(filterOption.filter, sample)
-            )
+            clause, params = self._convertFilter(filterOption.filter, sample)
+            return "( NOT {} )".format(clause), params
 
         if utils.object_path(sample, filterOption.key) is None:
             raise Exception(constants.ErrInvalidFilter)
 
-        def convert_value(v):
-            # return "'{}'".format(v)
-            if isinstance(v, str):
-                return "'{}'".format(utils.encode_string(v))
-            elif isinstance(v, bool):
-                return str(v).lower()
-            else:
-                return str(v)
+        expression, params = self._jsonExpression(filterOption.key)
 
         if isinstance(filterOption, options.InOption):
-            values = ", ".join([convert_value(v) for v in filterOption.values])
+            return " {} IN ({}) ".format(
+                expression, ", ".join(["?"] * len(filterOption.values))
+            ), params + list(filterOption.values)
 
-            return " json_extract(Object, '$.{}') IN ({})".format(
-                filterOption.key, values
-            )
+        operator = _OPERATORS.get(type(filterOption))
+        if operator is None:
+            raise Exception(constants.ErrInvalidFilter)
 
-        if isinstance(filterOption, options.EqOption):
-            return " json_extract(Object, '$.{}') = {} ".format(
-                filterOption.key, convert_value(filterOption.value)
-            )
+        return (
+            " {} {} ? ".format(expression, operator),
+            params + [filterOption.value],
+        )
 
-        if isinstance(filterOption, options.LtOption):
-            return " json_extract(Object, '$.{}') < {} ".format(
-                filterOption.key, convert_value(filterOption.value)
-            )
+    def _jsonExpression(self, key):
+        # indexed paths are spelled exactly like their index expression,
+        # everything else binds the path as a parameter
+        if key in self._indexed:
+            return self._indexed[key], []
 
-        if isinstance(filterOption, options.GtOption):
-            return " json_extract(Object, '$.{}') > {} ".format(
-                filterOption.key, convert_value(filterOption.value)
-            )
+        if self._codec is not None and key not in self._indexes and key.split(".")[0] != "metadata":
+            raise Exception(constants.ErrNotQueryable)
 
-        if isinstance(filterOption, options.LteOption):
-            return " json_extract(Object, '$.{}') <= {} ".format(
-                filterOption.key, convert_value(filterOption.value)
-            )
+        return "json_extract(Object, ?)", [_json_path(key)]
+
+    def _joinFilters(self, operator, filters, sample):
+        clauses = []
+        params = []
+        for f in filters:
+            clause, clause_params = self._convertFilter(f, sample)
+            clauses.append(clause)
+            params += clause_params
+
+        return "( {} )".format(operator.join(clauses)), params
+
+
+_OPERATORS = {
+    options.EqOption: "=",
+    options.LtOption: "<",
+    options.GtOption: ">",
+    options.LteOption: "<=",
+    options.GteOption: ">=",
+}
+
+
+_INDEX_PATH = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+# 1: objects are stored as they are, without escaped single quotes
+_SCHEMA_VERSION = 1
+
+
+def _json_path(key):
+    return "$.{}".format(key)
+
+
+def _project(data, keys, target):
+    # copies the value at keys from data into target, keeping its nesting
+    for key in keys:
+        if not isinstance(data, dict) or key not in data:
+            return
+        data = data[key]
+
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+
+    target[keys[-1]] = data
 
-        if isinstance(filterOption, options.GteOption):
-            return " json_extract(Object, '$.{}') >= {} ".format(
-                filterOption.key, convert_value(filterOption.value)
-            )
 
-        raise Exception(constants.ErrInvalidFilter)
+def _index_name(path):
+    return "IX_Objects_{}".format(path.replace(".", "_"))
@@ -14,6 +14,10 @@ class CommonOptionHolder:
         self.order_incremental = None
         self.page_size = None
         self.page_offset = None
+        self.after_value = None
+        self.after_pkey = None
+        self.batch_size = None
+        self.abort_on_error = None
 
     def common_options(self):
         return self
@@ -55,6 +59,10 @@ class DeleteOption(Option):
         raise NotImplementedError
 
 
+class BatchOption(CreateOption, UpdateOption, DeleteOption):
+    pass
+
+
 class ListDeleteOption(ListOption, DeleteOption):
     @staticmethod
     def FromJson(jsn):
@@ -232,6 +240,34 @@ class _ListDeleteOption(ListDeleteOption):
         return self.function
 
 
+class _ListOption(ListOption):
+    def __init__(self, function):
+        self.function = function
+
+    def get_list_option(self):
+        return self
+
+    def ApplyFunction(self):
+        return self.function
+
+
+class _BatchOption(BatchOption):
+    def __init__(self, function):
+        self.function = function
+
+    def get_create_option(self):
+        return self
+
+    def get_update_option(self):
+        return self
+
+    def get_delete_option(self):
+        return self
+
+    def ApplyFunction(self):
+        return self.function
+
+
 def And(*filters: ListDeleteOption) -> ListDeleteOption:
     def option_function(options: OptionHolder):
         common_options = options.common_options()
@@ -366,6 +402,39 @@ def PageOffset(po: int) -> ListOption:
     return _ListDeleteOption(option_function)
 
 
+def BatchSize(bs: int) -> ListOption:
+    # number of objects Iterate fetches from the backend at a time
+    if bs <= 0:
+        raise Exception("batch size must be positive")
+
+    def option_function(options: OptionHolder):
+        common_options = options.common_options()
+        if common_options.batch_size is not None:
+            raise Exception("batch size option has already been set")
+
+        common_options.batch_size = bs
+
+    return _ListOption(option_function)
+
+
+def After(order_value, pkey: str) -> ListOption:
+    # keyset pagination, continues right after the object with the given
+    # order field value and primary key, i.e. the last one of the previous
+    # page. without an order option the listing is ordered by primary key
+    if pkey is None or len(str(pkey)) == 0:
+        raise Exception("empty primary key for after option")
+
+    def option_function(options: OptionHolder):
+        common_options = options.common_options()
+        if common_options.after_pkey is not None:
+            raise Exception("after option has already been set")
+
+        common_options.after_value = order_value
+        common_options.after_pkey = str(pkey)
+
+    return _ListOption(option_function)
+
+
 def Order(field, ascending=True):
     def f(options):
         common_options = options.common_options()
@@ -376,3 +445,11 @@ def Order(field, ascending=True):
             raise Exception("order by option has already been set")
 
     return _ListDeleteOption(f)
+
+
+def AbortOnError() -> BatchOption:
+    def option_function(options: OptionHolder):
+        common_options = options.common_options()
+        common_options.abort_on_error = True
+
+    return _BatchOption(option_function)
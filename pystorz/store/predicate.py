@@ -0,0 +1,138 @@
+import re
+import operator
+
+from jsonpath import JSONPath
+
+from pystorz.internal import constants
+from pystorz.store import options
+
+
+# filters evaluated in process. a filter tree is compiled once into a
+# single function of an object, its paths resolved to lookups and its
+# constants converted up front, and then called for every object. it
+# answers exactly as a walk of the tree with utils.object_path would
+
+
+def compile_filter(flt, sample):
+    # -> a function of an object, whether flt matches it. a leaf whose
+    # key the sample of the kind does not have raises ErrInvalidFilter
+    # when it is reached, And and Or stop at the first filter that decides
+    match = _compile(flt, sample.ToDict())
+    return lambda obj: match(obj.ToDict())
+
+
+def object_getter(path):
+    # -> a function of an object, the value at path, as utils.object_path
+    get = path_getter(path)
+    return lambda obj: get(obj.ToDict())
+
+
+def path_getter(path):
+    # -> a function of the ToDict data of an object, the value at path.
+    # plain property paths are followed directly, compiling a JSONPath
+    # costs more than following it
+    if _PLAIN.match(path):
+        names = path.split(".")
+        if len(names) == 1:
+            name = names[0]
+            return lambda data: data.get(name)
+
+        def get(data):
+            for name in names:
+                if not isinstance(data, dict):
+                    return None
+                data = data.get(name)
+            return data
+
+        return get
+
+    expr = JSONPath("$.{}".format(path))
+
+    def get(data):
+        ret = expr.parse(data)
+        return ret[0] if ret else None
+
+    return get
+
+
+_PLAIN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def _compile(flt, sample):
+    if isinstance(flt, options._ListDeleteOption):
+        copt = options.CommonOptionHolderFactory()
+        flt.ApplyFunction()(copt)
+        flt = copt.filter
+
+    if isinstance(flt, options.AndOption):
+        matches = [_compile(f, sample) for f in flt.filters]
+        return lambda data: all(m(data) for m in matches)
+
+    if isinstance(flt, options.OrOption):
+        matches = [_compile(f, sample) for f in flt.filters]
+        return lambda data: any(m(data) for m in matches)
+
+    if isinstance(flt, options.NotOption):
+        match = _compile(flt.filter, sample)
+        return lambda data: not match(data)
+
+    key = getattr(flt, "key", None)
+    if key is None or path_getter(key)(sample) is None:
+        return _invalid
+
+    get = path_getter(key)
+
+    if isinstance(flt, options.InOption):
+        values = flt.values
+
+        def match(data):
+            val = get(data)
+            return val is not None and val in values
+
+        return match
+
+    if isinstance(flt, options.EqOption):
+        value = flt.value
+        return lambda data: get(data) == value
+
+    compare = _COMPARE.get(type(flt))
+    if compare is None:
+        return _invalid
+
+    # numbers compare as numbers, even when written as strings
+    value = flt.value
+    number = _numeric(value)
+
+    def match(data):
+        val = get(data)
+        if val is None:
+            return False
+
+        if number is not None:
+            try:
+                return compare(float(val), number)
+            except Exception:
+                pass
+
+        return compare(val, value)
+
+    return match
+
+
+_COMPARE = {
+    options.LtOption: operator.lt,
+    options.LteOption: operator.le,
+    options.GtOption: operator.gt,
+    options.GteOption: operator.ge,
+}
+
+
+def _invalid(data):
+    raise Exception(constants.ErrInvalidFilter)
+
+
+def _numeric(value):
+    try:
+        return float(value)
+    except Exception:
+        return None
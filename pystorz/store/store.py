@@ -1,5 +1,6 @@
 import uuid
 import json
+import typing
 
 from datetime import datetime
 from pystorz.internal import constants
@@ -204,6 +205,16 @@ class ObjectList(list[Object]):
     pass
 
 
+DEFAULT_BATCH_SIZE = 100
+
+
+class BatchResult(list):
+    # outcome of every item of a batch operation in input order,
+    # either the resulting object (None for deletes) or the exception
+    def Errors(self) -> list[tuple[int, Exception]]:
+        return [(i, r) for i, r in enumerate(self) if isinstance(r, Exception)]
+
+
 def ObjectIdentityFactory() -> ObjectIdentity:
     id = str(uuid.uuid1())
     id = id.replace("-", "")
@@ -218,6 +229,24 @@ class Store:
     def List(self, identity: ObjectIdentity, *options: options.ListOption) -> ObjectList:
         raise Exception("Object is an interface")
 
+    def Count(self, identity: ObjectIdentity, *options: options.ListOption) -> int:
+        # only the filter option applies, stores override this
+        # to count without fetching the objects
+        return len(self.List(identity, *[o for o in options if _is_filter(o)]))
+
+    def Exists(self, identity: ObjectIdentity, *options: options.GetOption) -> bool:
+        try:
+            self.Get(identity, *options)
+            return True
+        except Exception as e:
+            if str(e) == constants.ErrNoSuchObject:
+                return False
+            raise e
+
+    def Iterate(self, identity: ObjectIdentity, *options: options.ListOption) -> typing.Iterator[Object]:
+        # stores override this to fetch BatchSize objects at a time
+        return iter(self.List(identity, *options))
+
     def Create(self, obj: Object, *options: options.CreateOption) -> Object:
         raise Exception("Object is an interface")
 
@@ -227,6 +256,84 @@ class Store:
     def Delete(self, identity: ObjectIdentity, *options: options.DeleteOption):
         raise Exception("Object is an interface")
 
+    # batch operations fall back to one call per item,
+    # stores override them with native implementations
+
+    def CreateMany(self, objs: list[Object], *options: options.CreateOption) -> BatchResult:
+        return run_batch(objs, lambda o: self.Create(o, *options), *options)
+
+    def UpdateMany(self, items: list[tuple[ObjectIdentity, Object]], *options: options.UpdateOption) -> BatchResult:
+        return run_batch(items, lambda i: self.Update(i[0], i[1], *options), *options)
+
+    def DeleteMany(self, identities: list[ObjectIdentity], *options: options.DeleteOption) -> BatchResult:
+        return run_batch(identities, lambda i: self.Delete(i, *options), *options)
+
+
+def _is_filter(opt: options.Option) -> bool:
+    copt = options.CommonOptionHolderFactory()
+    opt.ApplyFunction()(copt)
+    return copt.filter is not None
+
+
+def abort_on_error(*opts: options.Option) -> bool:
+    copt = options.CommonOptionHolderFactory()
+    for o in opts:
+        if isinstance(o, options.BatchOption):
+            o.ApplyFunction()(copt)
+
+    return bool(copt.abort_on_error)
+
+
+def delete_options(*opts: options.Option) -> options.CommonOptionHolder:
+    # list-only options such as After mean nothing to a delete,
+    # reject them rather than silently ignore them
+    copt = options.CommonOptionHolderFactory()
+    for o in opts:
+        if not isinstance(o, options.DeleteOption):
+            raise Exception(constants.ErrInvalidOption)
+        o.ApplyFunction()(copt)
+
+    return copt
+
+
+def run_batch(items: list, operation, *opts: options.Option) -> BatchResult:
+    abort = abort_on_error(*opts)
+
+    res = BatchResult()
+    for item in items:
+        try:
+            res.append(operation(item))
+        except Exception as e:
+            if abort:
+                raise e
+            res.append(e)
+
+    return res
+
+
+def delegate_batch(items: list, prepare, run, *opts: options.Option) -> BatchResult:
+    # prepare every item on its own, then hand the ones that
+    # made it through to run as a single batch
+    abort = abort_on_error(*opts)
+
+    res = BatchResult([None] * len(items))
+    prepared = []
+    positions = []
+    for i, item in enumerate(items):
+        try:
+            prepared.append(prepare(item))
+            positions.append(i)
+        except Exception as e:
+            if abort:
+                raise e
+            res[i] = e
+
+    if len(prepared) > 0:
+        for i, r in zip(positions, run(prepared)):
+            res[i] = r
+
+    return res
+
 
 class SchemaHolder:
     def ObjectForKind(self, kind: str) -> Object:
@@ -235,6 +342,10 @@ class SchemaHolder:
     def Types(self) -> list[str]:
         raise Exception("Object is an interface")
 
+    def Indexes(self, kind: str) -> list[str]:
+        # object paths declared for indexing, none unless the model says so
+        return []
+
 
 class StoreJsonDecoder(json.JSONDecoder):
 
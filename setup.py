@@ -38,7 +38,6 @@ setup(
         "cherrypy",
         "requests",
         "mysql-connector-python",
-        "sqlparse",
         "pymongo",
         "flask"
         # "pysqlite3",
@@ -48,11 +47,15 @@ setup(
             # 'pytest -v test_mgen.py -cov',
             # 'pytest -v -k "thestore" test_common.py -cov',
             # 'flake8',
-        ]
+        ],
+        # MemoryStore columns
+        'columns': [
+            "numpy",
+        ],
     },
     classifiers=[
         "Intended Audience :: Developers",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.9",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.9",
 )
@@ -1,7 +1,10 @@
 rm -rf .pytest_cache
 
 pytest -v test_mgen.py
+pytest -v test_sql.py
+pytest -v test_memory.py
 pytest -v test_router.py
 pytest -v test_handler.py
 # pytest -v test_server.py
 pytest -v -k "thestore" test_common.py
+# PYSTORZ_BENCHMARK=1 pytest -v -s test_benchmark.py
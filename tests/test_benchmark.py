@@ -0,0 +1,491 @@
+import os
+import time
+import shutil
+import threading
+import pytest
+import logging
+
+from config import globals
+
+globals.logger_config()
+
+log = logging.getLogger(__name__)
+
+# keep per operation logging out of the measurements
+for name in ["pystorz.sql", "pystorz.store", "pystorz.memory", "pystorz.meta"]:
+    logging.getLogger(name).setLevel(logging.WARNING)
+
+from generated import model
+
+from pystorz.store import options
+from pystorz.sql.sqlite import SqliteStoreFactory, ReadOptimizedProfile, DurableProfile
+from pystorz.sql.codec import ZlibCodec, TrainDictionary
+from pystorz.memory.memory import MemoryStore, MemoryStoreFactory
+
+
+# benchmarks are slow and noisy, run them on demand with
+# PYSTORZ_BENCHMARK=1 pytest -v -s test_benchmark.py
+benchmark = pytest.mark.skipif(
+    not os.environ.get("PYSTORZ_BENCHMARK"),
+    reason="set PYSTORZ_BENCHMARK=1 to run benchmarks")
+
+NUMBER_OF_OBJECTS = 2000
+
+
+def sqlite(db_file, **kwargs):
+    for f in [db_file, db_file + "-wal", db_file + "-shm"]:
+        if os.path.exists(f):
+            os.remove(f)
+
+    return SqliteStoreFactory(model.Schema(), db_file, **kwargs)
+
+
+def make_world(i):
+    world = model.WorldFactory()
+    world.External().SetName("world-{}".format(i))
+    world.External().SetDescription("it's world number {}".format(i))
+    world.External().SetCounter(i)
+    world.External().SetAlive(i % 2 == 0)
+    return world
+
+
+def report(name, count, elapsed):
+    log.info("{}: \t{} ops in {:.3f}s \t{:.0f} ops/s".format(
+        name, count, elapsed, count / elapsed))
+
+
+@benchmark
+def test_sqlite_get_create_throughput(tmp_path):
+    thestore = sqlite(str(tmp_path / "bench.db"))
+
+    ids = []
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS):
+        ids.append(thestore.Create(make_world(i)).Metadata().Identity())
+    t2 = time.time()
+    report("sqlite create", NUMBER_OF_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS):
+        thestore.Get(model.WorldIdentity("world-{}".format(i)))
+    t2 = time.time()
+    report("sqlite get", NUMBER_OF_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    for i in ids:
+        thestore.Get(i)
+    t2 = time.time()
+    report("sqlite get by id", NUMBER_OF_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS):
+        world = make_world(i)
+        world.External().SetCounter(i + 1)
+        thestore.Update(model.WorldIdentity("world-{}".format(i)), world)
+    t2 = time.time()
+    report("sqlite update", NUMBER_OF_OBJECTS, t2 - t1)
+
+
+@benchmark
+def test_sqlite_batch_throughput(tmp_path):
+    thestore = sqlite(str(tmp_path / "bench.db"))
+
+    worlds = [make_world(i) for i in range(NUMBER_OF_OBJECTS)]
+    t1 = time.time()
+    thestore.CreateMany(worlds)
+    t2 = time.time()
+    report("sqlite create many", NUMBER_OF_OBJECTS, t2 - t1)
+
+    for w in worlds:
+        w.External().SetCounter(w.External().Counter() + 1)
+
+    t1 = time.time()
+    thestore.UpdateMany([(w.Metadata().Identity(), w) for w in worlds])
+    t2 = time.time()
+    report("sqlite update many", NUMBER_OF_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    thestore.DeleteMany([w.Metadata().Identity() for w in worlds])
+    t2 = time.time()
+    report("sqlite delete many", NUMBER_OF_OBJECTS, t2 - t1)
+
+
+@benchmark
+def test_sqlite_offset_vs_keyset_pages(tmp_path):
+    thestore = sqlite(str(tmp_path / "bench.db"), indexes=["external.counter"])
+    thestore.CreateMany([make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)])
+
+    page_size = 50
+    pages = NUMBER_OF_OBJECTS * 5 // page_size
+
+    t1 = time.time()
+    for i in range(pages):
+        thestore.List(
+            model.WorldKindIdentity,
+            options.Order("external.counter"),
+            options.PageSize(page_size),
+            options.PageOffset(i * page_size))
+    t2 = time.time()
+    report("sqlite offset pages", pages, t2 - t1)
+
+    after = []
+    t1 = time.time()
+    for i in range(pages):
+        ret = thestore.List(
+            model.WorldKindIdentity,
+            options.Order("external.counter"),
+            options.PageSize(page_size),
+            *after)
+        after = [options.After(ret[-1].External().Counter(), ret[-1].PrimaryKey())]
+    t2 = time.time()
+    report("sqlite keyset pages", pages, t2 - t1)
+
+
+@benchmark
+@pytest.mark.parametrize("name, profile", [
+    ("default", None),
+    ("read optimized", ReadOptimizedProfile()),
+    ("durable", DurableProfile()),
+])
+def test_sqlite_profiles(tmp_path, name, profile):
+    thestore = sqlite(str(tmp_path / "bench.db"), profile=profile)
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS):
+        thestore.Create(make_world(i))
+    t2 = time.time()
+    report("sqlite {} create".format(name), NUMBER_OF_OBJECTS, t2 - t1)
+
+    # readers on their own connections while a single writer updates
+    done = threading.Event()
+    reads = []
+    errors = []
+
+    def reader():
+        count = 0
+        while not done.is_set():
+            try:
+                thestore.Get(model.WorldIdentity("world-{}".format(count % NUMBER_OF_OBJECTS)))
+                count += 1
+            except Exception as e:
+                errors.append(e)
+        reads.append(count)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for r in readers:
+        r.start()
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS // 4):
+        world = make_world(i)
+        world.External().SetCounter(i + 1)
+        try:
+            thestore.Update(model.WorldIdentity("world-{}".format(i)), world)
+        except Exception as e:
+            errors.append(e)
+    t2 = time.time()
+
+    done.set()
+    for r in readers:
+        r.join()
+
+    report("sqlite {} update under readers".format(name), NUMBER_OF_OBJECTS // 4, t2 - t1)
+    report("sqlite {} concurrent get".format(name), sum(reads), t2 - t1)
+    log.info("sqlite {}: {} errors".format(name, len(errors)))
+
+
+@benchmark
+@pytest.mark.parametrize("name, kwargs", [
+    ("single commits", {}),
+    ("group commit 0ms", {"group_commit_ms": 0, "group_commit_ops": 100}),
+    ("group commit 2ms", {"group_commit_ms": 2, "group_commit_ops": 100}),
+])
+def test_sqlite_group_commit(tmp_path, name, kwargs):
+    thestore = sqlite(str(tmp_path / "bench.db"), profile=DurableProfile(), **kwargs)
+    writers = 8
+
+    def write(t):
+        for i in range(NUMBER_OF_OBJECTS // writers):
+            thestore.Create(make_world(t * NUMBER_OF_OBJECTS + i))
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in range(writers)]
+    t1 = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    t2 = time.time()
+
+    report("sqlite durable {}, {} writers".format(name, writers), NUMBER_OF_OBJECTS, t2 - t1)
+    thestore.Close()
+
+
+@benchmark
+@pytest.mark.parametrize("name, codec", [
+    ("plain", lambda samples: None),
+    ("zlib", lambda samples: ZlibCodec()),
+    ("zlib dictionary", lambda samples: ZlibCodec(dictionary=TrainDictionary(samples))),
+])
+def test_sqlite_codec(tmp_path, name, codec):
+    worlds = [make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)]
+
+    thestore = sqlite(
+        str(tmp_path / "bench.db"),
+        codec=codec([w.ToJson() for w in worlds[:200]]))
+    thestore.CreateMany(worlds)
+    thestore.Close()
+    log.info("sqlite {}: {} bytes on disk".format(name, os.path.getsize(str(tmp_path / "bench.db"))))
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS):
+        thestore.Get(model.WorldIdentity("world-{}".format(i)))
+    t2 = time.time()
+    report("sqlite {} get".format(name), NUMBER_OF_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    for i in range(5):
+        thestore.List(model.WorldKindIdentity, options.Gte("external.counter", i * 2000))
+    t2 = time.time()
+    report("sqlite {} list".format(name), 5, t2 - t1)
+
+
+@benchmark
+def test_sqlite_filtered_delete(tmp_path):
+    thestore = sqlite(str(tmp_path / "bench.db"))
+    count = NUMBER_OF_OBJECTS * 50
+    thestore.CreateMany([make_world(i) for i in range(count)])
+
+    t1 = time.time()
+    thestore.Delete(model.WorldKindIdentity, options.Eq("external.alive", True))
+    t2 = time.time()
+    report("sqlite filtered delete", count // 2, t2 - t1)
+
+    assert thestore.Count(model.WorldKindIdentity) == count // 2
+
+
+@benchmark
+@pytest.mark.parametrize("name, kwargs", [
+    ("shared pool", {"profile": ReadOptimizedProfile()}),
+    ("single writer", {"single_writer": True}),
+])
+@pytest.mark.parametrize("readers", [1, 4, 8])
+def test_sqlite_single_writer(tmp_path, name, kwargs, readers):
+    thestore = sqlite(str(tmp_path / "bench.db"), **kwargs)
+    thestore.CreateMany([make_world(i) for i in range(NUMBER_OF_OBJECTS)])
+
+    done = threading.Event()
+    reads = []
+    errors = []
+
+    def reader():
+        count = 0
+        while not done.is_set():
+            try:
+                thestore.Get(model.WorldIdentity("world-{}".format(count % NUMBER_OF_OBJECTS)))
+                count += 1
+            except Exception as e:
+                errors.append(e)
+        reads.append(count)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+
+    t1 = time.time()
+    for i in range(NUMBER_OF_OBJECTS // 2):
+        world = make_world(i)
+        world.External().SetCounter(i + 1)
+        try:
+            thestore.Update(model.WorldIdentity("world-{}".format(i)), world)
+        except Exception as e:
+            errors.append(e)
+    t2 = time.time()
+
+    done.set()
+    for t in threads:
+        t.join()
+
+    report("sqlite {} update, {} readers".format(name, readers), NUMBER_OF_OBJECTS // 2, t2 - t1)
+    report("sqlite {} get, {} readers".format(name, readers), sum(reads), t2 - t1)
+    log.info("sqlite {}: {} errors".format(name, len(errors)))
+    thestore.Close()
+
+
+@benchmark
+@pytest.mark.parametrize("name, indexes", [
+    ("scan", []),
+    ("hash index", ["external.name"]),
+])
+def test_memory_eq_lookup(name, indexes):
+    thestore = MemoryStore(model.Schema(), indexes=indexes)
+    thestore.CreateMany([make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)])
+
+    lookups = 20
+    t1 = time.time()
+    for i in range(lookups):
+        thestore.List(
+            model.WorldKindIdentity,
+            options.Eq("external.name", "world-{}".format(i)))
+    t2 = time.time()
+    report("memory {} eq list".format(name), lookups, t2 - t1)
+
+
+@benchmark
+@pytest.mark.parametrize("name, indexes", [
+    ("sort", []),
+    ("ordered index", ["external.description"]),
+])
+def test_memory_ordered_pages(name, indexes):
+    thestore = MemoryStore(model.Schema(), indexes=indexes)
+    thestore.CreateMany([make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)])
+
+    pages = 20
+    t1 = time.time()
+    for i in range(pages):
+        thestore.List(
+            model.WorldKindIdentity,
+            options.Order("external.description"),
+            options.PageOffset(i * 10),
+            options.PageSize(10))
+    t2 = time.time()
+    report("memory {} ordered pages".format(name), pages, t2 - t1)
+
+
+def latency(name, count, elapsed):
+    log.info("{}: \t{} ops in {:.3f}s \t{:.1f}us/op".format(
+        name, count, elapsed, elapsed / count * 1000000))
+
+
+@benchmark
+def test_memory_write_latency():
+    thestore = MemoryStore(model.Schema())
+    worlds = [make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)]
+
+    t1 = time.time()
+    for w in worlds:
+        thestore.Create(w)
+    t2 = time.time()
+    latency("memory create", len(worlds), t2 - t1)
+
+    for w in worlds:
+        w.External().SetCounter(w.External().Counter() + 1)
+
+    t1 = time.time()
+    for w in worlds:
+        thestore.Update(w.Metadata().Identity(), w)
+    t2 = time.time()
+    latency("memory update", len(worlds), t2 - t1)
+
+    t1 = time.time()
+    for w in worlds:
+        thestore.Delete(w.Metadata().Identity())
+    t2 = time.time()
+    latency("memory delete", len(worlds), t2 - t1)
+
+
+@benchmark
+@pytest.mark.parametrize("name, frozen", [
+    ("cloned", False),
+    ("frozen", True),
+])
+def test_memory_list_copies(name, frozen):
+    thestore = MemoryStore(model.Schema(), frozen=frozen)
+    thestore.CreateMany([make_world(i) for i in range(1000)])
+
+    lists = 50
+    t1 = time.time()
+    for i in range(lists):
+        thestore.List(model.WorldKindIdentity)
+    t2 = time.time()
+    report("memory {} list of 1000".format(name), lists, t2 - t1)
+
+    t1 = time.time()
+    for i in range(lists):
+        thestore.List(model.WorldKindIdentity, options.Gt("external.counter", 500))
+    t2 = time.time()
+    report("memory {} filtered list of 500".format(name), lists, t2 - t1)
+
+
+def journaled(path, **kwargs):
+    shutil.rmtree(path, ignore_errors=True)
+    return MemoryStoreFactory(model.Schema(), path=path, **kwargs)
+
+
+@benchmark
+@pytest.mark.parametrize("fsync", ["never", "interval", "always"])
+def test_memory_journal_writes(tmp_path, fsync):
+    thestore = journaled(str(tmp_path / "journal"), fsync=fsync)
+    worlds = [make_world(i) for i in range(NUMBER_OF_OBJECTS)]
+
+    t1 = time.time()
+    for w in worlds:
+        thestore.Create(w)
+    t2 = time.time()
+    latency("memory journal fsync {} create".format(fsync), len(worlds), t2 - t1)
+
+    t1 = time.time()
+    thestore.UpdateMany([(w.Metadata().Identity(), w) for w in worlds])
+    t2 = time.time()
+    latency("memory journal fsync {} batch update".format(fsync), len(worlds), t2 - t1)
+    thestore.Close()
+
+
+# recovery is measured at a million objects unless told otherwise
+RECOVERY_OBJECTS = int(os.environ.get("PYSTORZ_RECOVERY_OBJECTS", 1000000))
+
+
+@benchmark
+def test_memory_journal_recovery(tmp_path):
+    thestore = journaled(str(tmp_path / "journal"), fsync="never", snapshot_ops=None)
+    chunk = 10000
+    for i in range(0, RECOVERY_OBJECTS, chunk):
+        thestore.CreateMany([make_world(j) for j in range(i, min(i + chunk, RECOVERY_OBJECTS))])
+    thestore.Close()
+
+    t1 = time.time()
+    thestore = MemoryStoreFactory(model.Schema(), path=str(tmp_path / "journal"), snapshot_ops=None)
+    t2 = time.time()
+    report("memory recovery from the log", RECOVERY_OBJECTS, t2 - t1)
+
+    t1 = time.time()
+    thestore.Snapshot()
+    t2 = time.time()
+    report("memory snapshot", RECOVERY_OBJECTS, t2 - t1)
+
+    # a tail of updates written after the snapshot
+    tail = RECOVERY_OBJECTS // 10
+    worlds = [make_world(i) for i in range(tail)]
+    thestore.UpdateMany([(w.Metadata().Identity(), w) for w in worlds])
+    thestore.Close()
+
+    t1 = time.time()
+    thestore = MemoryStoreFactory(model.Schema(), path=str(tmp_path / "journal"), snapshot_ops=None)
+    t2 = time.time()
+    report("memory recovery from snapshot and log tail", RECOVERY_OBJECTS, t2 - t1)
+    assert thestore.Count(model.WorldKindIdentity) == RECOVERY_OBJECTS
+    thestore.Close()
+
+
+@benchmark
+@pytest.mark.parametrize("name, columns", [
+    ("rows", []),
+    ("columns", ["external.counter", "external.alive"]),
+])
+def test_memory_range_filters(name, columns):
+    if columns:
+        pytest.importorskip("numpy")
+    thestore = MemoryStore(model.Schema(), columns=columns)
+    thestore.CreateMany([make_world(i) for i in range(NUMBER_OF_OBJECTS * 5)])
+
+    lists = 20
+    t1 = time.time()
+    for i in range(lists):
+        thestore.List(
+            model.WorldKindIdentity,
+            options.And(
+                options.Gte("external.counter", i * 10),
+                options.Not(options.Eq("external.alive", False))),
+            options.Order("external.counter", False),
+            options.PageSize(10))
+    t2 = time.time()
+    report("memory {} range filter".format(name), lists, t2 - t1)
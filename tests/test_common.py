@@ -74,6 +74,49 @@ def inmemory():
             Schema()))
 
 
+def inmemory_frozen():
+    from pystorz.memory.memory import MemoryStore
+    from generated.model import Schema
+
+    return MetaStore(
+        MemoryStore(
+            Schema(),
+            frozen=True))
+
+
+def inmemory_columnar():
+    from pystorz.memory.memory import MemoryStore
+    from generated.model import Schema
+
+    try:
+        import numpy
+    except ImportError:
+        return pytest.param(None, id="columns", marks=pytest.mark.skip(reason="columns need numpy"))
+
+    return MetaStore(
+        MemoryStore(
+            Schema(),
+            columns=[
+                "external.name",
+                "external.description",
+                "external.counter",
+                "external.alive",
+                "external.date",
+            ]))
+
+
+def inmemory_tiered(path):
+    from pystorz.memory.memory import MemoryStoreFactory
+    from pystorz.sql.sqlite import SqliteStoreFactory
+    from generated.model import Schema
+
+    return MetaStore(
+        MemoryStoreFactory(
+            Schema(),
+            backing=SqliteStoreFactory(Schema(), path),
+            max_objects=2))
+
+
 def rest():
     log.debug("server/client setup")
 
@@ -115,8 +158,17 @@ def rest():
 # @pytest.fixture(params=[inmemory()])
 # @pytest.fixture(params=[mongo()])
 # @pytest.fixture(params=[sqlite(), mysql(), rest()])
-@pytest.fixture(params=[inmemory(), sqlite(), rest()])
+@pytest.fixture(scope="session")
+def tiered(tmp_path_factory):
+    # kept for the whole session like the other stores, in a pytest
+    # temporary directory rather than one made at import
+    return inmemory_tiered(str(tmp_path_factory.mktemp("tier") / "tier.db"))
+
+
+@pytest.fixture(params=[inmemory(), inmemory_frozen(), inmemory_columnar(), "tiered", sqlite(), rest()])
 def thestore(request):
+    if isinstance(request.param, str):
+        return request.getfixturevalue(request.param)
     return request.param
 
 
@@ -1365,6 +1417,186 @@ def test_sql_injection(thestore):
     assert errored
 
 
+def test_batch_operations(thestore):
+    def second_world(name, counter):
+        w = model.SecondWorldFactory()
+        w.External().SetName(name)
+        w.External().SetCounter(counter)
+        return w
+
+    objs = [second_world("batch-{}".format(i), i) for i in range(5)]
+    objs.append(second_world("batch-0", 100))
+    objs.append(None)
+
+    ret = thestore.CreateMany(objs)
+    assert len(ret) == 7
+    for i in range(5):
+        assert ret[i].External().Counter() == i
+    assert [i for i, _ in ret.Errors()] == [5, 6]
+
+    ret = thestore.List(
+        model.SecondWorldKindIdentity,
+        options.Order("external.counter"))
+    batch = [r for r in ret if r.External().Name().startswith("batch-")]
+    assert [r.External().Counter() for r in batch] == [0, 1, 2, 3, 4]
+
+    items = []
+    for r in batch:
+        r.External().SetCounter(r.External().Counter() + 10)
+        items.append((r.Metadata().Identity(), r))
+    items.append((model.SecondWorldIdentity("batch-nonexistent"),
+                  second_world("batch-nonexistent", 0)))
+
+    ret = thestore.UpdateMany(items)
+    assert len(ret) == 6
+    assert [i for i, _ in ret.Errors()] == [5]
+    for i in range(5):
+        r = thestore.Get(model.SecondWorldIdentity("batch-{}".format(i)))
+        assert r.External().Counter() == i + 10
+
+    with pytest.raises(Exception):
+        thestore.CreateMany(
+            [second_world("batch-0", 0)], options.AbortOnError())
+
+    identities = [model.SecondWorldIdentity("batch-{}".format(i)) for i in range(5)]
+    identities.append(model.SecondWorldIdentity("batch-nonexistent"))
+    ret = thestore.DeleteMany(identities)
+    assert len(ret) == 6
+    assert [i for i, _ in ret.Errors()] == [5]
+
+    ret = thestore.List(model.SecondWorldKindIdentity)
+    assert len([r for r in ret if r.External().Name().startswith("batch-")]) == 0
+
+
+def test_update_many_renamed_object_is_gone_from_its_old_key(thestore):
+    w = model.SecondWorldFactory()
+    w.External().SetName("rename-old")
+    created = thestore.Create(w)
+
+    renamed = created.Clone()
+    renamed.External().SetName("rename-new")
+    stale = created.Clone()
+    stale.External().SetCounter(5)
+
+    ret = thestore.UpdateMany([
+        (model.SecondWorldIdentity("rename-old"), renamed),
+        (model.SecondWorldIdentity("rename-old"), stale),
+    ])
+    assert len(ret) == 2
+    assert [i for i, _ in ret.Errors()] == [1]
+    assert str(ret[1]) == constants.ErrNoSuchObject
+
+    got = thestore.Get(model.SecondWorldIdentity("rename-new"))
+    assert got.External().Counter() == 0
+    assert not thestore.Exists(model.SecondWorldIdentity("rename-old"))
+
+    thestore.Delete(model.SecondWorldIdentity("rename-new"))
+
+
+def test_list_and_keyset_paginate(thestore):
+    worlds = []
+    for i in range(10):
+        w = model.SecondWorldFactory()
+        w.External().SetName("page-{}".format(i))
+        w.External().SetCounter(i % 3)
+        worlds.append(w)
+
+    thestore.CreateMany(worlds, options.AbortOnError())
+    names = options.In("external.name", [w.External().Name() for w in worlds])
+
+    def pages(*opt):
+        seen = []
+        last = []
+        while True:
+            ret = thestore.List(
+                model.SecondWorldKindIdentity, names, *opt, *last, options.PageSize(4))
+            if len(ret) == 0:
+                return seen
+
+            seen += [(r.External().Counter(), r.External().Name()) for r in ret]
+            last = [options.After(ret[-1].External().Counter(), ret[-1].PrimaryKey())]
+
+    expected = sorted([(w.External().Counter(), w.External().Name()) for w in worlds])
+    assert pages(options.Order("external.counter")) == expected
+    assert pages(options.Order("external.counter", False)) == expected[::-1]
+
+    expected = sorted([(w.External().Counter(), w.External().Name()) for w in worlds],
+                      key=lambda w: w[1])
+    assert pages() == expected
+
+    # after and batch size only shape a listing, a delete rejects them
+    with pytest.raises(Exception, match=constants.ErrInvalidOption):
+        thestore.Delete(model.SecondWorldKindIdentity, names, options.After(0, "page-0"))
+    with pytest.raises(Exception, match=constants.ErrInvalidOption):
+        thestore.Delete(model.SecondWorldKindIdentity, names, options.BatchSize(10))
+    assert thestore.Count(model.SecondWorldKindIdentity, names) == len(worlds)
+
+    thestore.DeleteMany([model.SecondWorldIdentity(w.External().Name()) for w in worlds])
+
+
+def test_iterate(thestore):
+    worlds = []
+    for i in range(7):
+        w = model.SecondWorldFactory()
+        w.External().SetName("iterate-{}".format(i))
+        w.External().SetCounter(i)
+        worlds.append(w)
+
+    thestore.CreateMany(worlds, options.AbortOnError())
+    names = options.In("external.name", [w.External().Name() for w in worlds])
+
+    ret = thestore.List(model.SecondWorldKindIdentity, names)
+    it = thestore.Iterate(
+        model.SecondWorldKindIdentity, names, options.BatchSize(2))
+    assert sorted([r.External().Name() for r in it]) == \
+        sorted([r.External().Name() for r in ret])
+
+    # other operations can run while the iteration is still open
+    seen = []
+    for r in thestore.Iterate(
+            model.SecondWorldKindIdentity,
+            names,
+            options.Order("external.counter", False),
+            options.BatchSize(3)):
+        got = thestore.Get(model.SecondWorldIdentity(r.External().Name()))
+        seen.append(got.External().Counter())
+
+    assert seen == [6, 5, 4, 3, 2, 1, 0]
+
+    thestore.DeleteMany([model.SecondWorldIdentity(w.External().Name()) for w in worlds])
+
+
+def test_count_and_exists(thestore):
+    worlds = []
+    for i in range(6):
+        w = model.SecondWorldFactory()
+        w.External().SetName("count-{}".format(i))
+        w.External().SetCounter(i)
+        w.External().SetAlive(i % 2 == 0)
+        worlds.append(w)
+
+    before = thestore.Count(model.SecondWorldKindIdentity)
+    ret = thestore.CreateMany(worlds, options.AbortOnError())
+
+    assert thestore.Count(model.SecondWorldKindIdentity) == before + 6
+    assert thestore.Count(model.SecondWorldKindIdentity, options.And(
+        options.Eq("external.alive", True),
+        options.Gte("external.counter", 0))) == \
+        len(thestore.List(model.SecondWorldKindIdentity, options.And(
+            options.Eq("external.alive", True),
+            options.Gte("external.counter", 0))))
+    assert thestore.Count(model.SecondWorldKindIdentity,
+                          options.In("external.name", ["count-1", "count-2", "nope"])) == 2
+
+    assert thestore.Exists(model.SecondWorldIdentity("count-3"))
+    assert thestore.Exists(ret[3].Metadata().Identity())
+    assert not thestore.Exists(model.SecondWorldIdentity("count-nope"))
+
+    thestore.DeleteMany([model.SecondWorldIdentity(w.External().Name()) for w in worlds])
+    assert not thestore.Exists(model.SecondWorldIdentity("count-3"))
+    assert thestore.Count(model.SecondWorldKindIdentity) == before
+
+
 @pytest.mark.skip
 def test_performance(thestore):
     NUMBER_OF_OBJECTS = 1000
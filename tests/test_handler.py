@@ -266,3 +266,23 @@ def test_delete_with_filter_callback_abort():
     assert store.Get(model.WorldIdentity("good")) is not None
     assert store.Get(model.WorldIdentity("bad")) is not None
     assert store.Get(model.WorldIdentity("other")) is not None
+
+
+def test_delete_many_without_delete_handlers_skips_get():
+    inner = base_store()
+    store = HandlerStore(inner, handlers={model.WorldKind: {"create": lambda o, s: None}})
+
+    for n in ["a", "b"]:
+        w = model.WorldFactory()
+        w.External().SetName(n)
+        store.Create(w)
+
+    gets = []
+    get = inner.Get
+    inner.Get = lambda identity, *opt: gets.append(identity) or get(identity, *opt)
+
+    ret = store.DeleteMany([model.WorldIdentity("a"), model.WorldIdentity("b")])
+
+    assert gets == []
+    assert ret.Errors() == []
+    assert store.Count(model.WorldKindIdentity) == 0
@@ -0,0 +1,802 @@
+import sys
+import time
+import pytest
+import logging
+import threading
+
+from config import globals
+
+log = logging.getLogger(__name__)
+
+globals.logger_config()
+
+from generated import model
+
+from pystorz.internal import constants
+from pystorz.store import store, options, predicate
+from pystorz.memory import memory
+from pystorz.memory.memory import MemoryStore
+
+
+@pytest.fixture
+def thestore():
+    thestore = MemoryStore(model.Schema(), indexes=["external.description"])
+
+    for i in range(20):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetDescription("description-{}".format(i % 5))
+        world.External().SetCounter(i)
+        world.External().SetAlive(i % 2 == 0)
+        thestore.Create(world)
+
+    return thestore
+
+
+@pytest.fixture
+def matches(monkeypatch):
+    # counts the objects the filter is evaluated against
+    calls = []
+    compile_filter = predicate.compile_filter
+
+    def counting(f, sample):
+        match = compile_filter(f, sample)
+
+        def counted(obj):
+            if obj is not sample and all(obj is not c for c in calls):
+                calls.append(obj)
+            return match(obj)
+
+        return counted
+
+    monkeypatch.setattr(predicate, "compile_filter", counting)
+    return calls
+
+
+def names(ret):
+    return sorted(r.External().Name() for r in ret)
+
+
+def test_hash_index_serves_eq_and_in(thestore, matches):
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-3"))
+    assert names(ret) == ["world-13", "world-18", "world-3", "world-8"]
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.And(
+            options.In("external.description", ["description-1", "description-2"]),
+            options.Eq("external.alive", True)))
+    assert names(ret) == ["world-12", "world-16", "world-2", "world-6"]
+
+    assert thestore.Count(
+        model.WorldKindIdentity,
+        options.Eq("external.alive", False)) == 10
+
+    assert matches == []
+
+
+def test_hash_index_narrows_residual_filters(thestore, matches):
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.And(
+            options.Eq("external.description", "description-3"),
+            options.Not(options.Eq("external.name", "world-13"))))
+    assert names(ret) == ["world-18", "world-3", "world-8"]
+    assert len(matches) == 4
+
+    # an Or cannot be served by intersections, everything is scanned
+    del matches[:]
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Or(
+            options.Eq("external.description", "description-3"),
+            options.Eq("external.name", "world-0")))
+    assert len(ret) == 5
+    assert len(matches) == 20
+
+
+def test_hash_index_follows_writes(thestore):
+    world = thestore.Get(model.WorldIdentity("world-3"))
+    world.External().SetDescription("updated")
+    thestore.Update(world.Metadata().Identity(), world)
+
+    assert names(thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "updated"))) == ["world-3"]
+    assert len(thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-3"))) == 3
+
+    thestore.Delete(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-4"))
+    assert thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-4")) == []
+
+    thestore.Delete(model.WorldIdentity("world-3"))
+    assert thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "updated")) == []
+    assert thestore.Count(model.WorldKindIdentity, options.Eq("external.alive", True)) == 8
+
+
+def test_invalid_filter_on_indexed_store(thestore):
+    with pytest.raises(Exception) as ei:
+        thestore.List(model.WorldKindIdentity, options.Eq("external.missing", 1))
+
+    assert constants.ErrInvalidFilter in str(ei.value)
+
+
+def test_ordered_index_serves_ranges(thestore, matches):
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.And(
+            options.Gte("external.counter", 5),
+            options.Lt("external.counter", 8)))
+    assert names(ret) == ["world-5", "world-6", "world-7"]
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.And(
+            options.Eq("external.description", "description-3"),
+            options.Gt("external.counter", 10.5)))
+    assert names(ret) == ["world-13", "world-18"]
+
+    assert thestore.Count(model.WorldKindIdentity, options.Lte("external.counter", 3)) == 4
+    assert matches == []
+
+    # numbers as strings compare as numbers, like a scan would
+    ret = thestore.List(model.WorldKindIdentity, options.Gt("external.counter", "17"))
+    assert names(ret) == ["world-18", "world-19"]
+
+
+def test_ordered_index_serves_pages(thestore, matches):
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter", False),
+        options.PageOffset(2),
+        options.PageSize(3))
+    assert [r.External().Counter() for r in ret] == [17, 16, 15]
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter"),
+        options.After(15, "world-15"),
+        options.PageSize(3))
+    assert [r.External().Counter() for r in ret] == [16, 17, 18]
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.alive", True),
+        options.Order("external.counter", False),
+        options.After(10, "world-10"),
+        options.PageSize(2))
+    assert [r.External().Counter() for r in ret] == [8, 6]
+
+    # ties on the order value are broken by the primary key
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.alive"),
+        options.PageSize(3))
+    assert names(ret) == ["world-1", "world-11", "world-13"]
+    assert matches == []
+
+    world = thestore.Get(model.WorldIdentity("world-0"))
+    world.External().SetCounter(100)
+    thestore.Update(world.Metadata().Identity(), world)
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter", False),
+        options.PageSize(2))
+    assert names(ret) == ["world-0", "world-19"]
+
+
+def test_writes_only_serialize_to_clone(thestore, monkeypatch):
+    calls = []
+    world = thestore.Get(model.WorldIdentity("world-3"))
+    tojson = type(world).ToJson
+
+    def counting(self):
+        calls.append(self)
+        return tojson(self)
+
+    monkeypatch.setattr(type(world), "ToJson", counting)
+
+    # one clone to store, one to return
+    other = model.WorldFactory()
+    other.External().SetName("other")
+    thestore.Create(other)
+    assert len(calls) == 2
+
+    del calls[:]
+    world.External().SetDescription("updated")
+    thestore.Update(model.WorldIdentity("world-3"), world)
+    assert len(calls) == 2
+
+    del calls[:]
+    thestore.Delete(model.WorldIdentity("other"))
+    thestore.Delete(model.WorldKindIdentity, options.Eq("external.description", "description-4"))
+    assert len(calls) == 0
+
+
+def test_update_swaps_in_place(thestore):
+    world = thestore.Get(model.WorldIdentity("world-3"))
+    world.External().SetName("renamed")
+    thestore.Update(model.WorldIdentity("world-3"), world)
+
+    ret = thestore.List(model.WorldKindIdentity)
+    assert len(ret) == 20
+    assert ret[3].External().Name() == "renamed"
+    assert not thestore.Exists(model.WorldIdentity("world-3"))
+    assert thestore.Get(world.Metadata().Identity()).External().Name() == "renamed"
+
+    # a primary key taken by another object is rejected untouched
+    world.External().SetName("world-4")
+    with pytest.raises(Exception) as ei:
+        thestore.Update(model.WorldIdentity("renamed"), world)
+
+    assert constants.ErrObjectExists in str(ei.value)
+    assert thestore.Get(model.WorldIdentity("renamed")).External().Counter() == 3
+    assert thestore.Get(model.WorldIdentity("world-4")).External().Counter() == 4
+
+
+def test_frozen_reads_share_and_copy_on_write(monkeypatch):
+    thestore = MemoryStore(model.Schema(), frozen=True)
+
+    world = model.WorldFactory()
+    world.External().SetName("frozen")
+    world.External().Nested().SetCounter(1)
+    nested = model.NestedWorldFactory()
+    nested.SetDescription("in a list")
+    world.External().SetList([nested])
+    created = thestore.Create(world)
+    assert isinstance(created, model.World)
+
+    calls = []
+    tojson = type(world).ToJson
+    monkeypatch.setattr(type(world), "ToJson", lambda self: calls.append(self) or tojson(self))
+
+    shared = thestore.Get(model.WorldIdentity("frozen"))
+    ret = thestore.List(model.WorldKindIdentity)
+    assert calls == []
+    assert isinstance(shared, model.World)
+    assert shared.External().Nested().Counter() == 1
+    assert shared.External().List()[0].Description() == "in a list"
+
+    # writes through nested objects copy first, the store is untouched
+    shared.External().Nested().SetCounter(2)
+    shared.External().List()[0].SetDescription("changed")
+    assert len(calls) == 1
+    assert shared.External().Nested().Counter() == 2
+    assert shared.External().List()[0].Description() == "changed"
+    assert ret[0].External().Nested().Counter() == 1
+    assert thestore.Get(model.WorldIdentity("frozen")).External().Nested().Counter() == 1
+
+    with pytest.raises(AttributeError):
+        shared.External().List().append(nested)
+
+    thestore.Update(shared.Metadata().Identity(), shared)
+    ret = thestore.Get(model.WorldIdentity("frozen"))
+    assert ret.External().Nested().Counter() == 2
+    assert ret.External().List()[0].Description() == "changed"
+    assert ret.Clone().ToJson() == shared.ToJson()
+
+
+def test_frozen_identities_are_copies():
+    thestore = MemoryStore(model.Schema(), frozen=True)
+
+    world = model.WorldFactory()
+    world.External().SetName("frozen")
+    thestore.Create(world)
+
+    shared = thestore.Get(model.WorldIdentity("frozen"))
+    identity = shared.Metadata().Identity()
+    key = identity.Key()
+    assert isinstance(identity, store.ObjectIdentity)
+    assert identity == thestore.Get(model.WorldIdentity("frozen")).Metadata().Identity()
+
+    identity.FromString("hijacked")
+    assert shared.Metadata().Identity().Key() == key
+
+    ret = thestore.Get(model.WorldIdentity("frozen"))
+    assert ret.Metadata().Identity().Key() == key
+    assert thestore.Get(store.ObjectIdentity(key)).External().Name() == "frozen"
+
+
+def test_concurrent_readers_and_writers():
+    thestore = MemoryStore(model.Schema(), indexes=["external.description"])
+    stable = 50
+    for i in range(stable):
+        world = model.WorldFactory()
+        world.External().SetName("stable-{}".format(i))
+        world.External().SetDescription("a")
+        world.External().SetCounter(i)
+        thestore.Create(world)
+
+    done = threading.Event()
+    errors = []
+    reads = []
+
+    def flip(t):
+        # moves objects between descriptions, never changes their number
+        i = 0
+        while not done.is_set():
+            name = "stable-{}".format((i * 7 + t) % stable)
+            world = thestore.Get(model.WorldIdentity(name))
+            world.External().SetDescription("b" if world.External().Description() == "a" else "a")
+            thestore.Update(world.Metadata().Identity(), world)
+            i += 1
+
+    def churn(t):
+        i = 0
+        while not done.is_set():
+            world = model.WorldFactory()
+            world.External().SetName("churn-{}-{}".format(t, i))
+            world.External().SetCounter(-1)
+            world.External().SetDescription("a")
+            thestore.Create(world)
+            thestore.Delete(world.Metadata().Identity())
+            i += 1
+
+    def read():
+        count = 0
+        while not done.is_set():
+            ret = thestore.List(model.WorldKindIdentity, options.Gte("external.counter", 0))
+            if len(ret) != stable:
+                errors.append("list saw {} objects".format(len(ret)))
+
+            ret = thestore.List(
+                model.WorldKindIdentity,
+                options.And(
+                    options.In("external.description", ["a", "b"]),
+                    options.Gte("external.counter", 0)))
+            if len(ret) != stable:
+                errors.append("indexed list saw {} objects".format(len(ret)))
+
+            ret = thestore.List(
+                model.WorldKindIdentity,
+                options.Order("external.counter", False),
+                options.PageSize(10))
+            if [r.External().Counter() for r in ret] != list(range(stable - 1, stable - 11, -1)):
+                errors.append("page out of order")
+
+            seen = sum(1 for r in thestore.Iterate(model.WorldKindIdentity) if r.External().Counter() >= 0)
+            if seen != stable:
+                errors.append("iterate saw {} objects".format(seen))
+
+            count += 1
+        reads.append(count)
+
+    def run(target, t):
+        try:
+            target(t)
+        except Exception as e:
+            errors.append(repr(e))
+
+    # switch threads as often as possible to interleave them
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    threads = [threading.Thread(target=run, args=(flip, t)) for t in range(4)]
+    threads += [threading.Thread(target=run, args=(churn, t)) for t in range(4)]
+    threads += [threading.Thread(target=run, args=(lambda t: read(), t)) for t in range(8)]
+    for t in threads:
+        t.start()
+
+    time.sleep(3)
+    done.set()
+    for t in threads:
+        t.join()
+    sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert sum(reads) > 0
+    assert thestore.Count(model.WorldKindIdentity) == stable
+    assert thestore.Count(model.WorldKindIdentity, options.Eq("external.description", "a")) + \
+        thestore.Count(model.WorldKindIdentity, options.Eq("external.description", "b")) == stable
+
+
+def test_concurrent_get_and_delete():
+    thestore = MemoryStore(model.Schema())
+    done = threading.Event()
+    errors = []
+
+    def churn():
+        i = 0
+        while not done.is_set():
+            world = model.WorldFactory()
+            world.External().SetName("churn-{}".format(i % 10))
+            thestore.Create(world)
+            thestore.Delete(model.WorldIdentity(world.External().Name()))
+            i += 1
+
+    def get():
+        i = 0
+        while not done.is_set():
+            try:
+                thestore.Get(model.WorldIdentity("churn-{}".format(i % 10)))
+            except Exception as e:
+                # a get that loses the race finds nothing, never fails otherwise
+                if str(e) != constants.ErrNoSuchObject:
+                    errors.append(repr(e))
+            i += 1
+
+    def run(target):
+        try:
+            target()
+        except Exception as e:
+            errors.append(repr(e))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    threads = [threading.Thread(target=run, args=(churn,))]
+    threads += [threading.Thread(target=run, args=(get,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+
+    time.sleep(1)
+    done.set()
+    for t in threads:
+        t.join()
+    sys.setswitchinterval(interval)
+
+    assert errors == []
+
+
+class YieldingDict(dict):
+    # hands the interpreter to another thread after every write, so a
+    # reader lands between any two steps of an index update
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        time.sleep(0)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        time.sleep(0)
+
+
+def test_concurrent_get_and_update():
+    thestore = MemoryStore(model.Schema())
+    thestore._id_index = YieldingDict(thestore._id_index)
+    world = model.WorldFactory()
+    world.External().SetName("updated")
+    world = thestore.Create(world)
+    done = threading.Event()
+    errors = []
+
+    def update():
+        i = 0
+        while not done.is_set():
+            world.External().SetCounter(i)
+            thestore.Update(world.Metadata().Identity(), world)
+            i += 1
+
+    def get():
+        while not done.is_set():
+            # an object that is only updated never disappears
+            thestore.Get(model.WorldIdentity("updated"))
+            thestore.Get(world.Metadata().Identity())
+            if not thestore.Exists(model.WorldIdentity("updated")):
+                errors.append("exists missed the object")
+            if not thestore.Exists(world.Metadata().Identity()):
+                errors.append("exists missed the object")
+
+    def run(target):
+        try:
+            target()
+        except Exception as e:
+            errors.append(repr(e))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    threads = [threading.Thread(target=run, args=(update,))]
+    threads += [threading.Thread(target=run, args=(get,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+
+    time.sleep(1)
+    done.set()
+    for t in threads:
+        t.join()
+    sys.setswitchinterval(interval)
+
+    assert errors == []
+
+
+def journaled(path, **kwargs):
+    return memory.MemoryStoreFactory(
+        model.Schema(), indexes=["external.description"], path=str(path), **kwargs)
+
+
+def worlds(thestore):
+    return sorted(
+        (r.External().Name(), r.External().Description(), r.External().Counter())
+        for r in thestore.List(model.WorldKindIdentity))
+
+
+def test_journal_recovers_writes(tmp_path):
+    thestore = journaled(tmp_path)
+    for i in range(10):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetDescription("description-{}".format(i % 2))
+        world.External().SetCounter(i)
+        thestore.Create(world)
+
+    world = thestore.Get(model.WorldIdentity("world-2"))
+    world.External().SetName("renamed")
+    thestore.Update(model.WorldIdentity("world-2"), world)
+    thestore.Delete(model.WorldIdentity("world-4"))
+    thestore.Delete(model.WorldKindIdentity, options.Eq("external.description", "description-1"))
+    thestore.DeleteMany([model.WorldIdentity("world-0"), model.WorldIdentity("missing")])
+
+    expected = worlds(thestore)
+    assert [w[0] for w in expected] == ["renamed", "world-6", "world-8"]
+    thestore.Close()
+
+    recovered = journaled(tmp_path)
+    assert worlds(recovered) == expected
+    assert recovered.Get(world.Metadata().Identity()).External().Name() == "renamed"
+    assert recovered.Count(
+        model.WorldKindIdentity, options.Eq("external.description", "description-0")) == 3
+    recovered.Close()
+
+
+def test_journal_snapshots_and_drops_torn_writes(tmp_path):
+    thestore = journaled(tmp_path, fsync="never", snapshot_ops=5)
+    for i in range(12):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetCounter(i)
+        thestore.Create(world)
+
+    thestore.Snapshot()
+    expected = worlds(thestore)
+    world = model.WorldFactory()
+    world.External().SetName("after-snapshot")
+    thestore.Create(world)
+    thestore.Close()
+
+    # snapshots replaced the segments they cover
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert len(files) == 2
+    assert files[0] == "snapshot"
+
+    # a crash in the middle of a write leaves part of a line behind
+    segment = tmp_path / files[1]
+    with open(segment, "a") as f:
+        f.write('c\t\tid/torn\t{"metadata": ')
+
+    recovered = journaled(tmp_path)
+    assert worlds(recovered) == sorted(expected + [("after-snapshot", "", 0)])
+    recovered.Close()
+    assert segment.read_text().endswith("\n")
+
+
+def test_journal_options_need_a_path():
+    with pytest.raises(Exception, match="journal options without a path: fsync"):
+        memory.MemoryStoreFactory(model.Schema(), fsync="never")
+
+
+def tiered(tmp_path, **kwargs):
+    from pystorz.sql.sqlite import SqliteStoreFactory
+
+    backing = SqliteStoreFactory(model.Schema(), str(tmp_path / "backing.db"))
+    return memory.MemoryStoreFactory(model.Schema(), backing=backing, **kwargs), backing
+
+
+def test_tiered_evicts_and_faults_in(tmp_path):
+    thestore, backing = tiered(tmp_path, max_objects=3)
+    for i in range(10):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetCounter(i)
+        thestore.Create(world)
+
+    metrics = thestore.Metrics()
+    assert metrics["resident_objects"] == 3
+    assert metrics["evictions"] == 7
+    assert backing.Count(model.WorldKindIdentity) == 7
+
+    # faulted back in, evicting the least recently used
+    world = thestore.Get(model.WorldIdentity("world-0"))
+    assert world.External().Counter() == 0
+    world.External().SetCounter(100)
+    thestore.Update(model.WorldIdentity("world-0"), world)
+    assert thestore.Get(model.WorldIdentity("world-9")).External().Counter() == 9
+
+    metrics = thestore.Metrics()
+    assert metrics["resident_objects"] == 3
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 1
+    assert metrics["hit_ratio"] == 2 / 3
+    # not written back before it is evicted
+    assert backing.Get(model.WorldIdentity("world-0")).External().Counter() == 0
+
+    # lists merge both tiers, the resident copy wins
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Gt("external.counter", 5),
+        options.Order("external.counter", False),
+        options.PageSize(3))
+    assert [r.External().Counter() for r in ret] == [100, 9, 8]
+    assert thestore.Count(model.WorldKindIdentity) == 10
+
+    # deeper pages are positioned by an order, never by the merge
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter"),
+        options.PageOffset(3),
+        options.PageSize(3))
+    assert [r.External().Counter() for r in ret] == [4, 5, 6]
+    with pytest.raises(Exception, match=constants.ErrInvalidOption):
+        thestore.List(model.WorldKindIdentity, options.PageOffset(3), options.PageSize(3))
+
+    thestore.Delete(model.WorldIdentity("world-0"))
+    thestore.Delete(model.WorldKindIdentity, options.Lt("external.counter", 3))
+    assert sorted(r.External().Counter() for r in thestore.List(model.WorldKindIdentity)) == \
+        [3, 4, 5, 6, 7, 8, 9]
+    assert not backing.Exists(model.WorldIdentity("world-0"))
+
+    thestore.Flush()
+    assert backing.Count(model.WorldKindIdentity) == 7
+
+
+def test_tiered_byte_budget(tmp_path):
+    world = model.WorldFactory()
+    size = len(world.ToJson())
+
+    thestore, backing = tiered(tmp_path, max_bytes=size * 4)
+    for i in range(10):
+        world = model.WorldFactory()
+        world.External().SetName("w{}".format(i))
+        thestore.Create(world)
+
+    metrics = thestore.Metrics()
+    assert metrics["resident_bytes"] <= size * 4
+    assert metrics["resident_objects"] + backing.Count(model.WorldKindIdentity) == 10
+
+    with pytest.raises(Exception) as e:
+        world = model.WorldFactory()
+        world.External().SetName("w0")
+        thestore.Create(world)
+    assert str(e.value) == constants.ErrObjectExists
+
+
+def test_columns_match_row_evaluation():
+    pytest.importorskip("numpy")
+    plain = MemoryStore(model.Schema())
+    columned = MemoryStore(
+        model.Schema(), columns=["external.counter", "external.alive", "external.description"])
+
+    for i in range(60):
+        world = model.WorldFactory()
+        world.External().SetName("world-{:02d}".format(i))
+        world.External().SetDescription("description-{}".format(i % 7))
+        world.External().SetCounter(i % 13)
+        world.External().SetAlive(i % 3 == 0)
+        plain.Create(world)
+        columned.Create(world)
+
+    # rows are moved around by deletes and updates
+    for s in [plain, columned]:
+        s.Delete(model.WorldIdentity("world-05"))
+        world = s.Get(model.WorldIdentity("world-10"))
+        world.External().SetCounter(100)
+        s.Update(model.WorldIdentity("world-10"), world)
+
+    filters = [
+        options.Gt("external.counter", 5),
+        options.Lte("external.counter", "7"),
+        options.Eq("external.alive", True),
+        options.In("external.counter", [1, 2.0, "3", True]),
+        options.Gte("external.description", "description-4"),
+        options.And(options.Lt("external.counter", 10), options.Not(options.Eq("external.alive", False))),
+        options.Or(options.Eq("external.description", "description-1"), options.Gt("external.counter", 11)),
+        # the name has no column, it is evaluated row by row
+        options.And(options.Gt("external.counter", 3), options.Lt("external.name", "world-30")),
+        # comparing numbers with strings raises, the rows that get
+        # that far are left out
+        options.Not(options.And(options.Eq("external.alive", True), options.Lt("external.counter", "abc"))),
+        options.Or(options.Eq("external.alive", False), options.Lt("external.counter", "abc")),
+    ]
+
+    for flt in filters:
+        for extra in [[], [options.Order("external.counter", False), options.PageSize(5), options.PageOffset(2)]]:
+            expected = [w.External().Name() for w in plain.List(model.WorldKindIdentity, flt, *extra)]
+            got = [w.External().Name() for w in columned.List(model.WorldKindIdentity, flt, *extra)]
+            if len(extra) == 0:
+                expected, got = sorted(expected), sorted(got)
+            assert got == expected, str(flt)
+
+        assert columned.Count(model.WorldKindIdentity, flt) == \
+            plain.Count(model.WorldKindIdentity, flt), str(flt)
+
+    ret = columned.List(
+        model.WorldKindIdentity, options.Order("external.description"), options.PageSize(4))
+    assert [w.External().Name() for w in ret] == \
+        [w.External().Name() for w in plain.List(
+            model.WorldKindIdentity, options.Order("external.description"), options.PageSize(4))]
+
+
+def test_compiled_filters():
+    sample = model.WorldFactory()
+    world = model.WorldFactory()
+    world.External().SetName("world")
+    world.External().SetCounter(12)
+    world.External().SetAlive(True)
+
+    def match(flt):
+        return predicate.compile_filter(flt, sample)(world)
+
+    # numbers compare as numbers, even when written as strings
+    assert match(options.Gt("external.counter", "9"))
+    assert not match(options.Lt("external.counter", 9.5))
+    assert match(options.Lte("external.name", "world"))
+    assert match(options.In("external.counter", [1, 12]))
+    assert match(options.Not(options.Eq("external.alive", False)))
+    assert match(options.Or(options.Eq("external.name", "other"), options.Gte("external.counter", 12)))
+
+    # an unknown path fails when it is reached, not before
+    invalid = predicate.compile_filter(
+        options.And(options.Eq("external.alive", True), options.Eq("external.missing", 1)), sample)
+    assert not invalid(sample)
+    with pytest.raises(Exception) as e:
+        invalid(world)
+    assert str(e.value) == constants.ErrInvalidFilter
+
+    assert predicate.object_getter("external.counter")(world) == 12
+    assert predicate.object_getter("external.missing")(world) is None
+
+
+def test_bounded_pages_pick_the_top(thestore):
+    # no index on the name, every page is picked out of all objects
+    for ascending in [True, False]:
+        everything = [r.External().Name() for r in thestore.List(
+            model.WorldKindIdentity, options.Order("external.name", ascending))]
+        assert everything == sorted(everything, reverse=not ascending)
+
+        for offset in [0, 3, 18]:
+            ret = thestore.List(
+                model.WorldKindIdentity,
+                options.Order("external.name", ascending),
+                options.PageOffset(offset),
+                options.PageSize(5))
+            assert [r.External().Name() for r in ret] == everything[offset:offset + 5]
+
+        ret = thestore.List(
+            model.WorldKindIdentity,
+            options.Order("external.name", ascending),
+            options.After(everything[4], everything[4]),
+            options.PageSize(3))
+        assert [r.External().Name() for r in ret] == everything[5:8]
+
+
+def test_ordered_pages_read_each_key_once(thestore, monkeypatch):
+    reads = []
+    object_getter = predicate.object_getter
+
+    def counting(path):
+        get = object_getter(path)
+
+        def counted(obj):
+            reads.append(obj.External().Name())
+            return get(obj)
+
+        return counted
+
+    monkeypatch.setattr(predicate, "object_getter", counting)
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.name", False),
+        options.After("world-5", "world-5"),
+        options.PageSize(3))
+
+    assert [r.External().Name() for r in ret] == ["world-4", "world-3", "world-2"]
+    assert sorted(reads) == sorted("world-{}".format(i) for i in range(20))
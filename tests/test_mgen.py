@@ -181,3 +181,35 @@ def test_datetime_property_type():
     world.External().SetDate(dt)
 
     assert world.External().Date() == dt
+
+
+def test_declared_indexes():
+    from generated import model
+
+    schema = model.Schema()
+    assert schema.Indexes(model.WorldKind) == ["external.counter", "external.alive"]
+    assert schema.Indexes("world") == ["external.counter", "external.alive"]
+    assert schema.Indexes(model.SecondWorldKind) == []
+
+
+def test_unknown_index_property():
+    from pystorz.mgen import generator
+    from pystorz.mgen.meta import Struct, Resource
+
+    structs = {
+        "Ext": Struct({
+            "name": "Ext",
+            "properties": [
+                {"name": "name", "type": "string"},
+                {"name": "tags", "type": "[]string"}]})}
+
+    resources = {
+        "Obj": Resource({
+            "name": "Obj",
+            "external": "Ext",
+            "indexes": ["external.name", "external.tags", "external.nope"]})}
+
+    errors = generator._validate_model(structs, resources)
+    assert len(errors) == 2
+    assert "external.tags" in errors[0]
+    assert "external.nope" in errors[1]
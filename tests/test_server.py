@@ -1,4 +1,5 @@
 import time
+import types
 import logging
 import requests
 
@@ -8,8 +9,9 @@ globals.logger_config()
 
 log = logging.getLogger(__name__)
 
-from pystorz.store import store
+from pystorz.store import store, options
 from pystorz.rest import server, client
+from pystorz.memory.memory import MemoryStore
 from generated import model
 
 def test_server_can_start():
@@ -45,3 +47,114 @@ def test_sample_request():
 
     assert response is not None
     assert response.status_code == 200
+
+
+def memory_server():
+    srv = server.Server(
+        model.Schema(),
+        MemoryStore(model.Schema()),
+        server.Expose(
+            model.WorldKind,
+            server.ActionGet,
+            server.ActionCreate,
+            server.ActionUpdate,
+            server.ActionDelete),
+    )
+
+    return srv.app.test_client()
+
+
+def test_bad_cursor_is_a_bad_request():
+    app = memory_server()
+
+    response = app.get("/world?ak=world-1&av=%7Bnot-json")
+    assert response.status_code == 400
+
+    response = app.get("/world?ak=world-1&av=%22world-1%22&ob=external.name")
+    assert response.status_code == 200
+
+
+def test_head_on_missing_objects(monkeypatch):
+    app = memory_server()
+
+    # HEAD answers as GET would, without the body
+    assert app.head("/world").status_code == 200
+    assert app.head("/world/").status_code == 200
+    assert app.head("/world/missing").status_code == 404
+    assert app.head("/id/missing").status_code == 404
+
+    # the client reaches the same app, without a socket
+    def request(method, url, data=None, headers=None):
+        response = app.open(url, method=method, data=data, headers=headers)
+        return types.SimpleNamespace(
+            status_code=response.status_code, content=response.data, headers=response.headers)
+
+    monkeypatch.setattr(client.requests, "request", request)
+    cli = client.Client("http://localhost", model.Schema())
+
+    assert not cli.Exists(model.WorldIdentity("missing"))
+    assert not cli.Exists(store.ObjectIdentity("missing"))
+
+    world = model.WorldFactory()
+    world.External().SetName("present")
+    world = cli.Create(world)
+
+    assert cli.Exists(model.WorldIdentity("present"))
+    assert cli.Exists(world.Metadata().Identity())
+    assert cli.Count(model.WorldKindIdentity) == 1
+    assert cli.Count(model.WorldKindIdentity, options.Eq("external.name", "missing")) == 0
+
+
+def test_head_by_id_checks_existence_first():
+    srv = server.Server(
+        model.Schema(),
+        MemoryStore(model.Schema()),
+        server.Expose(model.WorldKind, server.ActionGet, server.ActionCreate),
+        server.Expose(model.SecondWorldKind, server.ActionCreate),
+    )
+    app = srv.app.test_client()
+
+    gets = []
+    get = srv.Store.Get
+    srv.Store.Get = lambda identity, *opt: gets.append(identity) or get(identity, *opt)
+
+    assert app.head("/id/missing").status_code == 404
+    assert gets == []
+
+    world = model.WorldFactory()
+    world.External().SetName("head")
+    world = srv.Store.Create(world)
+    second = model.SecondWorldFactory()
+    second.External().SetName("head")
+    second = srv.Store.Create(second)
+
+    # a kind without GET, so the kind is needed for the method check
+    assert app.head("/id/" + world.Metadata().Identity().Key()).status_code == 200
+    assert app.head("/id/" + second.Metadata().Identity().Key()).status_code == 405
+
+
+def test_head_on_type_counts_without_listing():
+    srv = server.Server(
+        model.Schema(),
+        MemoryStore(model.Schema()),
+        server.Expose(model.WorldKind, server.ActionGet),
+    )
+    app = srv.app.test_client()
+
+    def list(identity, *opt):
+        raise Exception("listed")
+
+    srv.Store.List = list
+
+    response = app.head("/world")
+    assert response.status_code == 200
+    assert response.headers[server.CountHeader] == "0"
+
+    world = model.WorldFactory()
+    world.External().SetName("counted")
+    srv.Store.Create(world)
+
+    response = app.head("/world?ps=10&ob=external.name")
+    assert response.status_code == 200
+    assert response.headers[server.CountHeader] == "1"
+    assert app.head("/world?ak=world-1&av=%7Bnot-json").status_code == 400
@@ -0,0 +1,679 @@
+import os
+import pytest
+import sqlite3
+import logging
+import threading
+
+from config import globals
+
+log = logging.getLogger(__name__)
+
+globals.logger_config()
+
+from generated import model
+
+from pystorz.internal import constants
+from pystorz.store import store, options
+from pystorz.sql.sqlite import SqliteStoreFactory, SqliteProfile, ReadOptimizedProfile, DurableProfile
+from pystorz.sql.codec import ZlibCodec, TrainDictionary
+
+
+def sqlite(db_file, **kwargs):
+    for f in [db_file, db_file + "-wal", db_file + "-shm"]:
+        if os.path.exists(f):
+            os.remove(f)
+
+    return SqliteStoreFactory(model.Schema(), db_file, **kwargs)
+
+
+def query_plan(thestore, identity, *opt):
+    copt = options.CommonOptionHolderFactory()
+    for o in opt:
+        o.ApplyFunction()(copt)
+
+    query, params = thestore._buildListQuery(copt, identity)
+    with thestore._pool.connection() as db:
+        db.execute("EXPLAIN QUERY PLAN " + query, params)
+        plan = " | ".join([str(r[-1]) for r in db.fetchall()])
+
+    log.info("query plan: {}".format(plan))
+    return plan
+
+
+@pytest.fixture
+def thestore(tmp_path):
+    thestore = sqlite(str(tmp_path / "index.db"), indexes=["external.description"])
+
+    for i in range(20):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetDescription("description-{}".format(i % 5))
+        world.External().SetCounter(i)
+        world.External().SetAlive(i % 2 == 0)
+        thestore.Create(world)
+
+    return thestore
+
+
+def test_model_declared_index_serves_filters(thestore):
+    plan = query_plan(
+        thestore,
+        model.WorldKindIdentity,
+        options.Eq("external.counter", 5))
+
+    assert "USING INDEX IX_Objects_external_counter" in plan
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Lt("external.counter", 5))
+
+    assert len(ret) == 5
+    for r in ret:
+        assert r.External().Counter() < 5
+
+
+def test_model_declared_index_serves_order(thestore):
+    plan = query_plan(
+        thestore,
+        model.WorldKindIdentity,
+        options.Order("external.counter", False))
+
+    assert "IX_Objects_external_counter" in plan
+    assert "TEMP B-TREE" not in plan
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter", False),
+        options.PageSize(3))
+
+    assert [r.External().Counter() for r in ret] == [19, 18, 17]
+
+
+def test_model_declared_index_serves_keyset_pages(thestore):
+    plan = query_plan(
+        thestore,
+        model.WorldKindIdentity,
+        options.Order("external.counter", False),
+        options.After(10, "world-10"),
+        options.PageSize(3))
+
+    assert "USING INDEX IX_Objects_external_counter" in plan
+    assert "TEMP B-TREE" not in plan
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Order("external.counter", False),
+        options.After(10, "world-10"),
+        options.PageSize(3))
+
+    assert [r.External().Counter() for r in ret] == [9, 8, 7]
+
+
+def test_option_declared_index_serves_filters(thestore):
+    plan = query_plan(
+        thestore,
+        model.WorldKindIdentity,
+        options.In("external.description", ["description-1", "description-2"]))
+
+    assert "USING INDEX IX_Objects_external_description" in plan
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.In("external.description", ["description-1", "description-2"]))
+
+    assert len(ret) == 8
+
+
+def test_unindexed_filters_still_work(thestore):
+    plan = query_plan(
+        thestore,
+        model.WorldKindIdentity,
+        options.Eq("external.name", "world-3"))
+
+    assert "IX_Objects_external_name" not in plan
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.name", "world-3"))
+
+    assert len(ret) == 1
+    assert ret[0].External().Counter() == 3
+
+
+def test_invalid_index_path(tmp_path):
+    with pytest.raises(Exception) as ei:
+        sqlite(str(tmp_path / "index.db"), indexes=["external.name'); DROP TABLE Objects; --"])
+
+    assert "invalid index path" in str(ei.value)
+
+
+def test_batch_abort_rolls_back(thestore):
+    worlds = []
+    for i in range(3):
+        world = model.WorldFactory()
+        world.External().SetName("batch-{}".format(i))
+        worlds.append(world)
+
+    # world-3 already exists, so nothing of the batch may be kept
+    world = model.WorldFactory()
+    world.External().SetName("world-3")
+    worlds.append(world)
+
+    with pytest.raises(Exception):
+        thestore.CreateMany(worlds, options.AbortOnError())
+
+    ret = thestore.List(model.WorldKindIdentity)
+    assert len(ret) == 20
+
+    ret = thestore.CreateMany(worlds)
+    assert len(ret.Errors()) == 1
+    assert len(thestore.List(model.WorldKindIdentity)) == 23
+
+    ret = thestore.DeleteMany(
+        [model.WorldIdentity(w.External().Name()) for w in worlds],
+        options.AbortOnError())
+    assert ret == [None] * 4
+    assert len(thestore.List(model.WorldKindIdentity)) == 19
+
+
+def test_iterate_while_writing(thestore):
+    seen = 0
+    for r in thestore.Iterate(
+            model.WorldKindIdentity,
+            options.Order("external.counter"),
+            options.BatchSize(5)):
+        r.External().SetDescription("iterated")
+        thestore.Update(r.Metadata().Identity(), r)
+        seen += 1
+
+    assert seen == 20
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "iterated"))
+    assert len(ret) == 20
+
+
+def test_filtered_delete_removes_identities(thestore):
+    ids = [w.Metadata().Identity() for w in thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-2"))]
+    assert len(ids) == 4
+
+    thestore.Delete(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-2"))
+
+    assert thestore.Count(model.WorldKindIdentity) == 16
+    for i in ids:
+        assert not thestore.Exists(i)
+
+    with thestore._pool.connection() as db:
+        db.execute("SELECT COUNT(*) FROM IdIndex")
+        assert db.fetchall()[0][0] == 16
+
+        db.execute("EXPLAIN QUERY PLAN DELETE FROM IdIndex WHERE Type = ? AND Pkey IN (SELECT Pkey FROM Objects WHERE Type = ?)", ("world", "world"))
+        plan = " | ".join([str(r[-1]) for r in db.fetchall()])
+
+    assert "IX_IdIndex_Type_Pkey" in plan
+
+
+def pragma(thestore, name):
+    with thestore._pool.connection() as db:
+        db.execute("PRAGMA {}".format(name))
+        return db.fetchall()[0][0]
+
+
+def test_profiles_set_pragmas(tmp_path):
+    thestore = sqlite(str(tmp_path / "profile.db"), profile=ReadOptimizedProfile())
+    assert pragma(thestore, "journal_mode") == "wal"
+    assert pragma(thestore, "synchronous") == 1
+    assert pragma(thestore, "cache_size") == -64 * 1024
+    assert pragma(thestore, "temp_store") == 2
+    assert pragma(thestore, "busy_timeout") == 5000
+
+    thestore = sqlite(str(tmp_path / "profile.db"), profile=DurableProfile())
+    assert pragma(thestore, "journal_mode") == "wal"
+    assert pragma(thestore, "synchronous") == 2
+
+    thestore = sqlite(str(tmp_path / "profile.db"), profile=SqliteProfile(synchronous="off"))
+    assert pragma(thestore, "journal_mode") == "delete"
+    assert pragma(thestore, "synchronous") == 0
+
+
+def test_invalid_profile():
+    with pytest.raises(Exception) as ei:
+        SqliteProfile(journal_mode="WAL; DROP TABLE Objects")
+
+    assert "invalid journal_mode" in str(ei.value)
+
+    with pytest.raises(Exception):
+        SqliteProfile(cache_size="-2000")
+
+
+def test_pool_is_shared_by_short_lived_threads(tmp_path):
+    thestore = sqlite(str(tmp_path / "pool.db"), pool_size=2)
+    world = model.WorldFactory()
+    world.External().SetName("pooled")
+    thestore.Create(world)
+
+    def get():
+        for _ in range(10):
+            thestore.Get(model.WorldIdentity("pooled"))
+
+    for _ in range(5):
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    metrics = thestore.Metrics()
+    assert metrics["size"] <= 2
+    assert metrics["in_use"] == 0
+    assert metrics["checkouts"] == 401
+    assert metrics["timeouts"] == 0
+
+
+def test_pool_checkout_timeout(tmp_path):
+    thestore = sqlite(str(tmp_path / "pool.db"), pool_size=1, pool_timeout=0.1)
+    thestore.List(model.WorldKindIdentity)
+
+    checked_out = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with thestore._pool.connection():
+            checked_out.set()
+            release.wait()
+
+    t = threading.Thread(target=hold)
+    t.start()
+    checked_out.wait()
+
+    with pytest.raises(Exception) as ei:
+        thestore.List(model.WorldKindIdentity)
+
+    release.set()
+    t.join()
+
+    assert constants.ErrPoolTimeout in str(ei.value)
+    metrics = thestore.Metrics()
+    assert metrics["waits"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_time"] > 0
+
+    thestore.List(model.WorldKindIdentity)
+
+
+def test_pool_evicts_idle_connections(tmp_path):
+    thestore = sqlite(str(tmp_path / "pool.db"), pool_idle=0)
+    thestore.List(model.WorldKindIdentity)
+    thestore.List(model.WorldKindIdentity)
+
+    metrics = thestore.Metrics()
+    assert metrics["evicted"] == 1
+    assert metrics["size"] == 1
+
+
+def test_group_commit(tmp_path):
+    thestore = sqlite(
+        str(tmp_path / "group.db"),
+        profile=ReadOptimizedProfile(),
+        group_commit_ms=20,
+        group_commit_ops=50)
+
+    errors = []
+
+    def create(t):
+        for i in range(25):
+            world = model.WorldFactory()
+            world.External().SetName("group-{}-{}".format(t, i))
+            world.External().SetCounter(i)
+            ret = thestore.Create(world)
+            assert ret.External().Name() == world.External().Name()
+
+        # every caller gets its own failure back
+        world = model.WorldFactory()
+        world.External().SetName("group-{}-0".format(t))
+        try:
+            thestore.Create(world)
+        except Exception as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=create, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == [constants.ErrObjectExists] * 8
+    assert len(thestore.List(model.WorldKindIdentity)) == 200
+
+    world = thestore.Get(model.WorldIdentity("group-3-7"))
+    world.External().SetDescription("updated")
+    thestore.Update(world.Metadata().Identity(), world)
+    assert thestore.Get(model.WorldIdentity("group-3-7")).External().Description() == "updated"
+
+    thestore.Delete(model.WorldIdentity("group-3-7"))
+    with pytest.raises(Exception):
+        thestore.Delete(model.WorldIdentity("group-3-7"))
+
+    metrics = thestore.Metrics()
+    assert metrics["grouped_ops"] == 211
+    assert metrics["groups"] < metrics["grouped_ops"]
+
+    thestore.Close()
+
+
+def test_codec_compresses_payloads(tmp_path):
+    worlds = []
+    for i in range(20):
+        world = model.WorldFactory()
+        world.External().SetName("world-{}".format(i))
+        world.External().SetDescription("description-{}".format(i % 5))
+        world.External().SetCounter(i)
+        worlds.append(world)
+
+    dictionary = TrainDictionary([w.ToJson() for w in worlds])
+    assert len(dictionary) > 0
+
+    thestore = sqlite(
+        str(tmp_path / "codec.db"),
+        indexes=["external.description"],
+        codec=ZlibCodec(dictionary=dictionary))
+    thestore.CreateMany(worlds)
+
+    world = thestore.Get(model.WorldIdentity("world-3"))
+    assert world.ToJson() == worlds[3].ToJson()
+    assert thestore.Get(world.Metadata().Identity()).ToJson() == world.ToJson()
+
+    world.External().SetCounter(100)
+    thestore.Update(world.Metadata().Identity(), world)
+    assert thestore.Get(model.WorldIdentity("world-3")).External().Counter() == 100
+
+    # indexed properties and metadata stay queryable
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "description-3"),
+        options.Order("external.counter"))
+    assert [r.External().Name() for r in ret] == ["world-8", "world-13", "world-18", "world-3"]
+
+    ret = thestore.List(
+        model.WorldKindIdentity,
+        options.Eq("metadata.identity", str(world.Metadata().Identity())))
+    assert len(ret) == 1
+
+    assert len(list(thestore.Iterate(model.WorldKindIdentity, options.BatchSize(7)))) == 20
+
+    with pytest.raises(Exception) as ei:
+        thestore.List(model.WorldKindIdentity, options.Eq("external.name", "world-5"))
+
+    assert constants.ErrNotQueryable in str(ei.value)
+
+    with thestore._pool.connection() as db:
+        db.execute("SELECT Object, Payload FROM Objects")
+        for data, payload in db.fetchall():
+            assert "world-" not in data
+            assert len(payload) < len(worlds[0].ToJson())
+
+    # the payloads cannot be read without the codec
+    with pytest.raises(Exception):
+        SqliteStoreFactory(model.Schema(), str(tmp_path / "codec.db")).Get(model.WorldIdentity("world-3"))
+
+
+def test_single_writer(tmp_path):
+    with pytest.raises(Exception):
+        sqlite(str(tmp_path / "writer.db"), single_writer=True, profile=SqliteProfile(journal_mode="DELETE"))
+
+    thestore = sqlite(str(tmp_path / "writer.db"), single_writer=True, pool_size=4)
+    errors = []
+
+    def write(t):
+        try:
+            for i in range(20):
+                world = model.WorldFactory()
+                world.External().SetName("writer-{}-{}".format(t, i))
+                thestore.Create(world)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            for _ in range(20):
+                thestore.List(model.WorldKindIdentity)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert thestore.Count(model.WorldKindIdentity) == 80
+
+    for r in thestore.Iterate(model.WorldKindIdentity, options.BatchSize(10)):
+        r.External().SetDescription("iterated")
+        thestore.Update(r.Metadata().Identity(), r)
+
+    assert thestore.Count(
+        model.WorldKindIdentity,
+        options.Eq("external.description", "iterated")) == 80
+
+    # reads never get the writer connection
+    with thestore._readPool.connection() as db:
+        with pytest.raises(Exception):
+            db.execute("DELETE FROM Objects")
+
+    metrics = thestore.Metrics()
+    assert metrics["size"] == 1
+    assert metrics["read_size"] <= 4
+    assert metrics["checkouts"] == 161
+
+    thestore.Close()
+
+
+def test_slow_query_log(tmp_path, caplog):
+    slow = []
+    thestore = sqlite(
+        str(tmp_path / "profile.db"),
+        slow_query_ms=0,
+        explain_slow_queries=True,
+        on_slow_query=slow.append)
+
+    world = model.WorldFactory()
+    world.External().SetName("slow")
+    world.External().SetCounter(5)
+    thestore.Create(world)
+    assert len(slow) == 2
+    del slow[:]
+
+    flt = options.And(
+        options.Gt("external.counter", 1),
+        options.Not(options.Eq("external.name", "fast")))
+
+    with caplog.at_level(logging.WARNING, logger="pystorz.sql.slow"):
+        ret = thestore.List(model.WorldKindIdentity, flt)
+
+    assert len(ret) == 1
+    assert len(slow) == 1
+    assert "external.counter" in slow[0]["filter"]
+    assert "external.name" in slow[0]["filter"]
+    assert slow[0]["elapsed"] >= 0
+    assert any("IX_Objects_external_counter" in line for line in slow[0]["plan"])
+    assert any("slow query" in r.getMessage() for r in caplog.records)
+
+    statements = thestore.Statements()
+    assert slow[0]["query"] in statements
+    assert statements[slow[0]["query"]]["count"] == 1
+
+    # only statements above the threshold are reported
+    thestore = sqlite(str(tmp_path / "profile.db"), slow_query_ms=60000, on_slow_query=slow.append)
+    thestore.Create(world)
+    thestore.List(model.WorldKindIdentity, flt)
+    list(thestore.Iterate(model.WorldKindIdentity, flt))
+    assert len(slow) == 1
+    assert sum(s["count"] for s in thestore.Statements().values()) >= 4
+
+
+def test_legacy_escaped_quotes_are_migrated(tmp_path):
+    # a database written before values were bound, with single
+    # quotes escaped as $%# and no schema version
+    path = str(tmp_path / "legacy.db")
+    world = model.WorldFactory()
+    world.External().SetName("legacy")
+    world.External().SetDescription("it's old")
+
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IdIndex (Path VARCHAR(75) NOT NULL PRIMARY KEY, Pkey NVARCHAR(50) NOT NULL, Type VARCHAR(25) NOT NULL)")
+    connection.execute("CREATE TABLE Objects (Pkey NVARCHAR(50) NOT NULL, Type VARCHAR(25) NOT NULL, Object JSON, PRIMARY KEY (Pkey,Type))")
+    connection.execute("INSERT INTO IdIndex VALUES (?, ?, ?)", (world.Metadata().Identity().Path(), "legacy", "world"))
+    connection.execute("INSERT INTO Objects VALUES (?, ?, ?)", ("legacy", "world", world.ToJson().replace("'", "$%#")))
+    connection.commit()
+    connection.close()
+
+    thestore = SqliteStoreFactory(model.Schema(), path)
+    assert thestore.Get(model.WorldIdentity("legacy")).External().Description() == "it's old"
+    assert thestore.Count(model.WorldKindIdentity, options.Eq("external.description", "it's old")) == 1
+    thestore.Close()
+
+    # the migration runs once, objects written since are left as they are
+    thestore = SqliteStoreFactory(model.Schema(), path)
+    world = model.WorldFactory()
+    world.External().SetName("current")
+    world.External().SetDescription("kept $%# as is")
+    thestore.Create(world)
+    thestore.Close()
+
+    thestore = SqliteStoreFactory(model.Schema(), path)
+    assert thestore.Get(model.WorldIdentity("current")).External().Description() == "kept $%# as is"
+    thestore.Close()
+
+
+def test_first_reads_use_the_indexes(tmp_path):
+    path = str(tmp_path / "first.db")
+    thestore = SqliteStoreFactory(model.Schema(), path)
+    world = model.WorldFactory()
+    world.External().SetName("first")
+    world.External().SetCounter(5)
+    thestore.Create(world)
+    thestore.Close()
+
+    flt = options.Eq("external.counter", 5)
+    for read in [
+            lambda s: s.Count(model.WorldKindIdentity, flt),
+            lambda s: len(list(s.Iterate(model.WorldKindIdentity, flt)))]:
+        # the read is the first thing a new store runs
+        slow = []
+        thestore = SqliteStoreFactory(
+            model.Schema(), path,
+            slow_query_ms=0,
+            explain_slow_queries=True,
+            on_slow_query=slow.append)
+
+        assert read(thestore) == 1
+        assert any("IX_Objects_external_counter" in line for line in slow[-1]["plan"])
+        thestore.Close()
+
+
+def test_get_by_id_joins_identities(tmp_path):
+    thestore = SqliteStoreFactory(model.Schema(), str(tmp_path / "ids.db"), slow_query_ms=60000)
+
+    world = model.WorldFactory()
+    world.External().SetName("by-id")
+    world.External().SetCounter(3)
+    second = model.SecondWorldFactory()
+    second.External().SetName("by-id")
+    thestore.CreateMany([world, second], options.AbortOnError())
+
+    # bare ids and id/ paths take the joined lookup, which finds the kind
+    for obj in [world, second]:
+        uid = str(obj.Metadata().Identity()).split("/")[-1]
+        for identity in [store.ObjectIdentity(uid), store.ObjectIdentity("id/" + uid)]:
+            assert identity.Type() == "id"
+            got = thestore.Get(identity)
+            assert got.Metadata().Kind() == obj.Metadata().Kind()
+            assert got.ToJson() == obj.ToJson()
+
+    statements = [s for s in thestore.Statements().keys() if s.startswith("SELECT")]
+    assert len(statements) == 1
+    assert "JOIN Objects" in statements[0]
+    assert thestore.Statements()[statements[0]]["count"] == 4
+
+    thestore.Delete(world.Metadata().Identity())
+    with pytest.raises(Exception) as ei:
+        thestore.Get(world.Metadata().Identity())
+
+    assert constants.ErrNoSuchObject in str(ei.value)
+    thestore.Close()
+
+
+def test_update_keeps_keys_unique(thestore):
+    world = thestore.Get(model.WorldIdentity("world-1"))
+    other = thestore.Get(model.WorldIdentity("world-2"))
+
+    # a primary key that is taken
+    world.External().SetName("world-2")
+    with pytest.raises(Exception) as ei:
+        thestore.Update(model.WorldIdentity("world-1"), world)
+
+    assert constants.ErrObjectExists in str(ei.value)
+
+    # an identity that is taken
+    world = thestore.Get(model.WorldIdentity("world-1"))
+    world.Metadata().SetIdentity(other.Metadata().Identity())
+    with pytest.raises(Exception) as ei:
+        thestore.Update(model.WorldIdentity("world-1"), world)
+
+    assert constants.ErrObjectExists in str(ei.value)
+
+    assert thestore.Get(model.WorldIdentity("world-1")).External().Counter() == 1
+    assert thestore.Get(other.Metadata().Identity()).External().Name() == "world-2"
+
+
+def test_update_leaves_identities_alone(tmp_path):
+    thestore = SqliteStoreFactory(model.Schema(), str(tmp_path / "update.db"), slow_query_ms=60000)
+    world = model.WorldFactory()
+    world.External().SetName("update")
+    thestore.Create(world)
+
+    with thestore._pool.connection() as db:
+        db.execute("SELECT Path, Pkey, Type FROM IdIndex")
+        before = db.fetchall()
+
+    world.External().SetDescription("updated")
+    thestore.Update(world.Metadata().Identity(), world)
+    assert thestore.Get(model.WorldIdentity("update")).External().Description() == "updated"
+
+    with thestore._pool.connection() as db:
+        db.execute("SELECT Path, Pkey, Type FROM IdIndex")
+        assert db.fetchall() == before
+
+    assert not any(s.startswith("UPDATE IdIndex") for s in thestore.Statements().keys())
+    thestore.Close()
+
+
+def test_writes_clone_once(thestore, monkeypatch):
+    calls = []
+    world = thestore.Get(model.WorldIdentity("world-3"))
+    clone = type(world).Clone
+
+    def counting(self):
+        calls.append(self)
+        return clone(self)
+
+    monkeypatch.setattr(type(world), "Clone", counting)
+
+    other = model.WorldFactory()
+    other.External().SetName("other")
+    thestore.Create(other)
+    assert len(calls) == 1
+
+    del calls[:]
+    world.External().SetDescription("updated")
+    thestore.Update(model.WorldIdentity("world-3"), world)
+    thestore.UpdateMany([(model.WorldIdentity("other"), other)])
+    assert len(calls) == 2